@@ -0,0 +1,94 @@
+"""
+Micro-benchmark of the per-call overhead of (de)serializing AccountService
+responses, comparing schemas built per call (as previously done by the
+service clients) with the shared schemas from the schema registry.
+
+Usage:
+
+    TEST=1 python benchmark-schemas.py --ggos=5000 --rounds=20
+"""
+import fire
+import timeit
+from datetime import datetime, timedelta, timezone
+import marshmallow_dataclass as md
+
+from originexample.services.schemas import get_schema
+from originexample.services.account import (
+    GetGgoListRequest,
+    GetGgoListResponse,
+    GgoFilters,
+)
+
+
+def build_response_json(ggos):
+    """
+    :param int ggos: Number of GGOs in the response
+    :rtype: dict
+    """
+    begin = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+
+    return {
+        'success': True,
+        'total': ggos,
+        'results': [
+            {
+                'address': 'a' * 64 + str(i),
+                'sector': 'DK1',
+                'begin': (begin + timedelta(hours=i)).isoformat(),
+                'end': (begin + timedelta(hours=i + 1)).isoformat(),
+                'amount': 100 + i,
+                'technology': 'Wind',
+                'technologyCode': 'T010000',
+                'fuelCode': 'F01040100',
+                'issueGsrn': '570000000000000000',
+            }
+            for i in range(ggos)
+        ],
+    }
+
+
+class SchemaBenchmark(object):
+    def run(self, ggos=5000, rounds=20):
+        """
+        :param int ggos: Number of GGOs in each get_ggo_list() response
+        :param int rounds: Number of calls to time
+        """
+        request = GetGgoListRequest(
+            filters=GgoFilters(address=['a' * 64], sector=['DK1']),
+            offset=0,
+            limit=ggos,
+        )
+        response_json = build_response_json(ggos)
+
+        def per_call():
+            md.class_schema(GetGgoListRequest)().dump(request)
+            md.class_schema(GetGgoListResponse)().load(response_json)
+
+        def registry():
+            get_schema(GetGgoListRequest).dump(request)
+            get_schema(GetGgoListResponse).load(response_json)
+
+        def schema_only_per_call():
+            md.class_schema(GetGgoListRequest)()
+            md.class_schema(GetGgoListResponse)()
+
+        def schema_only_registry():
+            get_schema(GetGgoListRequest)
+            get_schema(GetGgoListResponse)
+
+        # Warm up (builds the cached schemas)
+        per_call()
+        registry()
+
+        for title, func, n in (
+                ('Schemas built per call', per_call, rounds),
+                ('Schemas from registry', registry, rounds),
+                ('Schema construction only, per call', schema_only_per_call, rounds * 100),
+                ('Schema construction only, registry', schema_only_registry, rounds * 100),
+        ):
+            elapsed = timeit.timeit(func, number=n)
+            print('%-40s %10.3f ms/call' % (title, elapsed / n * 1000))
+
+
+if __name__ == '__main__':
+    fire.Fire(SchemaBenchmark().run)
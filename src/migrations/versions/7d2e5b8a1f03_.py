@@ -0,0 +1,39 @@
+"""empty message
+
+Revision ID: 7d2e5b8a1f03
+Revises: 3f6a1c2d9e47
+Create Date: 2020-10-07 09:41:18.215307
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2e5b8a1f03'
+down_revision = '3f6a1c2d9e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Retiring priorities are reordered in a single UPDATE statement,
+    # which requires the constraint to be checked at the end of the
+    # statement instead of for each row
+    op.drop_constraint('facilities_facility_user_id_retiring_priority_key', 'facilities_facility')
+    op.create_unique_constraint(
+        'facilities_facility_user_id_retiring_priority_key',
+        'facilities_facility',
+        ['user_id', 'retiring_priority'],
+        deferrable=True,
+        initially='IMMEDIATE',
+    )
+
+
+def downgrade():
+    op.drop_constraint('facilities_facility_user_id_retiring_priority_key', 'facilities_facility')
+    op.create_unique_constraint(
+        'facilities_facility_user_id_retiring_priority_key',
+        'facilities_facility',
+        ['user_id', 'retiring_priority'],
+    )
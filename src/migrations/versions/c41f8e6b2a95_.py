@@ -0,0 +1,31 @@
+"""empty message
+
+Revision ID: c41f8e6b2a95
+Revises: 7d2e5b8a1f03
+Create Date: 2020-10-08 13:22:05.871043
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f8e6b2a95'
+down_revision = '7d2e5b8a1f03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_facilities_facility_gsrn_trgm', 'facilities_facility', ['gsrn'], unique=False, postgresql_using='gin', postgresql_ops={'gsrn': 'gin_trgm_ops'})
+    op.create_index('ix_facilities_facility_name_trgm', 'facilities_facility', ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_facilities_facility_street_name_trgm', 'facilities_facility', ['street_name'], unique=False, postgresql_using='gin', postgresql_ops={'street_name': 'gin_trgm_ops'})
+    op.create_index('ix_facilities_facility_city_name_trgm', 'facilities_facility', ['city_name'], unique=False, postgresql_using='gin', postgresql_ops={'city_name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_facilities_facility_city_name_trgm', table_name='facilities_facility')
+    op.drop_index('ix_facilities_facility_street_name_trgm', table_name='facilities_facility')
+    op.drop_index('ix_facilities_facility_name_trgm', table_name='facilities_facility')
+    op.drop_index('ix_facilities_facility_gsrn_trgm', table_name='facilities_facility')
@@ -0,0 +1,26 @@
+"""empty message
+
+Revision ID: e5a09d7c3b61
+Revises: c41f8e6b2a95
+Create Date: 2020-10-09 10:03:47.529118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a09d7c3b61'
+down_revision = 'c41f8e6b2a95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE INDEX ix_auth_user_name_prefix ON auth_user (lower(name) text_pattern_ops)')
+    op.execute('CREATE INDEX ix_auth_user_company_prefix ON auth_user (lower(company) text_pattern_ops)')
+
+
+def downgrade():
+    op.drop_index('ix_auth_user_company_prefix', table_name='auth_user')
+    op.drop_index('ix_auth_user_name_prefix', table_name='auth_user')
@@ -1,20 +1,22 @@
 import csv
 import marshmallow_dataclass as md
-from io import StringIO
+from itertools import chain
 from datetime import datetime, timedelta
-from functools import partial
-from flask import make_response
 
 from originexample import logger
 from originexample.auth import User, UserQuery, requires_login
 from originexample.db import inject_session, atomic
-from originexample.http import Controller
+from originexample.http import Controller, stream_csv
 from originexample.facilities import Facility, FacilityQuery
 from originexample.common import DateTimeRange, DataSet
 from originexample.pipelines import start_consume_back_in_time_pipeline
 import originexample.services.account as acc
 
-from .helpers import get_resolution, update_transfer_priorities
+from .helpers import (
+    get_resolution,
+    update_transfer_priorities,
+    set_transfer_priorities,
+)
 from .queries import AgreementQuery
 from .email import (
     send_invitation_received_email,
@@ -51,16 +53,41 @@ account = acc.AccountService()
 
 
 class AbstractAgreementController(Controller):
-    def map_agreement_for(self, user, agreement):
+    def map_agreements_for(self, user, agreements, session):
         """
-        :param TradeAgreement agreement:
+        Maps the agreements from the perspective of the user.
+
+        Facilities referenced by the (outbound) agreements are resolved
+        using a single query for all agreements, and each agreement is
+        mapped with its own facilities.
+
         :param User user:
+        :param list[TradeAgreement] agreements:
+        :param Session session:
+        :rtype: list[MappedTradeAgreement]
+        """
+        facilities = self.get_facilities_by_gsrn(
+            user=user,
+            agreements=[a for a in agreements if a.is_outbound_from(user)],
+            session=session,
+        )
+
+        return [
+            self.map_agreement_for(user, agreement, facilities)
+            for agreement in agreements
+        ]
+
+    def map_agreement_for(self, user, agreement, facilities):
+        """
+        :param User user:
+        :param TradeAgreement agreement:
+        :param dict[str, Facility] facilities: The user's facilities by GSRN
         :rtype: MappedTradeAgreement
         """
         if agreement.is_inbound_to(user):
             return self.map_inbound_agreement(agreement)
         elif agreement.is_outbound_from(user):
-            return self.map_outbound_agreement(agreement)
+            return self.map_outbound_agreement(agreement, facilities)
         else:
             raise RuntimeError('This should NOT have happened!')
 
@@ -86,16 +113,17 @@ class AbstractAgreementController(Controller):
             proposal_note=agreement.proposal_note,
         )
 
-    def map_outbound_agreement(self, agreement):
+    def map_outbound_agreement(self, agreement, facilities):
         """
         :param TradeAgreement agreement:
+        :param dict[str, Facility] facilities: The sender's facilities by GSRN
         :rtype: MappedTradeAgreement
         """
-        if agreement.facility_gsrn:
-            facilities = self.get_facilities(
-                agreement.user_from, agreement.facility_gsrn)
-        else:
-            facilities = []
+        facilities = [
+            facilities[gsrn]
+            for gsrn in agreement.facility_gsrn or ()
+            if gsrn in facilities
+        ]
 
         return MappedTradeAgreement(
             direction=AgreementDirection.OUTBOUND,
@@ -115,18 +143,28 @@ class AbstractAgreementController(Controller):
             facilities=facilities,
         )
 
-    @inject_session
-    def get_facilities(self, user, facility_gsrn, session):
+    def get_facilities_by_gsrn(self, user, agreements, session):
         """
+        Returns the user's facilities referenced by the agreements.
+
         :param User user:
-        :param list[str] facility_gsrn:
+        :param list[TradeAgreement] agreements:
         :param Session session:
-        :rtype: list[Facility]
+        :rtype: dict[str, Facility]
         """
-        return FacilityQuery(session) \
-            .belongs_to(user) \
-            .has_any_gsrn(facility_gsrn) \
-            .all()
+        gsrn = set()
+        for agreement in agreements:
+            gsrn.update(agreement.facility_gsrn or ())
+
+        if not gsrn:
+            return {}
+
+        return {
+            facility.gsrn: facility
+            for facility in FacilityQuery(session)
+            .belongs_to(user)
+            .has_any_gsrn(list(gsrn))
+        }
 
 
 class GetAgreementList(AbstractAgreementController):
@@ -144,60 +182,56 @@ class GetAgreementList(AbstractAgreementController):
         :rtype: GetAgreementListResponse
         """
 
-        # Invitations currently awaiting response by this user
-        pending = AgreementQuery(session) \
-            .is_proposed_to(user) \
-            .is_pending() \
-            .order_by(TradeAgreement.created.asc()) \
-            .all()
-
-        # Invitations sent by this user awaiting response by another user
-        sent = AgreementQuery(session) \
-            .is_proposed_by(user) \
-            .is_pending() \
-            .order_by(TradeAgreement.created.asc()) \
-            .all()
-
-        # Inbound agreements currently active
-        inbound = AgreementQuery(session) \
-            .is_inbound_to(user) \
-            .is_accepted() \
-            .order_by(TradeAgreement.created.asc()) \
-            .all()
-
-        # Outbound agreements currently active
-        outbound = AgreementQuery(session) \
-            .is_outbound_from(user) \
-            .is_accepted() \
-            .order_by(TradeAgreement.transfer_priority.asc()) \
-            .all()
-
-        # Formerly accepted agreements which has now been cancelled
-        cancelled = AgreementQuery(session) \
-            .belongs_to(user) \
-            .is_cancelled() \
-            .is_cancelled_recently() \
-            .order_by(TradeAgreement.cancelled.desc()) \
-            .all()
-
-        # Formerly proposed agreements which has now been declined
-        declined = AgreementQuery(session) \
+        agreements = AgreementQuery(session) \
             .belongs_to(user) \
-            .is_declined() \
-            .is_declined_recently() \
-            .order_by(TradeAgreement.declined.desc()) \
+            .is_pending_accepted_or_closed_recently() \
+            .order_by(TradeAgreement.created.asc()) \
             .all()
 
-        map_agreement = partial(self.map_agreement_for, user)
+        pending = []
+        sent = []
+        inbound = []
+        outbound = []
+        cancelled = []
+        declined = []
+
+        for agreement in agreements:
+            if agreement.state is AgreementState.PENDING:
+                if agreement.user_proposed_id == user.id:
+                    # Invitations sent by this user awaiting response by another user
+                    sent.append(agreement)
+                else:
+                    # Invitations currently awaiting response by this user
+                    pending.append(agreement)
+            elif agreement.state is AgreementState.ACCEPTED:
+                # Inbound agreements currently active
+                if agreement.user_to_id == user.id:
+                    inbound.append(agreement)
+                # Outbound agreements currently active
+                if agreement.user_from_id == user.id:
+                    outbound.append(agreement)
+            elif agreement.state is AgreementState.CANCELLED:
+                # Formerly accepted agreements which has now been cancelled
+                cancelled.append(agreement)
+            elif agreement.state is AgreementState.DECLINED:
+                # Formerly proposed agreements which has now been declined
+                declined.append(agreement)
+
+        outbound.sort(key=lambda a: (a.transfer_priority is None, a.transfer_priority))
+        cancelled.sort(key=lambda a: a.cancelled, reverse=True)
+        declined.sort(key=lambda a: a.declined, reverse=True)
+
+        mapped = dict(zip(
+            agreements, self.map_agreements_for(user, agreements, session)))
 
         return GetAgreementListResponse(
             success=True,
-            pending=list(map(map_agreement, pending)),
-            sent=list(map(map_agreement, sent)),
-            inbound=list(map(map_agreement, inbound)),
-            outbound=list(map(map_agreement, outbound)),
-            cancelled=list(map(map_agreement, cancelled)),
-            declined=list(map(map_agreement, declined)),
+            pending=[mapped[a] for a in pending],
+            sent=[mapped[a] for a in sent],
+            inbound=[mapped[a] for a in inbound],
+            outbound=[mapped[a] for a in outbound],
+            cancelled=[mapped[a] for a in cancelled],
+            declined=[mapped[a] for a in declined],
         )
 
 
@@ -223,7 +257,7 @@ class GetAgreementDetails(AbstractAgreementController):
             .one_or_none()
 
         if agreement:
-            agreement = self.map_agreement_for(user, agreement)
+            agreement = self.map_agreements_for(user, [agreement], session)[0]
 
         return GetAgreementDetailsResponse(
             success=agreement is not None,
@@ -302,6 +336,7 @@ class GetAgreementSummary(AbstractAgreementController):
 
         response = account.get_transfer_summary(
             token=token,
+            cache=True,
             request=acc.GetTransferSummaryRequest(
                 direction=direction,
                 resolution=resolution,
@@ -376,49 +411,19 @@ class SetTransferPriority(Controller):
     Request = md.class_schema(SetTransferPriorityRequest)
 
     @requires_login
-    def handle_request(self, request, user):
-        """
-        :param SetTransferPriorityRequest request:
-        :param User user:
-        :rtype: bool
-        """
-        self.update_transfer_priorities(
-            request.public_ids_prioritized, user)
-
-        self.complete_priorities(user)
-
-        return True
-
     @atomic
-    def update_transfer_priorities(self, public_ids_prioritized, user, session):
+    def handle_request(self, request, user, session):
         """
-        :param list[str public_ids_prioritized:
+        :param SetTransferPriorityRequest request:
         :param User user:
         :param Session session:
         :rtype: bool
         """
-        agreements = AgreementQuery(session) \
-            .is_outbound_from(user) \
-            .is_accepted()
-
-        # Initially remove priority for all agreements
-        agreements.update({TradeAgreement.transfer_priority: None})
-
-        # Set priorities in the order they were provided
-        for i, public_id in enumerate(public_ids_prioritized):
-            agreements \
-                .has_public_id(public_id) \
-                .update({TradeAgreement.transfer_priority: i})
+        set_transfer_priorities(
+            user, request.public_ids_prioritized, session)
 
         return True
 
-    @atomic
-    def complete_priorities(self, *args, **kwargs):
-        """
-        TODO
-        """
-        update_transfer_priorities(*args, **kwargs)
-
 
 class SetFacilities(Controller):
     """
@@ -829,57 +834,26 @@ class ExportGgoSummaryCSV(Controller):
             )
         )
 
-        # -- Write CSV -------------------------------------------------------
-
-        csv_file = StringIO()
-        csv_writer = csv.writer(
-            csv_file, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-
-        # Headers
-        csv_writer.writerow([
-            'Type',
-            'TechnologyCode',
-            'FuelCode',
-            'Technology',
-            'Begin',
-            'Amount',
-        ])
-
-        # Issued GGOs
-        for summary_group in inbound:
-            technology, technology_code, fuel_code = summary_group.group
-
-            for label, amount in zip(inbound_labels, summary_group.values):
-                csv_writer.writerow([
-                    'INBOUND',
-                    technology_code,
-                    fuel_code,
-                    technology,
-                    label,
-                    amount,
-                ])
-
-        # Retired GGOs
-        for summary_group in outbound:
-            technology, technology_code, fuel_code = summary_group.group
-
-            for label, amount in zip(outbound_labels, summary_group.values):
-                csv_writer.writerow([
-                    'OUTBOUND',
-                    technology_code,
-                    fuel_code,
-                    technology,
-                    label,
-                    amount,
-                ])
-
         # -- HTTP response ---------------------------------------------------
 
-        response = make_response(csv_file.getvalue())
-        response.headers["Content-Disposition"] = 'attachment; filename=transfer-ggo-summary.csv'
-        response.headers["Content-type"] = 'text/csv'
-
-        return response
+        return stream_csv(
+            filename='transfer-ggo-summary.csv',
+            header=[
+                'Type',
+                'TechnologyCode',
+                'FuelCode',
+                'Technology',
+                'Begin',
+                'Amount',
+            ],
+            rows=chain(
+                self.get_summary_rows('INBOUND', inbound, inbound_labels),
+                self.get_summary_rows('OUTBOUND', outbound, outbound_labels),
+            ),
+            delimiter=';',
+            quotechar='"',
+            quoting=csv.QUOTE_MINIMAL,
+        )
 
     @inject_session
     def get_facilities(self, user, filters, session):
@@ -917,6 +891,26 @@ class ExportGgoSummaryCSV(Controller):
             ],
         )
 
-        response = account.get_transfer_summary(token, request)
+        response = account.get_transfer_summary(token, request, cache=True)
 
         return response.groups, response.labels
+
+    def get_summary_rows(self, label, groups, labels):
+        """
+        :param str label: Value of the "Type" column
+        :param list[SummaryGroup] groups:
+        :param list[str] labels:
+        :rtype: collections.abc.Iterable[list]
+        """
+        for summary_group in groups:
+            technology, technology_code, fuel_code = summary_group.group
+
+            for begin, amount in zip(labels, summary_group.values):
+                yield [
+                    label,
+                    technology_code,
+                    fuel_code,
+                    technology,
+                    begin,
+                    amount,
+                ]
@@ -40,3 +40,40 @@ def update_transfer_priorities(user, session):
         where agreements_agreement.id = s.id
         and agreements_agreement.user_from_id = :user_from_id
     """, {'user_from_id': user.id})
+
+
+def set_transfer_priorities(user, public_ids_prioritized, session):
+    """
+    Sets the transfer priority of the user's accepted outbound agreements
+    in the order provided, followed by the remaining agreements in their
+    existing order, using a single UPDATE statement. Priorities are
+    numbered consecutively from zero.
+
+    :param User user:
+    :param list[str] public_ids_prioritized:
+    :param sqlalchemy.orm.Session session:
+    """
+    session.execute("""
+        update agreements_agreement
+        set transfer_priority = s.priority
+        from (
+            select a.id, row_number() over (
+                order by p.ordinality asc nulls last,
+                         a.transfer_priority asc nulls last,
+                         a.id asc
+            ) - 1 as priority
+            from agreements_agreement as a
+            left join (
+                select u.public_id, max(u.ordinality) as ordinality
+                from unnest(cast(:public_ids as varchar[]))
+                    with ordinality as u(public_id, ordinality)
+                group by u.public_id
+            ) as p on p.public_id = a.public_id
+            where a.user_from_id = :user_from_id
+            and a.state = 'ACCEPTED'
+        ) as s
+        where agreements_agreement.id = s.id
+    """, {
+        'public_ids': list(public_ids_prioritized),
+        'user_from_id': user.id,
+    })
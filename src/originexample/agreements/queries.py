@@ -171,6 +171,30 @@ class AgreementQuery(object):
             TradeAgreement.declined >= text("NOW() - INTERVAL '14 DAYS'"),
         ))
 
+    def is_pending_accepted_or_closed_recently(self):
+        """
+        Agreements which are either pending or accepted, or which
+        has been cancelled or declined recently.
+
+        :rtype: AgreementQuery
+        """
+        return AgreementQuery(self.session, self.q.filter(
+            sa.or_(
+                TradeAgreement.state.in_((
+                    AgreementState.PENDING,
+                    AgreementState.ACCEPTED,
+                )),
+                sa.and_(
+                    TradeAgreement.state == AgreementState.CANCELLED,
+                    TradeAgreement.cancelled >= text("NOW() - INTERVAL '14 DAYS'"),
+                ),
+                sa.and_(
+                    TradeAgreement.state == AgreementState.DECLINED,
+                    TradeAgreement.declined >= text("NOW() - INTERVAL '14 DAYS'"),
+                ),
+            ),
+        ))
+
     def is_limited_to_consumption(self):
         """
         TODO unittest this
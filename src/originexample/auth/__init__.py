@@ -2,4 +2,4 @@ from .models import User
 from .backend import AuthBackend
 from .queries import UserQuery
 from .validators import user_public_id_exists
-from .decorators import inject_user, inject_token, requires_login
+from .decorators import inject_user, inject_token, requires_login, invalidate_user
@@ -0,0 +1,119 @@
+import time
+import threading
+from bisect import bisect_left
+
+from originexample.db import inject_session
+
+from .models import MappedUser, Account
+from .queries import UserQuery
+
+
+class UserAutocompleteIndex(object):
+    """
+    An immutable, in-process index for prefix searching active users
+    by name and company.
+
+    Lower-cased names and companies are kept sorted, so all entries
+    starting with a prefix are found by a binary search followed by
+    a scan of the matching entries only.
+    """
+    def __init__(self, users):
+        """
+        :param list[MappedUser] users:
+        """
+        entries = sorted(
+            (value.lower(), i)
+            for i, user in enumerate(users)
+            for value in (user.name, user.company)
+            if value
+        )
+
+        self.users = tuple(users)
+        self.keys = tuple(key for key, i in entries)
+        self.indexes = tuple(i for key, i in entries)
+
+    def search(self, query, exclude_sub=None, limit=None):
+        """
+        Returns users whose name or company starts with the query
+        (case-insensitive), ordered by name.
+
+        :param str query:
+        :param str exclude_sub: Subject of user to exclude from results
+        :param int limit: Max. number of users to return
+        :rtype: list[MappedUser]
+        """
+        prefix = query.lower()
+        position = bisect_left(self.keys, prefix)
+        matches = set()
+
+        while position < len(self.keys) and self.keys[position].startswith(prefix):
+            matches.add(self.indexes[position])
+            position += 1
+
+        users = sorted(
+            (self.users[i] for i in matches if self.users[i].sub != exclude_sub),
+            key=lambda user: user.name,
+        )
+
+        return users[:limit] if limit is not None else users
+
+
+class UserAutocompleteIndexCache(object):
+    """
+    Holds the UserAutocompleteIndex of the process, and rebuilds it
+    from the database when it is older than "ttl" seconds. A rebuilt
+    index replaces the previous one in a single assignment.
+    """
+    def __init__(self, ttl):
+        """
+        :param float ttl: Seconds before rebuilding the index
+        """
+        self.ttl = ttl
+        self.index = None
+        self.built_at = None
+        self.lock = threading.Lock()
+
+    def is_fresh(self):
+        """
+        :rtype: bool
+        """
+        return self.index is not None \
+            and time.monotonic() - self.built_at < self.ttl
+
+    def get(self):
+        """
+        :rtype: UserAutocompleteIndex
+        """
+        if self.is_fresh():
+            return self.index
+
+        with self.lock:
+            if not self.is_fresh():
+                self.index = build_user_autocomplete_index()
+                self.built_at = time.monotonic()
+
+            return self.index
+
+
+@inject_session
+def build_user_autocomplete_index(session):
+    """
+    :param Session session:
+    :rtype: UserAutocompleteIndex
+    """
+    users = UserQuery(session) \
+        .is_active() \
+        .all()
+
+    return UserAutocompleteIndex([
+        MappedUser(
+            sub=user.sub,
+            name=user.name,
+            company=user.company,
+            email=user.email,
+            phone=user.phone,
+            has_performed_onboarding=user.has_performed_onboarding,
+            accounts=[Account(id=user.sub)],
+        )
+        for user in users
+    ])
@@ -18,11 +18,14 @@ from originexample.settings import (
     IDENTITY_SERVICE_EDIT_PROFILE_URL,
     IDENTITY_SERVICE_EDIT_CLIENTS_URL,
     IDENTITY_SERVICE_DISABLE_USER_URL,
+    AUTOCOMPLETE_USERS_LIMIT,
+    AUTOCOMPLETE_USERS_INDEX_TTL,
 )
 
 from .queries import UserQuery
 from .backend import AuthBackend
-from .decorators import requires_login, inject_user, get_user
+from .decorators import requires_login, inject_user, get_user, invalidate_user
+from .autocomplete import UserAutocompleteIndexCache
 from .models import (
     User,
     LoginRequest,
@@ -41,6 +44,8 @@ SID_COOKIE_NAME = 'SID'
 backend = AuthBackend()
 datahub = DataHubService()
 account = AccountService()
+autocomplete_index = UserAutocompleteIndexCache(
+    ttl=AUTOCOMPLETE_USERS_INDEX_TTL)
 
 
 class Login(Controller):
@@ -147,6 +152,7 @@ class LoginCallback(Controller):
                 'subject': id_token['sub'],
             })
             self.update_user_attributes(user, token, expires)
+            invalidate_user(user.sub, session)
 
         # Save session in Redis
         redis.set(id_token['sid'], id_token['sub'], ex=token['expires_at'])
@@ -310,6 +316,8 @@ class DisableUserCallback(Controller):
             .has_id(user.id) \
             .update({'disabled': True})
 
+        invalidate_user(user.sub, session)
+
         self.cancel_agreements(user, session)
         self.disable_account_service_user(user)
         self.disable_data_service_meteringpoints(user)
@@ -358,6 +366,11 @@ class Logout(Controller):
         """
         :rtype: flask.Response
         """
+        if SID_COOKIE_NAME in flask_request.cookies:
+            sub = redis.get(flask_request.cookies[SID_COOKIE_NAME])
+            if sub:
+                invalidate_user(sub.decode())
+
         response = make_response(redirect(backend.get_logout_url(), code=307))
         response.delete_cookie(SID_COOKIE_NAME, domain=urlparse(FRONTEND_URL).netloc)
         return response
@@ -409,6 +422,8 @@ class GetOnboardingUrl(Controller):
             .filter(User.id == user.id) \
             .update({'has_performed_onboarding': True})
 
+        invalidate_user(user.sub, session)
+
         return GetOnboardingUrlResponse(
             success=True,
             url=response.url,
@@ -448,6 +463,8 @@ class GetProfile(Controller):
                     .replace(tzinfo=timezone.utc),
             })
 
+        invalidate_user(user.sub, session)
+
         user.email = id_token['email']
         user.phone = id_token['phone']
         user.name = id_token['name']
@@ -461,7 +478,11 @@ class GetProfile(Controller):
 
 class AutocompleteUsers(Controller):
     """
-    TODO
+    Returns active users whose name or company starts with the query.
+
+    If AUTOCOMPLETE_USERS_INDEX_TTL is set, users are searched in an
+    in-process index (refreshed every AUTOCOMPLETE_USERS_INDEX_TTL seconds)
+    instead of the database.
     """
     Request = md.class_schema(AutocompleteUsersRequest)
     Response = md.class_schema(AutocompleteUsersResponse)
@@ -475,12 +496,20 @@ class AutocompleteUsers(Controller):
         :param Session session:
         :rtype: AutocompleteUsersResponse
         """
-        users = UserQuery(session) \
-            .is_active() \
-            .starts_with(request.query) \
-            .exclude(user) \
-            .order_by(User.name.asc()) \
-            .all()
+        if AUTOCOMPLETE_USERS_INDEX_TTL > 0:
+            users = autocomplete_index.get().search(
+                query=request.query,
+                exclude_sub=user.sub,
+                limit=AUTOCOMPLETE_USERS_LIMIT,
+            )
+        else:
+            users = UserQuery(session) \
+                .is_active() \
+                .starts_with(request.query) \
+                .exclude(user) \
+                .order_by(User.name.asc()) \
+                .limit(AUTOCOMPLETE_USERS_LIMIT) \
+                .all()
 
         return AutocompleteUsersResponse(
             success=True,
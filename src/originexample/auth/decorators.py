@@ -1,9 +1,15 @@
+import sqlalchemy as sa
 from flask import request
+from sqlalchemy.orm import make_transient_to_detached
 
-from originexample.cache import redis
+from originexample.cache import redis, LocalCache
 from originexample.db import inject_session
 from originexample.http import Unauthorized
-from originexample.settings import TOKEN_HEADER
+from originexample.settings import (
+    TOKEN_HEADER,
+    USER_CACHE_TTL,
+    USER_CACHE_SIZE,
+)
 
 from .models import User
 from .queries import UserQuery
@@ -52,18 +58,120 @@ def requires_login(func):
     return requires_login_wrapper
 
 
+# In-process cache of authenticated users: token -> (sub, generation, values)
+user_cache = LocalCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+def get_user(token):
+    """
+    Returns the (active) User authenticated by the token, if any.
+
+    Users are cached in-process for a short while. A cached user is only
+    used if the token still belongs to the same subject, and the user
+    has not been invalidated (see invalidate_user()) since it was cached.
+    Both are validated using a single round-trip to Redis.
+
+    :param str token:
+    :rtype: User
+    """
+    if not token:
+        return None
+
+    cached = user_cache.get(token)
+
+    if cached is not None:
+        sub, generation, values = cached
+        current_sub, current_generation = redis.mget(
+            token, get_user_generation_key(sub))
+
+        if current_sub is not None \
+                and current_sub.decode() == sub \
+                and current_generation == generation:
+            return restore_user(values)
+
+        user_cache.delete(token)
+
+    return load_user(token)
+
+
 @inject_session
-def get_user(token, session):
+def load_user(token, session):
     """
+    Loads the User authenticated by the token from the database,
+    and caches it in-process.
+
     :param str token:
     :param Session session:
     :rtype: User
     """
-    if token:
-        sub = redis.get(token)
+    sub = redis.get(token)
+
+    if sub:
+        sub = sub.decode()
+
+        # Read the generation BEFORE loading the user to avoid caching
+        # a user which is invalidated while being loaded
+        generation = redis.get(get_user_generation_key(sub))
+
+        user = UserQuery(session) \
+            .is_active() \
+            .has_sub(sub) \
+            .one_or_none()
+
+        if user is not None:
+            user_cache.set(token, (sub, generation, snapshot_user(user)))
+
+        return user
 
-        if sub:
-            return UserQuery(session) \
-                .is_active() \
-                .has_sub(sub.decode()) \
-                .one_or_none()
+
+def invalidate_user(sub, session=None):
+    """
+    Invalidates cached copies of the User (in all processes).
+    Must be invoked when changing or disabling a User.
+
+    If a session is provided, the invalidation happens once the
+    session is committed, so the changes are visible when the user
+    is loaded again.
+
+    :param str sub:
+    :param Session session:
+    """
+    if session is not None:
+        sa.event.listen(
+            session, 'after_commit',
+            lambda *args: invalidate_user(sub), once=True)
+    else:
+        redis.incr(get_user_generation_key(sub))
+
+
+def get_user_generation_key(sub):
+    """
+    :param str sub:
+    :rtype: str
+    """
+    return 'user-generation:%s' % sub
+
+
+def snapshot_user(user):
+    """
+    :param User user:
+    :rtype: dict
+    """
+    return {
+        attr.key: getattr(user, attr.key)
+        for attr in sa.inspect(User).column_attrs
+    }
+
+
+def restore_user(values):
+    """
+    Creates a new (detached) User instance from values of snapshot_user().
+    A new instance is created each time, so instances are never shared
+    between requests (and their sessions).
+
+    :param dict values:
+    :rtype: User
+    """
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
@@ -52,6 +52,19 @@ class User(ModelBase):
         return [Account(id=self.sub)]
 
 
+# Indexes for prefix searching (see UserQuery.starts_with)
+sa.Index(
+    'ix_auth_user_name_prefix',
+    sa.func.lower(User.name).label('lower_name'),
+    postgresql_ops={'lower_name': 'text_pattern_ops'},
+)
+sa.Index(
+    'ix_auth_user_company_prefix',
+    sa.func.lower(User.company).label('lower_company'),
+    postgresql_ops={'lower_company': 'text_pattern_ops'},
+)
+
+
 @dataclass
 class Account:
     id: str
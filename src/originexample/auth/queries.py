@@ -1,4 +1,4 @@
-from sqlalchemy import or_
+from sqlalchemy import or_, func
 from datetime import datetime, timezone
 
 from .models import User
@@ -72,13 +72,21 @@ class UserQuery(object):
 
     def starts_with(self, query):
         """
+        Case-insensitive prefix search on name and company. On PostgreSQL
+        the search uses the lower(name) and lower(company) indexes.
+
         :param str query:
         :rtype: UserQuery
         """
+        prefix = '%s%%' % query.lower() \
+            .replace('\\', '\\\\') \
+            .replace('%', '\\%') \
+            .replace('_', '\\_')
+
         return UserQuery(self.session, self.q.filter(
             or_(
-                User.name.ilike('%s%%' % query),
-                User.company.ilike('%s%%' % query),
+                func.lower(User.name).like(prefix),
+                func.lower(User.company).like(prefix),
             )
         ))
 
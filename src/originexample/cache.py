@@ -1,4 +1,7 @@
+import time
+import threading
 from redis import Redis
+from collections import OrderedDict
 
 from .settings import (
     REDIS_USERNAME,
@@ -15,3 +18,69 @@ redis = Redis(
     password=REDIS_PASSWORD,
     db=REDIS_CACHE_DB,
 )
+
+
+class LocalCache(object):
+    """
+    A size-bounded, in-process cache where entries expire after a
+    fixed time-to-live. When full, the least recently used entry
+    is evicted.
+
+    Entries are local to the process, so values cached must be
+    validated (or be acceptable to be stale for up to "ttl" seconds)
+    when the underlying data can change in other processes.
+    """
+    def __init__(self, maxsize, ttl):
+        """
+        :param int maxsize: Max. number of entries
+        :param float ttl: Seconds before an entry expires
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached value, or None if not cached (or expired).
+
+        :param key:
+        :rtype: obj
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None:
+                return None
+
+            expires, value = entry
+
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        :param key:
+        :param obj value:
+        """
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        """
+        :param key:
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
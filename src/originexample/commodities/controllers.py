@@ -1,15 +1,21 @@
 import csv
 import marshmallow_dataclass as md
-from io import StringIO
+from itertools import chain
 from functools import partial
-from flask import make_response
 
-from originexample.http import Controller
+from originexample.http import Controller, stream_csv
 from originexample.db import inject_session
+from originexample.concurrency import run_concurrently
 from originexample.facilities import FacilityQuery, Facility, FacilityFilters
 from originexample.common import DataSet, DateTimeRange
 from originexample.auth import User, requires_login
 from originexample.services import SummaryResolution
+from originexample.summaries import (
+    SummaryCategory,
+    get_ggo_distributions,
+    is_tracked,
+)
+from originexample.settings import GGO_SUMMARY_STORE_ENABLED
 from originexample.services import account as acc
 from originexample.services.datahub import (
     DataHubService,
@@ -69,6 +75,7 @@ def get_ggo_summary(token, category, resolution, begin_range, utc_offset, fill):
     """
     response = account_service.get_ggo_summary(
         token=token,
+        cache=True,
         request=acc.GetGgoSummaryRequest(
             utc_offset=utc_offset,
             resolution=resolution,
@@ -98,6 +105,7 @@ def get_transfer_summary(token, direction, resolution, begin_range, utc_offset,
     """
     response = account_service.get_transfer_summary(
         token=token,
+        cache=True,
         request=acc.GetTransferSummaryRequest(
             utc_offset=utc_offset,
             direction=direction,
@@ -126,6 +134,7 @@ def get_measurements(token, measurement_type, resolution, begin_range, gsrn, utc
     """
     response = datahub_service.get_measurement_summary(
         token=token,
+        cache=True,
         request=GetMeasurementSummaryRequest(
             utc_offset=utc_offset,
             resolution=resolution,
@@ -152,10 +161,12 @@ class GetGgoDistributions(Controller):
     Response = md.class_schema(GetGgoDistributionsResponse)
 
     @requires_login
-    def handle_request(self, request, user):
+    @inject_session
+    def handle_request(self, request, user, session):
         """
         :param GetGgoDistributionsRequest request:
         :param User user:
+        :param Session session:
         :rtype: GetGgoDistributionsResponse
         """
         begin_range = DateTimeRange.from_date_range(request.date_range)
@@ -168,13 +179,52 @@ class GetGgoDistributions(Controller):
             'fill': False,
         }
 
+        use_summary_store = GGO_SUMMARY_STORE_ENABLED and is_tracked(
+            session=session,
+            subject=user.sub,
+            begin_range=begin_range,
+            utc_offset=request.utc_offset,
+        )
+
+        if use_summary_store:
+            # Issued, retired, inbound and outbound are available in
+            # the local summary store (if it has tracked the user during
+            # the whole period), the remaining are fetched concurrently
+            local = get_ggo_distributions(
+                session=session,
+                subject=user.sub,
+                begin_range=begin_range,
+                utc_offset=request.utc_offset,
+            )
+
+            issued = self.get_local_distribution(local[SummaryCategory.ISSUED])
+            retired = self.get_local_distribution(local[SummaryCategory.RETIRED])
+            inbound = self.get_local_distribution(local[SummaryCategory.INBOUND])
+            outbound = self.get_local_distribution(local[SummaryCategory.OUTBOUND])
+
+            stored, expired = run_concurrently(
+                partial(self.get_stored, **kwargs),
+                partial(self.get_expired, **kwargs),
+            )
+        else:
+            # The distributions are independent of each other,
+            # so fetch them concurrently
+            issued, stored, retired, expired, inbound, outbound = run_concurrently(
+                partial(self.get_issued, **kwargs),
+                partial(self.get_stored, **kwargs),
+                partial(self.get_retired, **kwargs),
+                partial(self.get_expired, **kwargs),
+                partial(self.get_inbound, **kwargs),
+                partial(self.get_outbound, **kwargs),
+            )
+
         bundle = GgoDistributionBundle(
-            issued=self.get_issued(**kwargs),
-            stored=self.get_stored(**kwargs),
-            retired=self.get_retired(**kwargs),
-            expired=self.get_expired(**kwargs),
-            inbound=self.get_inbound(**kwargs),
-            outbound=self.get_outbound(**kwargs),
+            issued=issued,
+            stored=stored,
+            retired=retired,
+            expired=expired,
+            inbound=inbound,
+            outbound=outbound,
         )
 
         return GetGgoDistributionsResponse(
@@ -260,6 +310,21 @@ class GetGgoDistributions(Controller):
 
         return distribution
 
+    def get_local_distribution(self, amounts):
+        """
+        :param dict[str, int] amounts: Amount per technology
+        :rtype: GgoDistribution
+        """
+        distribution = GgoDistribution()
+
+        for technology, amount in amounts.items():
+            distribution.technologies.append(GgoTechnology(
+                technology=technology,
+                amount=amount,
+            ))
+
+        return distribution
+
 
 class GetGgoSummary(Controller):
     """
@@ -406,57 +471,26 @@ class ExportGgoSummaryCSV(Controller):
             ),
         )
 
-        # -- Write CSV -------------------------------------------------------
-
-        csv_file = StringIO()
-        csv_writer = csv.writer(
-            csv_file, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-
-        # Headers
-        csv_writer.writerow([
-            'Type',
-            'TechnologyCode',
-            'FuelCode',
-            'Technology',
-            'Begin',
-            'Amount',
-        ])
-
-        # Issued GGOs
-        for summary_group in issued:
-            technology, technology_code, fuel_code = summary_group.group
-
-            for label, amount in zip(issued_labels, summary_group.values):
-                csv_writer.writerow([
-                    'ISSUED',
-                    technology_code,
-                    fuel_code,
-                    technology,
-                    label,
-                    amount,
-                ])
-
-        # Retired GGOs
-        for summary_group in retired:
-            technology, technology_code, fuel_code = summary_group.group
-
-            for label, amount in zip(retired_labels, summary_group.values):
-                csv_writer.writerow([
-                    'RETIRED',
-                    technology_code,
-                    fuel_code,
-                    technology,
-                    label,
-                    amount,
-                ])
-
         # -- HTTP response ---------------------------------------------------
 
-        response = make_response(csv_file.getvalue())
-        response.headers["Content-Disposition"] = 'attachment; filename=ggo-summary.csv'
-        response.headers["Content-type"] = 'text/csv'
-
-        return response
+        return stream_csv(
+            filename='ggo-summary.csv',
+            header=[
+                'Type',
+                'TechnologyCode',
+                'FuelCode',
+                'Technology',
+                'Begin',
+                'Amount',
+            ],
+            rows=chain(
+                self.get_summary_rows('ISSUED', issued, issued_labels),
+                self.get_summary_rows('RETIRED', retired, retired_labels),
+            ),
+            delimiter=';',
+            quotechar='"',
+            quoting=csv.QUOTE_MINIMAL,
+        )
 
     @inject_session
     def get_facilities(self, user, filters, session):
@@ -492,10 +526,30 @@ class ExportGgoSummaryCSV(Controller):
             ],
         )
 
-        response = account_service.get_ggo_summary(token, request)
+        response = account_service.get_ggo_summary(token, request, cache=True)
 
         return response.groups, response.labels
 
+    def get_summary_rows(self, label, groups, labels):
+        """
+        :param str label: Value of the "Type" column
+        :param list[SummaryGroup] groups:
+        :param list[str] labels:
+        :rtype: collections.abc.Iterable[list]
+        """
+        for summary_group in groups:
+            technology, technology_code, fuel_code = summary_group.group
+
+            for begin, amount in zip(labels, summary_group.values):
+                yield [
+                    label,
+                    technology_code,
+                    fuel_code,
+                    technology,
+                    begin,
+                    amount,
+                ]
+
 
 class ExportGgoListCSV(Controller):
     """
@@ -536,57 +590,28 @@ class ExportGgoListCSV(Controller):
             retire_gsrn=gsrn,
         ))
 
-        # -- Write CSV -------------------------------------------------------
-
-        csv_file = StringIO()
-        csv_writer = csv.writer(
-            csv_file, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-
-        # Headers
-        csv_writer.writerow([
-            'Address',
-            'Type',
-            'TechnologyCode',
-            'FuelCode',
-            'Technology',
-            'Begin',
-            'Amount',
-            'Sector',
-        ])
-
-        # Issued GGOs
-        for ggo in issued:
-            csv_writer.writerow([
-                ggo.address,
-                'ISSUED',
-                ggo.technology_code,
-                ggo.fuel_code,
-                ggo.technology,
-                ggo.begin,
-                ggo.amount,
-                ggo.sector,
-            ])
-
-        # Retired GGOs
-        for ggo in retired:
-            csv_writer.writerow([
-                ggo.address,
-                'RETIRED',
-                ggo.technology_code,
-                ggo.fuel_code,
-                ggo.technology,
-                ggo.begin,
-                ggo.amount,
-                ggo.sector,
-            ])
-
         # -- HTTP response ---------------------------------------------------
 
-        response = make_response(csv_file.getvalue())
-        response.headers["Content-Disposition"] = 'attachment; filename=ggo-list.csv'
-        response.headers["Content-type"] = 'text/csv'
-
-        return response
+        return stream_csv(
+            filename='ggo-list.csv',
+            header=[
+                'Address',
+                'Type',
+                'TechnologyCode',
+                'FuelCode',
+                'Technology',
+                'Begin',
+                'Amount',
+                'Sector',
+            ],
+            rows=chain(
+                self.get_ggo_rows('ISSUED', issued),
+                self.get_ggo_rows('RETIRED', retired),
+            ),
+            delimiter=';',
+            quotechar='"',
+            quoting=csv.QUOTE_MINIMAL,
+        )
 
     @inject_session
     def get_facilities(self, user, filters, session):
@@ -608,16 +633,30 @@ class ExportGgoListCSV(Controller):
         """
         :param str token:
         :param GgoFilters filters:
-        :rtype: list[Ggo]
+        :rtype: collections.abc.Iterable[Ggo]
         """
-        response = account_service.get_ggo_list(
+        return account_service.iter_ggo_list(
             token=token,
-            request=acc.GetGgoListRequest(
-                filters=filters,
-            ),
+            filters=filters,
         )
 
-        return response.results
+    def get_ggo_rows(self, label, ggos):
+        """
+        :param str label: Value of the "Type" column
+        :param collections.abc.Iterable[Ggo] ggos:
+        :rtype: collections.abc.Iterable[list]
+        """
+        for ggo in ggos:
+            yield [
+                ggo.address,
+                label,
+                ggo.technology_code,
+                ggo.fuel_code,
+                ggo.technology,
+                ggo.begin,
+                ggo.amount,
+                ggo.sector,
+            ]
 
 
 class ExportMeasurementsCSV(Controller):
@@ -650,42 +689,23 @@ class ExportMeasurementsCSV(Controller):
         measurements, labels = self.get_measurements(
             user.access_token, resolution, begin_range, gsrn)
 
-        # -- Write CSV -------------------------------------------------------
-
-        csv_file = StringIO()
-        csv_writer = csv.writer(
-            csv_file, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-
-        # Headers
-        csv_writer.writerow([
-            'GSRN',
-            'FacilityName',
-            'FacilityType',
-            'Begin',
-            'Amount',
-        ])
-
-        # Measurements
-        for summary_group in measurements:
-            gsrn = summary_group.group[0]
-            facility = facilities_mapped[gsrn]
-
-            for label, amount in zip(labels, summary_group.values):
-                csv_writer.writerow([
-                    gsrn,
-                    facility.name,
-                    facility.facility_type,
-                    label,
-                    amount,
-                ])
-
         # -- HTTP response ---------------------------------------------------
 
-        response = make_response(csv_file.getvalue())
-        response.headers["Content-Disposition"] = 'attachment; filename=measurements.csv'
-        response.headers["Content-type"] = 'text/csv'
-
-        return response
+        return stream_csv(
+            filename='measurements.csv',
+            header=[
+                'GSRN',
+                'FacilityName',
+                'FacilityType',
+                'Begin',
+                'Amount',
+            ],
+            rows=self.get_measurement_rows(
+                measurements, labels, facilities_mapped),
+            delimiter=';',
+            quotechar='"',
+            quoting=csv.QUOTE_MINIMAL,
+        )
 
     @inject_session
     def get_facilities(self, user, filters, session):
@@ -721,10 +741,30 @@ class ExportMeasurementsCSV(Controller):
             ),
         )
 
-        response = datahub_service.get_measurement_summary(token, request)
+        response = datahub_service.get_measurement_summary(token, request, cache=True)
 
         return response.groups, response.labels
 
+    def get_measurement_rows(self, measurements, labels, facilities_mapped):
+        """
+        :param list[SummaryGroup] measurements:
+        :param list[str] labels:
+        :param dict[str, Facility] facilities_mapped:
+        :rtype: collections.abc.Iterable[list]
+        """
+        for summary_group in measurements:
+            gsrn = summary_group.group[0]
+            facility = facilities_mapped[gsrn]
+
+            for label, amount in zip(labels, summary_group.values):
+                yield [
+                    gsrn,
+                    facility.name,
+                    facility.facility_type,
+                    label,
+                    amount,
+                ]
+
 
 class GetPeakMeasurement(Controller):
     """
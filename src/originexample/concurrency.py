@@ -0,0 +1,43 @@
+import gevent
+from gevent.pool import Pool
+
+from originexample.settings import SERVICE_CONCURRENCY
+
+
+def run_concurrently(*funcs, concurrency=SERVICE_CONCURRENCY):
+    """
+    Invokes the provided functions (without arguments) concurrently,
+    each in its own greenlet, and returns their return values in the
+    same order as the functions were provided.
+
+    At most "concurrency" functions are running at the same time.
+    If any of the functions raises an exception, the remaining
+    functions are killed and the exception is re-raised.
+
+    Functions run in parallel when performing I/O, as the Gunicorn and
+    Celery workers run with gevent's monkey patching. Without it, the
+    functions effectively run one after another.
+
+    Usage:
+
+        a, b = run_concurrently(
+            partial(account_service.get_ggo_summary, token, request1),
+            partial(account_service.get_ggo_summary, token, request2),
+        )
+
+    :param funcs: Callables taking no arguments
+    :param int concurrency: Max. number of functions to run at a time
+    :rtype: list
+    """
+    if not funcs:
+        return []
+
+    pool = Pool(max(1, min(concurrency, len(funcs))))
+    greenlets = [pool.spawn(func) for func in funcs]
+
+    try:
+        gevent.joinall(greenlets, raise_error=True)
+    finally:
+        pool.kill()
+
+    return [greenlet.value for greenlet in greenlets]
@@ -1,2 +1,3 @@
 from .consumers import *
 from .helpers import *
+from .ledger import *
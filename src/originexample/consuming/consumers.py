@@ -1,16 +1,22 @@
 from math import floor
 from itertools import takewhile
+from collections import OrderedDict
 
 from originexample import logger
 from originexample.auth import User
 from originexample.agreements import TradeAgreement, AgreementQuery
 from originexample.facilities import Facility, FacilityQuery
 from originexample.consuming.helpers import (
-    get_consumption,
-    get_retired_amount,
+    lookup_scope,
+    get_consumptions,
+    get_retired_amounts,
     get_transferred_amount,
     get_stored_amount,
+    add_retired_amount,
+    add_stored_amount,
+    add_transferred_amount,
 )
+from originexample.consuming.ledger import demand_ledger
 from originexample.services.account import (
     Ggo,
     AccountService,
@@ -55,7 +61,7 @@ class GgoConsumerController(object):
             .all()
 
         for facility in facilities:
-            yield RetiringConsumer(facility)
+            yield RetiringConsumer(facility, facilities)
 
     def get_agreement_consumers(self, user, ggo, session):
         """
@@ -84,34 +90,92 @@ class GgoConsumerController(object):
 
     def consume_ggo(self, user, ggo, session):
         """
+        Consumes the GGO by composing it to the consumers.
+        See get_composition() and compose().
+
+        :param User user:
+        :param Ggo ggo:
+        :param Session session:
+        :rtype: GgoComposition
+        """
+        composition = self.get_composition(user, ggo, session)
+        self.compose(user, composition)
+        return composition
+
+    def get_composition(self, user, ggo, session):
+        """
+        Distributes the GGO among the consumers, and returns the
+        composition (without composing the GGO).
+
+        Consumers whose demand has been fulfilled according to the
+        demand ledger are skipped.
+
         :param User user:
         :param Ggo ggo:
         :param Session session:
+        :rtype: GgoComposition
         """
-        request = ComposeGgoRequest(address=ggo.address)
-        consumers = self.get_consumers(user, ggo, session)
+        composition = GgoComposition(ggo)
         remaining_amount = ggo.amount
 
-        for consumer in takewhile(lambda _: remaining_amount > 0, consumers):
-            already_transferred = ggo.amount - remaining_amount
+        satisfied = demand_ledger.get_satisfied(user.sub, ggo.begin)
+
+        # Consumers share lookups (ie. the consumption of the same
+        # facilities) for the duration of composing this GGO
+        with lookup_scope():
+            consumers = (
+                c for c in self.get_consumers(user, ggo, session)
+                if c.get_ledger_field() not in satisfied
+            )
+
+            for consumer in takewhile(lambda _: remaining_amount > 0, consumers):
+                already_transferred = ggo.amount - remaining_amount
+
+                desired_amount = consumer.get_desired_amount(
+                    ggo, already_transferred)
+
+                assigned_amount = min(remaining_amount, desired_amount)
+                remaining_amount -= assigned_amount
+
+                if assigned_amount > 0:
+                    consumer.consume(composition.request, ggo, assigned_amount)
+                    composition.consumed.append((consumer, assigned_amount))
+
+                remaining_demand = consumer.get_remaining_demand(
+                    ggo, assigned_amount)
+
+                if remaining_demand is not None:
+                    composition.demands[consumer.get_ledger_field()] = remaining_demand
 
-            desired_amount = consumer.get_desired_amount(
-                ggo, already_transferred)
+        return composition
 
-            assigned_amount = min(remaining_amount, desired_amount)
-            remaining_amount -= assigned_amount
+    def compose(self, user, composition):
+        """
+        Composes the GGO (if anything has been consumed), and records
+        the remaining demand of the consumers in the demand ledger.
 
-            if assigned_amount > 0:
-                consumer.consume(request, ggo, assigned_amount)
+        If invoked within a lookup_scope(), lookups memoized by the scope
+        are updated after composing, so the same scope can be used when
+        consuming multiple GGOs (for the same begin).
 
-        if remaining_amount < ggo.amount:
+        :param User user:
+        :param GgoComposition composition:
+        """
+        ggo = composition.ggo
+
+        if not composition.is_empty():
             logger.info('Composing a new GGO split', extra={
                 'subject': user.sub,
                 'address': ggo.address,
                 'begin': str(ggo.begin),
             })
 
-            account_service.compose(user.access_token, request)
+            account_service.compose(user.access_token, composition.request)
+
+            for consumer, amount in composition.consumed:
+                consumer.update_lookups(ggo, amount)
+
+        demand_ledger.record(user.sub, ggo.begin, composition.demands)
 
     def get_affected_subjects(self, user, ggo, session):
         """
@@ -128,6 +192,30 @@ class GgoConsumerController(object):
         return list(unique_subjects)
 
 
+class GgoComposition(object):
+    """
+    A GGO distributed among consumers, ie. the request to compose it,
+    along with the amount assigned to each consumer and the consumers'
+    remaining demand.
+    """
+    def __init__(self, ggo):
+        """
+        :param Ggo ggo:
+        """
+        self.ggo = ggo
+        self.request = ComposeGgoRequest(address=ggo.address)
+        self.consumed = []
+        self.demands = {}
+
+    def is_empty(self):
+        """
+        Returns whether nothing has been assigned to any consumer.
+
+        :rtype: bool
+        """
+        return not self.consumed
+
+
 class GgoConsumer(object):
     """
     TODO
@@ -154,16 +242,53 @@ class GgoConsumer(object):
         """
         raise NotImplementedError
 
+    def update_lookups(self, ggo, amount):
+        """
+        Invoked after the GGO has been composed, having consumed the amount.
+        Updates the lookups memoized by the active lookup scope (if any).
+
+        :param Ggo ggo:
+        :param int amount:
+        """
+        pass
+
+    def get_ledger_field(self):
+        """
+        Returns the field identifying this consumer's demand in the
+        demand ledger, or None if its demand is not recorded.
+
+        :rtype: str
+        """
+        return None
+
+    def get_remaining_demand(self, ggo, amount):
+        """
+        Returns the consumer's remaining demand at the GGO's begin (not
+        limited by the GGO's amount) after having consumed the amount,
+        or None if it is unknown or may increase over time.
+
+        Invoked after get_desired_amount(), whose lookups it can reuse.
+
+        :param Ggo ggo:
+        :param int amount:
+        :rtype: int
+        """
+        return None
+
 
 class RetiringConsumer(GgoConsumer):
     """
     TODO
     """
-    def __init__(self, facility):
+    def __init__(self, facility, facilities=None):
         """
         :param Facility facility:
+        :param list[Facility] facilities: Facilities (including this one)
+            which are retired to in the same batch, and whose consumption
+            is looked up together with this facility's
         """
         self.facility = facility
+        self.facilities = facilities or [facility]
 
     def __str__(self):
         return 'RetiringConsumer<%s>' % self.facility.gsrn
@@ -191,25 +316,76 @@ class RetiringConsumer(GgoConsumer):
         :param int already_transferred:
         :rtype: int
         """
-        measurement = get_consumption(
-            token=self.facility.user.access_token,
-            gsrn=self.facility.gsrn,
+        token = self.facility.user.access_token
+        facilities = [
+            f for f in self.facilities
+            if f.user.access_token == token
+        ]
+
+        measurements = get_consumptions(
+            token=token,
+            gsrns=[f.gsrn for f in facilities],
             begin=ggo.begin,
         )
 
+        measurement = measurements.get(self.facility.gsrn)
+
         if measurement is None:
             return 0
 
-        retired_amount = get_retired_amount(
-            token=self.facility.user.access_token,
-            gsrn=self.facility.gsrn,
-            measurement=measurement,
+        retired_amounts = get_retired_amounts(
+            token=token,
+            measurements=[m for m in measurements.values() if m is not None],
         )
 
-        desired_amount = measurement.amount - retired_amount
+        desired_amount = measurement.amount - retired_amounts[self.facility.gsrn]
 
         return max(0, min(ggo.amount, desired_amount))
 
+    def get_ledger_field(self):
+        """
+        :rtype: str
+        """
+        return 'retire:%s' % self.facility.gsrn
+
+    def get_remaining_demand(self, ggo, amount):
+        """
+        Returns the consumption not yet retired to, or None if the
+        consumption has not been measured (yet).
+
+        :param Ggo ggo:
+        :param int amount:
+        :rtype: int
+        """
+        token = self.facility.user.access_token
+        measurement = get_consumptions(
+            token=token,
+            gsrns=[self.facility.gsrn],
+            begin=ggo.begin,
+        ).get(self.facility.gsrn)
+
+        if measurement is None:
+            return None
+
+        retired_amounts = get_retired_amounts(
+            token=token,
+            measurements=[measurement],
+        )
+
+        return measurement.amount - retired_amounts[self.facility.gsrn] - amount
+
+    def update_lookups(self, ggo, amount):
+        """
+        :param Ggo ggo:
+        :param int amount:
+        """
+        add_retired_amount(
+            token=self.facility.user.access_token,
+            gsrn=self.facility.gsrn,
+            begin=ggo.begin,
+            amount=amount,
+        )
+
 
 class AgreementConsumer(GgoConsumer):
     """
@@ -267,6 +443,51 @@ class AgreementConsumer(GgoConsumer):
 
         return max(0, min(ggo.amount, desired_amount))
 
+    def get_ledger_field(self):
+        """
+        :rtype: str
+        """
+        return 'agreement:%s' % self.reference
+
+    def get_remaining_demand(self, ggo, amount):
+        """
+        Returns the amount not yet transferred on the agreement (for
+        the begin). For agreements limited to consumption, the actual
+        demand may be lower, but never higher.
+
+        :param Ggo ggo:
+        :param int amount:
+        :rtype: int
+        """
+        transferred_amount = get_transferred_amount(
+            token=self.agreement.user_from.access_token,
+            reference=self.reference,
+            begin=ggo.begin,
+        )
+
+        return self.agreement.calculated_amount - transferred_amount - amount
+
+    def update_lookups(self, ggo, amount):
+        """
+        The transferred amount is stored by the recipient, which affects
+        agreements limited to consumption to the same recipient.
+
+        :param Ggo ggo:
+        :param int amount:
+        """
+        add_transferred_amount(
+            token=self.agreement.user_from.access_token,
+            reference=self.reference,
+            begin=ggo.begin,
+            amount=amount,
+        )
+
+        add_stored_amount(
+            token=self.agreement.user_to.access_token,
+            begin=ggo.begin,
+            amount=amount,
+        )
+
 
 class AgreementLimitedToConsumptionConsumer(AgreementConsumer):
     """
@@ -304,14 +525,10 @@ class AgreementLimitedToConsumptionConsumer(AgreementConsumer):
         if remaining_amount <= 0:
             return 0
 
-        desired_amount = 0
-
-        # TODO takewhile desired_amount < min(ggo.amount, remaining_amount)
-        for facility in self.get_facilities(ggo):
-            desired_amount += self.get_desired_amount_for_facility(
-                facility=facility,
-                begin=ggo.begin,
-            )
+        desired_amount = self.get_desired_amount_for_facilities(
+            facilities=self.get_facilities(ggo),
+            begin=ggo.begin,
+        )
 
         desired_amount -= already_transferred
         try:
@@ -325,34 +542,50 @@ class AgreementLimitedToConsumptionConsumer(AgreementConsumer):
 
         return max(0, min(ggo.amount, remaining_amount, desired_amount))
 
-    def get_desired_amount_for_facility(self, facility, begin):
+    def get_desired_amount_for_facilities(self, facilities, begin):
         """
-        :param Facility facility:
+        Returns the total remaining (not yet retired) consumption of the
+        provided facilities. Lookups are batched per access token.
+
+        :param list[Facility] facilities:
         :param datetime.datetime begin:
         :rtype: int
         """
-        try:
-            measurement = get_consumption(
-                token=facility.user.access_token,
-                gsrn=facility.gsrn,
-                begin=begin,
-            )
-        except Exception as e:
-            logger.exception('ACCESS TOKEN ERROR?! sub=%s access_token=%s' % (self.agreement.user_to.sub, self.agreement.user_to.access_token))
-            raise
-
-        if measurement is None:
-            return 0
+        facilities_per_token = OrderedDict()
+        desired_amount = 0
 
-        retired_amount = get_retired_amount(
-            token=facility.user.access_token,
-            gsrn=facility.gsrn,
-            measurement=measurement,
-        )
+        for facility in facilities:
+            facilities_per_token \
+                .setdefault(facility.user.access_token, []) \
+                .append(facility)
+
+        for token, token_facilities in facilities_per_token.items():
+            try:
+                measurements = get_consumptions(
+                    token=token,
+                    gsrns=[f.gsrn for f in token_facilities],
+                    begin=begin,
+                )
+            except Exception as e:
+                logger.exception('ACCESS TOKEN ERROR?! sub=%s access_token=%s' % (self.agreement.user_to.sub, self.agreement.user_to.access_token))
+                raise
+
+            measurements = [m for m in measurements.values() if m is not None]
+
+            if not measurements:
+                continue
+
+            retired_amounts = get_retired_amounts(
+                token=token,
+                measurements=measurements,
+            )
 
-        remaining_amount = measurement.amount - retired_amount
+            for measurement in measurements:
+                remaining_amount = \
+                    measurement.amount - retired_amounts[measurement.gsrn]
+                desired_amount += max(0, remaining_amount)
 
-        return max(0, remaining_amount)
+        return desired_amount
 
     def get_facilities(self, ggo):
         """
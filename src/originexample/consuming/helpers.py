@@ -1,6 +1,14 @@
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+from originexample.settings import GGO_LIST_PAGE_SIZE
+from originexample.services import MeasurementType, SummaryResolution
 from originexample.services.datahub import (
     DataHubService,
+    MeasurementFilters,
     GetMeasurementRequest,
+    GetMeasurementListRequest,
 )
 from originexample.services.account import (
     GgoCategory,
@@ -9,6 +17,8 @@ from originexample.services.account import (
     TransferDirection,
     GetTransferredAmountRequest,
     GetTotalAmountRequest,
+    GetGgoSummaryRequest,
+    SummaryGrouping,
     GgoFilters,
     GetGgoListRequest)
 
@@ -17,6 +27,97 @@ account_service = AccountService()
 datahub_service = DataHubService()
 
 
+# Thread-local (greenlet-local when running with gevent's monkey patching)
+# storage of the currently active lookup scope, if any
+_scope = threading.local()
+
+
+@contextmanager
+def lookup_scope():
+    """
+    Context manager which memoizes the results of lookups made using
+    the helper functions decorated with @scoped_lookup, for as long
+    as the scope is active. Identical lookups (ie. the consumption of
+    the same GSRN at the same time) are only invoked once within a scope.
+
+    Nested scopes reuse the outermost scope. Results are not shared
+    across threads/greenlets.
+
+    Lookups are assumed not to change while the scope is active, unless
+    adjusted using the add_*() functions. A scope may therefore only span
+    modifications (ie. composes) if every lookup affected by them is
+    adjusted afterwards, which is the responsibility of the consumers'
+    update_lookups() (see GgoConsumerController.compose()).
+
+    Usage:
+
+        with lookup_scope():
+            get_consumption(token, gsrn, begin)
+            get_consumption(token, gsrn, begin)  # Memoized
+
+    :rtype: dict
+    """
+    cache = getattr(_scope, 'cache', None)
+
+    if cache is not None:
+        yield cache
+    else:
+        _scope.cache = {}
+        try:
+            yield _scope.cache
+        finally:
+            _scope.cache = None
+
+
+def scoped_lookup(key):
+    """
+    Decorator which memoizes the decorated function's return value
+    within the active lookup_scope(), if any. Outside a scope the
+    function is invoked as usual.
+
+    The decorated function gets a cache_key() attribute, which returns
+    the key its results are memoized by, allowing batched lookups to
+    share results with it.
+
+    :param key: Callable which takes the same arguments as the decorated
+        function and returns a (hashable) key identifying the lookup
+    """
+    def scoped_lookup_decorator(func):
+        def cache_key(*args, **kwargs):
+            return func.__name__, key(*args, **kwargs)
+
+        @wraps(func)
+        def scoped_lookup_wrapper(*args, **kwargs):
+            cache = getattr(_scope, 'cache', None)
+
+            if cache is None:
+                return func(*args, **kwargs)
+
+            k = cache_key(*args, **kwargs)
+
+            if k not in cache:
+                cache[k] = func(*args, **kwargs)
+
+            return cache[k]
+
+        scoped_lookup_wrapper.cache_key = cache_key
+
+        return scoped_lookup_wrapper
+    return scoped_lookup_decorator
+
+
+def get_scope_cache():
+    """
+    Returns the cache of the active lookup_scope(), or an empty
+    (throw-away) dict if no scope is active.
+
+    :rtype: dict
+    """
+    cache = getattr(_scope, 'cache', None)
+    return cache if cache is not None else {}
+
+
+@scoped_lookup(key=lambda token, gsrn, begin: (token, gsrn, begin))
 def get_consumption(token, gsrn, begin):
     """
     :param str token:
@@ -29,6 +130,48 @@ def get_consumption(token, gsrn, begin):
     return response.measurement
 
 
+def get_consumptions(token, gsrns, begin):
+    """
+    Batched version of get_consumption(). Returns the consumption of
+    multiple GSRNs (belonging to the same token) at the same time,
+    using a single request to DataHubService.
+
+    Results are shared with get_consumption() within a lookup_scope(),
+    and only GSRNs not already looked up are requested.
+
+    :param str token:
+    :param list[str] gsrns:
+    :param datetime.datetime begin:
+    :returns: Mapping of GSRN -> Measurement (or None if not measured)
+    :rtype: dict[str, Measurement]
+    """
+    cache = get_scope_cache()
+    keys = {
+        gsrn: get_consumption.cache_key(token=token, gsrn=gsrn, begin=begin)
+        for gsrn in gsrns
+    }
+    missing = [gsrn for gsrn in keys if keys[gsrn] not in cache]
+
+    if missing:
+        request = GetMeasurementListRequest(
+            offset=0,
+            limit=len(missing),
+            filters=MeasurementFilters(
+                begin=begin,
+                gsrn=missing,
+                type=MeasurementType.CONSUMPTION,
+            ),
+        )
+        response = datahub_service.get_measurement_list(token, request)
+        measurements = {m.gsrn: m for m in response.measurements}
+
+        for gsrn in missing:
+            cache[keys[gsrn]] = measurements.get(gsrn)
+
+    return {gsrn: cache[keys[gsrn]] for gsrn in keys}
+
+
+@scoped_lookup(key=lambda token, begin: (token, begin))
 def get_stored_amount(token, begin):
     """
     :param str token:
@@ -45,6 +188,7 @@ def get_stored_amount(token, begin):
     return response.amount
 
 
+@scoped_lookup(key=lambda token, gsrn, measurement: (token, gsrn, measurement.address))
 def get_retired_amount(token, gsrn, measurement):
     """
     :param str token:
@@ -63,6 +207,52 @@ def get_retired_amount(token, gsrn, measurement):
     return response.amount
 
 
+def get_retired_amounts(token, measurements):
+    """
+    Batched version of get_retired_amount(). Returns the amount retired
+    to multiple measurements (belonging to the same token) using a single
+    summary request to AccountService, grouped by the retiring GSRN.
+
+    Results are shared with get_retired_amount() within a lookup_scope(),
+    and only measurements not already looked up are requested.
+
+    :param str token:
+    :param list[Measurement] measurements:
+    :returns: Mapping of GSRN -> retired amount
+    :rtype: dict[str, int]
+    """
+    cache = get_scope_cache()
+    keys = {
+        m.gsrn: get_retired_amount.cache_key(
+            token=token, gsrn=m.gsrn, measurement=m)
+        for m in measurements
+    }
+    missing = [m for m in measurements if keys[m.gsrn] not in cache]
+
+    if missing:
+        request = GetGgoSummaryRequest(
+            resolution=SummaryResolution.ALL,
+            fill=False,
+            grouping=[SummaryGrouping.RETIRE_GSRN],
+            filters=GgoFilters(
+                retire_gsrn=[m.gsrn for m in missing],
+                retire_address=[m.address for m in missing],
+                category=GgoCategory.RETIRED,
+            ),
+        )
+        response = account_service.get_ggo_summary(token, request)
+        amounts = {
+            group.group[0]: sum(v for v in group.values if v is not None)
+            for group in response.groups
+        }
+
+        for m in missing:
+            cache[keys[m.gsrn]] = amounts.get(m.gsrn, 0)
+
+    return {gsrn: cache[keys[gsrn]] for gsrn in keys}
+
+
+@scoped_lookup(key=lambda token, reference, begin: (token, reference, begin))
 def get_transferred_amount(token, reference, begin):
     """
     :param str token:
@@ -81,6 +271,72 @@ def get_transferred_amount(token, reference, begin):
     return response.amount
 
 
+# -- Adjusting lookups -------------------------------------------------------
+
+
+def add_to_lookup(key, amount):
+    """
+    Adds an amount to a memoized lookup within the active lookup_scope(),
+    if it has been looked up. Used to keep lookups up-to-date after
+    having composed a GGO, so the scope can be reused across GGOs.
+
+    :param tuple key: The lookup's cache key
+    :param int amount:
+    """
+    cache = get_scope_cache()
+
+    if cache.get(key) is not None:
+        cache[key] += amount
+
+
+def add_retired_amount(token, gsrn, begin, amount):
+    """
+    Adjusts the memoized get_retired_amount() after retiring an amount
+    to the consumption of the GSRN at the begin.
+
+    :param str token:
+    :param str gsrn:
+    :param datetime.datetime begin:
+    :param int amount:
+    """
+    measurement = get_scope_cache().get(get_consumption.cache_key(
+        token=token, gsrn=gsrn, begin=begin))
+
+    if measurement is not None:
+        add_to_lookup(get_retired_amount.cache_key(
+            token=token, gsrn=gsrn, measurement=measurement), amount)
+
+
+def add_stored_amount(token, begin, amount):
+    """
+    Adjusts the memoized get_stored_amount() after transferring an
+    amount to the token's account.
+
+    :param str token:
+    :param datetime.datetime begin:
+    :param int amount:
+    """
+    add_to_lookup(get_stored_amount.cache_key(
+        token=token, begin=begin), amount)
+
+
+def add_transferred_amount(token, reference, begin, amount):
+    """
+    Adjusts the memoized get_transferred_amount() after transferring
+    an amount with the reference.
+
+    :param str token:
+    :param str reference:
+    :param datetime.datetime begin:
+    :param int amount:
+    """
+    add_to_lookup(get_transferred_amount.cache_key(
+        token=token, reference=reference, begin=begin), amount)
+
+
+# -- GGOs --------------------------------------------------------------------
+
+
 def ggo_is_available(token, ggo):
     """
     Check whether a GGO is available for transferring/retiring.
@@ -97,3 +353,32 @@ def ggo_is_available(token, ggo):
     )
     response = account_service.get_ggo_list(token, request)
     return len(response.results) > 0
+
+
+def get_available_addresses(token, addresses, page_size=GGO_LIST_PAGE_SIZE):
+    """
+    Batched version of ggo_is_available(). Returns the addresses of the
+    GGOs which are available for transferring/retiring, requesting
+    (up to) page_size addresses at a time.
+
+    :param str token:
+    :param collections.abc.Iterable[str] addresses:
+    :param int page_size:
+    :rtype: set[str]
+    """
+    addresses = list(set(addresses))
+    available = set()
+
+    for i in range(0, len(addresses), page_size):
+        chunk = addresses[i:i+page_size]
+        request = GetGgoListRequest(
+            limit=len(chunk),
+            filters=GgoFilters(
+                address=chunk,
+                category=GgoCategory.STORED,
+            )
+        )
+        response = account_service.get_ggo_list(token, request)
+        available.update(ggo.address for ggo in response.results)
+
+    return available
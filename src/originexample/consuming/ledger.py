@@ -0,0 +1,87 @@
+from originexample.cache import redis
+from originexample.settings import DEMAND_LEDGER_TTL
+
+
+class DemandLedger(object):
+    """
+    A Redis-backed ledger of the remaining demand of a subject's
+    consumers at a specific begin, ie. the consumption not yet retired
+    to each of the subject's GSRNs, and the amount not yet transferred
+    on each of the subject's outbound agreements.
+
+    The ledger is updated after composing each GGO, so consumers whose
+    demand has been fulfilled by earlier GGOs (for the same begin) can
+    be skipped without looking up their demand from AccountService and
+    DataHubService.
+
+    Only demand which can not increase (by other means than a new
+    measurement) is recorded. Entries expire after "ttl" seconds (from
+    when the ledger was created), after which demand is once again
+    looked up remotely, reconciling the ledger with the actual totals.
+    """
+    def __init__(self, ttl):
+        """
+        :param int ttl: Seconds to keep a ledger for (0 disables the ledger)
+        """
+        self.ttl = ttl
+
+    def get_key(self, subject, begin):
+        """
+        :param str subject:
+        :param datetime.datetime begin:
+        :rtype: str
+        """
+        return 'demand-ledger:%s:%s' % (subject, begin.isoformat())
+
+    def get_satisfied(self, subject, begin):
+        """
+        Returns the fields of consumers whose demand has been fulfilled.
+
+        :param str subject:
+        :param datetime.datetime begin:
+        :rtype: set[str]
+        """
+        if not self.ttl:
+            return set()
+
+        ledger = redis.hgetall(self.get_key(subject, begin))
+
+        return set(
+            field.decode()
+            for field, remaining_demand in ledger.items()
+            if int(remaining_demand) <= 0
+        )
+
+    def record(self, subject, begin, demands):
+        """
+        Records the remaining demand of consumers.
+
+        :param str subject:
+        :param datetime.datetime begin:
+        :param dict[str, int] demands: Mapping of field -> remaining demand
+        """
+        if not self.ttl or not demands:
+            return
+
+        key = self.get_key(subject, begin)
+
+        pipe = redis.pipeline()
+        pipe.hset(key, mapping={f: int(d) for f, d in demands.items()})
+        pipe.ttl(key)
+        _, ttl = pipe.execute()
+
+        # Only expire new ledgers, so they are reconciled periodically
+        # even when continuously being updated
+        if ttl < 0:
+            redis.expire(key, self.ttl)
+
+    def invalidate(self, subject, begin):
+        """
+        :param str subject:
+        :param datetime.datetime begin:
+        """
+        if self.ttl:
+            redis.delete(self.get_key(subject, begin))
+
+
+demand_ledger = DemandLedger(ttl=DEMAND_LEDGER_TTL)
@@ -1,9 +1,8 @@
-import csv
 import marshmallow_dataclass as md
-from flask import send_file, make_response
-from io import BytesIO, StringIO
+from flask import send_file
+from io import BytesIO
 
-from originexample.http import Controller
+from originexample.http import Controller, stream_csv
 from originexample.db import inject_session
 from originexample.facilities import FacilityQuery, FacilityFilters
 from originexample.auth import User, requires_login
@@ -144,23 +143,19 @@ class ExportEcoDeclarationEmissionsCSV(GetEcoDeclaration):
         emission_keys = list(base_response.individual.total_emissions.keys())
         fieldnames = ['begin', 'consumption'] + emission_keys
 
-        f = StringIO()
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-
-        for begin, emissions in base_response.individual.emissions.items():
-            emissions.update({
-                'begin': begin.isoformat(),
-                'consumption': base_response.individual.consumed_amount[begin],
-            })
-            writer.writerow(emissions)
-
-        response = make_response(f.getvalue())
-        response.headers['Content-type'] = 'text/csv'
-        response.headers['Content-Disposition'] = \
-            'attachment; filename=EnvironmentDeclaration-emissions.csv'
-
-        return response
+        def rows():
+            for begin, emissions in base_response.individual.emissions.items():
+                emissions.update({
+                    'begin': begin.isoformat(),
+                    'consumption': base_response.individual.consumed_amount[begin],
+                })
+                yield emissions
+
+        return stream_csv(
+            filename='EnvironmentDeclaration-emissions.csv',
+            fieldnames=fieldnames,
+            rows=rows(),
+        )
 
 
 class ExportEcoDeclarationTechnologiesCSV(GetEcoDeclaration):
@@ -185,17 +180,13 @@ class ExportEcoDeclarationTechnologiesCSV(GetEcoDeclaration):
         technologies_keys = list(base_response.individual.total_technologies.keys())
         fieldnames = ['begin'] + technologies_keys
 
-        f = StringIO()
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
+        def rows():
+            for begin, technologies in base_response.individual.technologies.items():
+                technologies.update({'begin': begin.isoformat()})
+                yield technologies
 
-        for begin, technologies in base_response.individual.technologies.items():
-            technologies.update({'begin': begin.isoformat()})
-            writer.writerow(technologies)
-
-        response = make_response(f.getvalue())
-        response.headers['Content-type'] = 'text/csv'
-        response.headers['Content-Disposition'] = \
-            'attachment; filename=EnvironmentDeclaration-technologies.csv'
-
-        return response
+        return stream_csv(
+            filename='EnvironmentDeclaration-technologies.csv',
+            fieldnames=fieldnames,
+            rows=rows(),
+        )
@@ -3,8 +3,11 @@ import marshmallow_dataclass as md
 from originexample.http import Controller
 from originexample.auth import User, requires_login
 from originexample.db import inject_session, atomic
-from originexample.technology import Technology
-from originexample.pipelines import start_consume_back_in_time_pipeline
+from originexample.technology import get_technology_index
+from originexample.pipelines import (
+    start_consume_back_in_time_pipeline,
+    get_consume_back_in_time_progress,
+)
 from originexample.services.datahub import (
     DataHubService,
     GetBeginRangeRequest,
@@ -15,6 +18,7 @@ from .queries import FacilityQuery
 from .models import (
     Facility,
     FacilityTag,
+    FacilityType,
     FacilityOrder,
     GetFacilityListRequest,
     GetFacilityListResponse,
@@ -24,6 +28,8 @@ from .models import (
     GetFilteringOptionsResponse,
     SetRetiringPriorityRequest,
     SetRetiringPriorityResponse,
+    RetireBackInTimeProgress,
+    GetRetireBackInTimeProgressResponse,
 )
 
 
@@ -129,8 +135,7 @@ class GetFilteringOptions(Controller):
         """
         rtype: list[str]
         """
-        query = session.query(Technology.technology.distinct())
-        return [row[0] for row in query.all()]
+        return get_technology_index(session).get_distinct_labels()
 
 
 class SetRetiringPriority(Controller):
@@ -149,20 +154,36 @@ class SetRetiringPriority(Controller):
         :param Session session:
         :rtype: GetFilteringOptionsResponse
         """
-        facilities = FacilityQuery(session) \
-            .belongs_to(user) \
-            .is_consumer()
+        self.set_retiring_priorities(
+            user, request.public_ids_prioritized, session)
 
-        # Initially remove priority for all facilities
-        facilities.update({Facility.retiring_priority: None})
+        return GetFilteringOptionsResponse(success=True)
 
-        # Set priorities in the order they were provided
-        for i, public_id in enumerate(request.public_ids_prioritized):
-            facilities \
-                .has_public_id(public_id) \
-                .update({Facility.retiring_priority: i})
+    def set_retiring_priorities(self, user, public_ids_prioritized, session):
+        """
+        Sets the retiring priority of the user's consuming facilities
+        in the order provided, and removes it from the remaining
+        facilities, using a single UPDATE statement.
 
-        return GetFilteringOptionsResponse(success=True)
+        :param User user:
+        :param list[str] public_ids_prioritized:
+        :param Session session:
+        """
+        session.execute("""
+            update facilities_facility
+            set retiring_priority = (
+                select max(p.ordinality) - 1
+                from unnest(cast(:public_ids as varchar[]))
+                    with ordinality as p(public_id, ordinality)
+                where p.public_id = facilities_facility.public_id
+            )
+            where facilities_facility.user_id = :user_id
+            and facilities_facility.facility_type = :facility_type
+        """, {
+            'public_ids': list(public_ids_prioritized),
+            'user_id': user.id,
+            'facility_type': FacilityType.CONSUMPTION,
+        })
 
 
 class RetireBackInTime(Controller):
@@ -202,3 +223,25 @@ class RetireBackInTime(Controller):
                 )
 
         return True
+
+
+class GetRetireBackInTimeProgress(Controller):
+    """
+    Returns the progress of the user's pipelines consuming GGOs back
+    in time (started by RetireBackInTime, or by accepting agreements).
+    """
+    Response = md.class_schema(GetRetireBackInTimeProgressResponse)
+
+    @requires_login
+    def handle_request(self, user):
+        """
+        :param User user:
+        :rtype: GetRetireBackInTimeProgressResponse
+        """
+        return GetRetireBackInTimeProgressResponse(
+            success=True,
+            progress=[
+                RetireBackInTimeProgress(**p) for p in
+                get_consume_back_in_time_progress(user)
+            ],
+        )
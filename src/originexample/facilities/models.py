@@ -1,4 +1,5 @@
 from enum import Enum
+from datetime import datetime
 
 import marshmallow
 import sqlalchemy as sa
@@ -9,7 +10,7 @@ from sqlalchemy.orm import relationship
 from dataclasses import dataclass, field
 
 from originexample.db import ModelBase
-from originexample.technology import Technology
+from originexample.technology import get_technology_index
 from originexample.settings import UNKNOWN_TECHNOLOGY_LABEL
 
 
@@ -38,7 +39,13 @@ class Facility(ModelBase):
     __tablename__ = 'facilities_facility'
     __table_args__ = (
         sa.UniqueConstraint('gsrn'),
-        sa.UniqueConstraint('user_id', 'retiring_priority'),
+        sa.UniqueConstraint('user_id', 'retiring_priority', deferrable=True, initially='IMMEDIATE'),
+
+        # Trigram indexes for searching text (see FacilityQuery.apply_filters)
+        sa.Index('ix_facilities_facility_gsrn_trgm', 'gsrn', postgresql_using='gin', postgresql_ops={'gsrn': 'gin_trgm_ops'}),
+        sa.Index('ix_facilities_facility_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        sa.Index('ix_facilities_facility_street_name_trgm', 'street_name', postgresql_using='gin', postgresql_ops={'street_name': 'gin_trgm_ops'}),
+        sa.Index('ix_facilities_facility_city_name_trgm', 'city_name', postgresql_using='gin', postgresql_ops={'city_name': 'gin_trgm_ops'}),
     )
 
     # Meta
@@ -59,16 +66,6 @@ class Facility(ModelBase):
     sector = sa.Column(sa.String(), nullable=False)
     name = sa.Column(sa.String(), nullable=False)
 
-    technology = relationship(
-        'Technology',
-        lazy='joined',
-        foreign_keys=[technology_code, fuel_code],
-        primaryjoin=sa.and_(
-            technology_code == Technology.technology_code,
-            fuel_code == Technology.fuel_code,
-        ),
-     )
-
     # Address
     street_code = sa.Column(sa.String())
     street_name = sa.Column(sa.String())
@@ -86,10 +83,33 @@ class Facility(ModelBase):
     def __repr__(self):
         return 'Facility<%s>' % self
 
+    @property
+    def technology(self):
+        """
+        Technology label, looked up in the in-process TechnologyIndex.
+
+        :rtype: str
+        """
+        return get_technology_index().get_label(
+            self.technology_code, self.fuel_code)
+
     @property
     def address(self):
         return '%s %s' % (self.street_name, self.building_number)
 
+    def set_defaults(self):
+        """
+        Sets default values for public_id and name, if not set.
+        """
+        if not self.public_id:
+            self.public_id = str(uuid4())
+        if not self.name:
+            self.name = '%s, %s %s' % (
+                self.address,
+                self.postcode,
+                self.city_name,
+            )
+
 
 class FacilityTag(ModelBase):
     """
@@ -109,16 +129,16 @@ class FacilityTag(ModelBase):
 # ----------------------------------------------------------------------------
 
 
+sa.event.listen(
+    Facility.__table__,
+    'before_create',
+    sa.DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'),
+)
+
+
 @sa.event.listens_for(Facility, 'before_insert')
 def on_before_creating_task(mapper, connect, facility):
-    if not facility.public_id:
-        facility.public_id = str(uuid4())
-    if not facility.name:
-        facility.name = '%s, %s %s' % (
-            facility.address,
-            facility.postcode,
-            facility.city_name,
-        )
+    facility.set_defaults()
 
 
 # -- Common ------------------------------------------------------------------
@@ -128,9 +148,7 @@ FacilityTechnology = NewType(
     name='FacilityTechnology',
     typ=str,
     field=marshmallow.fields.Function,
-    serialize=lambda facility: (facility.technology.technology
-                                if facility.technology
-                                else UNKNOWN_TECHNOLOGY_LABEL),
+    serialize=lambda facility: facility.technology or UNKNOWN_TECHNOLOGY_LABEL,
 )
 
 
@@ -232,3 +250,25 @@ class SetRetiringPriorityRequest:
 @dataclass
 class SetRetiringPriorityResponse:
     success: bool
+
+
+# -- GetRetireBackInTimeProgress request and response ------------------------
+
+
+@dataclass
+class RetireBackInTimeProgress:
+    begin_from: datetime = field(metadata=dict(data_key='beginFrom'))
+    begin_to: datetime = field(metadata=dict(data_key='beginTo'))
+    windows_total: int = field(metadata=dict(data_key='windowsTotal'))
+    windows_done: int = field(metadata=dict(data_key='windowsDone'))
+    windows_failed: int = field(metadata=dict(data_key='windowsFailed'))
+    completed: bool
+    failed: bool
+    started: datetime
+    updated: datetime
+
+
+@dataclass
+class GetRetireBackInTimeProgressResponse:
+    success: bool
+    progress: List[RetireBackInTimeProgress] = field(default_factory=list)
@@ -1,7 +1,7 @@
 import sqlalchemy as sa
 
 from originexample.auth import User
-from originexample.technology import Technology
+from originexample.technology import get_technology_index
 
 from .models import Facility, FacilityFilters, FacilityTag, FacilityType
 
@@ -43,11 +43,16 @@ class FacilityQuery(object):
         if filters.tags:
             q = q.filter(*[Facility.tags.any(tag=t) for t in filters.tags])
         if filters.technology:
-            q = q.filter(Facility.technology.has(Technology.technology == filters.technology))
+            codes = get_technology_index(self.session) \
+                .get_codes(filters.technology)
+            if codes:
+                q = q.filter(sa.tuple_(Facility.technology_code, Facility.fuel_code).in_(codes))
+            else:
+                q = q.filter(sa.false())
         if filters.text:
-            # SQLite doesn't support full text search, so this is the second
-            # best solution (the only?) which enables us to perform both
-            # production and test execution of this filtering option
+            # On PostgreSQL, these ILIKE predicates are served by trigram
+            # (pg_trgm) GIN indexes on each column (see Facility). Other
+            # databases (ie. SQLite) fall back to scanning the table
             q = q.filter(sa.or_(
                 Facility.gsrn.ilike('%%%s%%' % filters.text),
                 Facility.name.ilike('%%%s%%' % filters.text),
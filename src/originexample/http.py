@@ -1,9 +1,64 @@
+import csv
 import json
-from flask import request, redirect, Response
+from io import StringIO
+from flask import request, redirect, Response, stream_with_context
 from marshmallow import ValidationError
 from werkzeug.exceptions import HTTPException, BadRequest, Unauthorized
 
 
+# Streamed CSV documents are flushed to the client in chunks of this size
+CSV_CHUNK_SIZE = 64 * 1024
+
+
+def stream_csv(filename, rows, header=None, fieldnames=None, **fmtparams):
+    """
+    Returns a HTTP response which streams a CSV document to the client
+    in chunks as the rows are written, instead of building the complete
+    document in memory first. Provide "rows" as a generator to keep
+    memory usage flat regardless of the size of the document.
+
+    Rows are lists written using csv.writer, or, if "fieldnames" are
+    provided, dicts written using csv.DictWriter.
+
+    :param str filename: Filename presented to the client
+    :param collections.abc.Iterable rows: The rows to write
+    :param list header: Header row (when writing lists)
+    :param list[str] fieldnames: Header/keys (when writing dicts)
+    :param fmtparams: Formatting parameters passed on to the CSV writer
+    :rtype: flask.Response
+    """
+    def generate_chunks():
+        buffer = StringIO()
+
+        if fieldnames is not None:
+            writer = csv.DictWriter(buffer, fieldnames=fieldnames, **fmtparams)
+            writer.writeheader()
+        else:
+            writer = csv.writer(buffer, **fmtparams)
+            if header is not None:
+                writer.writerow(header)
+
+        for row in rows:
+            writer.writerow(row)
+
+            if buffer.tell() >= CSV_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell() > 0:
+            yield buffer.getvalue()
+
+    return Response(
+        status=200,
+        mimetype='text/csv',
+        response=stream_with_context(generate_chunks()),
+        headers={
+            'Content-Disposition': 'attachment; filename=%s' % filename,
+        },
+    )
+
+
 class Controller(object):
     """
     Base class for http controllers, written specifically for Flask.
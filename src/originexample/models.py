@@ -2,6 +2,7 @@ from .auth import User
 from .facilities import Facility, FacilityTag
 from .agreements import TradeAgreement
 from .technology import Technology
+from .summaries import GgoSummaryBucket, GgoSummaryEvent, GgoSummaryCompose, GgoSummarySubject
 
 
 # This is a list of all database models to include when creating
@@ -13,4 +14,8 @@ VERSIONED_DB_MODELS = (
     FacilityTag,
     TradeAgreement,
     Technology,
+    GgoSummaryBucket,
+    GgoSummaryEvent,
+    GgoSummaryCompose,
+    GgoSummarySubject,
 )
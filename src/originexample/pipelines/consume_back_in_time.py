@@ -1,31 +1,258 @@
 """
-TODO
+Consumes GGOs stored by a user back in time, ie. after a new agreement
+has been accepted, or when the user requests to retire back in time.
+
+The period is split into windows (of BACK_IN_TIME_WINDOW_HOURS), which
+are distributed across BACK_IN_TIME_CONCURRENCY lanes. Each lane is a
+chain of tasks consuming one window at a time, and starting the task for
+the next window of the lane when done, so at most BACK_IN_TIME_CONCURRENCY
+windows are in flight at once per backfill.
+
+Progress is recorded in Redis per (subject, period). A window which
+fails permanently (ie. after exhausting its retries) is recorded as
+failed, and the lane continues with its next window. Starting a backfill
+for the same period again resumes it, skipping windows already consumed
+(but retrying windows which failed).
 """
-import marshmallow_dataclass as md
-from datetime import datetime
-from celery import group
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import orm
+from celery.exceptions import Retry
 
 from originexample import logger
+from originexample.cache import redis
 from originexample.db import inject_session
+from originexample.settings import (
+    BACK_IN_TIME_WINDOW_HOURS,
+    BACK_IN_TIME_CONCURRENCY,
+)
 from originexample.tasks import celery_app
 from originexample.auth import User, UserQuery
-from originexample.consuming import GgoConsumerController
 from originexample.services.account import (
     AccountService,
-    Ggo,
-    GetGgoListRequest,
+    AccountServiceError,
     GgoFilters,
     GgoCategory,
     DateTimeRange,
 )
 
-from .handle_ggo_received import handle_ggo_received
+from .handle_measurement_published import consume_stored_ggos
 
 
-provider = GgoConsumerController()
+# Settings
+RETRY_DELAY = 10
+MAX_RETRIES = (24 * 60 * 60) / RETRY_DELAY
+PROGRESS_TTL = 7 * 24 * 60 * 60
+
 service = AccountService()
 
-ggo_schema = md.class_schema(Ggo)()
+
+class BackInTimeProgress(object):
+    """
+    Records the progress of backfills in Redis.
+
+    Each backfill (subject and period) has a hash of its details, a set
+    of the indexes of windows consumed, and a set of the indexes of
+    windows which failed. The subject has a set of the
+    keys of its backfills. A backfill is identified by a run ID, which
+    changes when it is restarted, so tasks of the previous run can
+    detect having been superseded.
+    """
+    def __init__(self, ttl):
+        """
+        :param int ttl: Seconds to keep progress for after last updated
+        """
+        self.ttl = ttl
+
+    def get_subject_key(self, subject):
+        """
+        :param str subject:
+        :rtype: str
+        """
+        return 'consume-back-in-time:%s' % subject
+
+    def get_key(self, subject, begin_from, begin_to):
+        """
+        :param str subject:
+        :param str begin_from:
+        :param str begin_to:
+        :rtype: str
+        """
+        return '%s:%s:%s' % (
+            self.get_subject_key(subject), begin_from, begin_to)
+
+    def start(self, subject, begin_from, begin_to, windows_total):
+        """
+        Starts (or resumes) a backfill, and returns its new run ID along
+        with the indexes of windows already consumed. Windows which
+        failed are attempted again. A completed backfill is started over.
+
+        :param str subject:
+        :param str begin_from:
+        :param str begin_to:
+        :param int windows_total:
+        :rtype: (str, set[int])
+        """
+        key = self.get_key(subject, begin_from, begin_to)
+        subject_key = self.get_subject_key(subject)
+        previous_total = redis.hget(key, 'windows_total')
+        done = set(int(i) for i in redis.smembers('%s:done' % key))
+
+        if previous_total is None \
+                or int(previous_total) != windows_total \
+                or len(done) >= windows_total:
+            done = set()
+
+        run = str(uuid.uuid4())
+        now = datetime.now(tz=timezone.utc).isoformat()
+
+        pipe = redis.pipeline()
+        pipe.delete('%s:done' % key)
+        pipe.delete('%s:failed' % key)
+        if done:
+            pipe.sadd('%s:done' % key, *done)
+        pipe.hset(key, mapping={
+            'run': run,
+            'begin_from': begin_from,
+            'begin_to': begin_to,
+            'windows_total': windows_total,
+            'started': now,
+            'updated': now,
+        })
+        pipe.sadd(subject_key, key)
+        pipe.expire(key, self.ttl)
+        pipe.expire('%s:done' % key, self.ttl)
+        pipe.expire(subject_key, self.ttl)
+        pipe.execute()
+
+        return run, done
+
+    def is_current(self, subject, begin_from, begin_to, run):
+        """
+        Returns whether the run has not been superseded.
+
+        :param str subject:
+        :param str begin_from:
+        :param str begin_to:
+        :param str run:
+        :rtype: bool
+        """
+        key = self.get_key(subject, begin_from, begin_to)
+        current_run = redis.hget(key, 'run')
+        return current_run is not None and current_run.decode() == run
+
+    def window_done(self, subject, begin_from, begin_to, index):
+        """
+        :param str subject:
+        :param str begin_from:
+        :param str begin_to:
+        :param int index:
+        """
+        self.add_window(subject, begin_from, begin_to, index, 'done')
+
+    def window_failed(self, subject, begin_from, begin_to, index):
+        """
+        :param str subject:
+        :param str begin_from:
+        :param str begin_to:
+        :param int index:
+        """
+        self.add_window(subject, begin_from, begin_to, index, 'failed')
+
+    def add_window(self, subject, begin_from, begin_to, index, state):
+        """
+        Adds the window to the set of windows in the provided state.
+
+        :param str subject:
+        :param str begin_from:
+        :param str begin_to:
+        :param int index:
+        :param str state: Either "done" or "failed"
+        """
+        key = self.get_key(subject, begin_from, begin_to)
+        state_key = '%s:%s' % (key, state)
+        subject_key = self.get_subject_key(subject)
+        now = datetime.now(tz=timezone.utc).isoformat()
+
+        pipe = redis.pipeline()
+        pipe.sadd(state_key, index)
+        pipe.hset(key, 'updated', now)
+        pipe.expire(key, self.ttl)
+        pipe.expire('%s:done' % key, self.ttl)
+        pipe.expire('%s:failed' % key, self.ttl)
+        pipe.expire(subject_key, self.ttl)
+        pipe.execute()
+
+    def get(self, subject):
+        """
+        Returns the progress of the subject's backfills, most recently
+        started first. A backfill has failed when all its windows have
+        been processed, but some of them failed.
+
+        :param str subject:
+        :rtype: list[dict]
+        """
+        keys = redis.smembers(self.get_subject_key(subject))
+        progress = []
+
+        for key in keys:
+            key = key.decode()
+            details = redis.hgetall(key)
+
+            if not details:
+                continue
+
+            details = {k.decode(): v.decode() for k, v in details.items()}
+            windows_total = int(details['windows_total'])
+            windows_done = redis.scard('%s:done' % key)
+            windows_failed = redis.scard('%s:failed' % key)
+
+            progress.append({
+                'begin_from': datetime.fromisoformat(details['begin_from']),
+                'begin_to': datetime.fromisoformat(details['begin_to']),
+                'windows_total': windows_total,
+                'windows_done': windows_done,
+                'windows_failed': windows_failed,
+                'completed': windows_done >= windows_total,
+                'failed': windows_failed > 0
+                          and windows_done + windows_failed >= windows_total,
+                'started': datetime.fromisoformat(details['started']),
+                'updated': datetime.fromisoformat(details['updated']),
+            })
+
+        return sorted(progress, key=lambda p: p['started'], reverse=True)
+
+
+progress = BackInTimeProgress(ttl=PROGRESS_TTL)
+
+
+def get_windows(begin_from, begin_to, window_hours):
+    """
+    Splits the period into consecutive windows of (at most) window_hours.
+
+    :param datetime begin_from:
+    :param datetime begin_to:
+    :param int window_hours:
+    :rtype: list[(datetime, datetime)]
+    """
+    size = timedelta(hours=window_hours)
+    windows = []
+    begin = begin_from
+
+    while True:
+        end = min(begin + size, begin_to)
+        windows.append((begin, end))
+        if end >= begin_to:
+            return windows
+        begin = end
+
+
+def get_consume_back_in_time_progress(user):
+    """
+    :param User user:
+    :rtype: list[dict]
+    """
+    return progress.get(user.sub)
 
 
 def start_consume_back_in_time_pipeline(user, begin_from, begin_to):
@@ -54,44 +281,187 @@ def start_consume_back_in_time_pipeline(user, begin_from, begin_to):
     task='consume_back_in_time',
     title='Consume Back in time',
 )
+def consume_back_in_time(subject, begin_from, begin_to):
+    """
+    Splits the period into windows, and starts a chain of
+    consume_back_in_time_window tasks per lane.
+
+    :param str subject:
+    :param str begin_from:
+    :param str begin_to:
+    """
+    windows = get_windows(
+        begin_from=datetime.fromisoformat(begin_from),
+        begin_to=datetime.fromisoformat(begin_to),
+        window_hours=BACK_IN_TIME_WINDOW_HOURS,
+    )
+
+    run, done = progress.start(subject, begin_from, begin_to, len(windows))
+
+    pending = [i for i in range(len(windows)) if i not in done]
+
+    for lane in range(BACK_IN_TIME_CONCURRENCY):
+        indexes = pending[lane::BACK_IN_TIME_CONCURRENCY]
+
+        if indexes:
+            consume_back_in_time_window \
+                .s(
+                    subject=subject,
+                    run=run,
+                    begin_from=begin_from,
+                    begin_to=begin_to,
+                    window_hours=BACK_IN_TIME_WINDOW_HOURS,
+                    indexes=indexes,
+                ) \
+                .apply_async()
+
+
+@celery_app.task(
+    bind=True,
+    name='consume_back_in_time.consume_back_in_time_window',
+    default_retry_delay=RETRY_DELAY,
+    max_retries=MAX_RETRIES,
+)
+@logger.wrap_task(
+    pipeline='consume_back_in_time',
+    task='consume_back_in_time_window',
+    title='Consume Back in time (window)',
+)
 @inject_session
-def consume_back_in_time(subject, begin_from, begin_to, session):
+def consume_back_in_time_window(task, subject, run, begin_from, begin_to,
+                                window_hours, indexes, session):
     """
-    TODO UNIQUE PER (ACCOUNT, BEGIN)
+    Consumes the GGOs stored in the first of the windows, and starts
+    the task for the remaining windows (of the same lane) when done,
+    or when consuming the window has failed permanently.
 
+    :param celery.Task task:
     :param str subject:
+    :param str run:
     :param str begin_from:
     :param str begin_to:
+    :param int window_hours:
+    :param list[int] indexes: Indexes of the windows to consume
+    :param Session session:
+    """
+    __log_extra = {
+        'subject': subject,
+        'begin_from': begin_from,
+        'begin_to': begin_to,
+        'window': str(indexes[0]),
+        'pipeline': 'consume_back_in_time',
+        'task': 'consume_back_in_time_window',
+    }
+
+    if not progress.is_current(subject, begin_from, begin_to, run):
+        logger.info('Back in time has been restarted, stopping...', extra=__log_extra)
+        return
+
+    window_begin, window_end = get_windows(
+        begin_from=datetime.fromisoformat(begin_from),
+        begin_to=datetime.fromisoformat(begin_to),
+        window_hours=window_hours,
+    )[indexes[0]]
+
+    # Failing permanently skips the window, but continues with the next
+    try:
+        consume_window(task, subject, window_begin, window_end, session, __log_extra)
+    except Retry:
+        raise
+    except Exception:
+        logger.exception('Failed to consume window, skipping it...', extra=__log_extra)
+        progress.window_failed(subject, begin_from, begin_to, indexes[0])
+    else:
+        progress.window_done(subject, begin_from, begin_to, indexes[0])
+
+    if indexes[1:]:
+        consume_back_in_time_window \
+            .s(
+                subject=subject,
+                run=run,
+                begin_from=begin_from,
+                begin_to=begin_to,
+                window_hours=window_hours,
+                indexes=indexes[1:],
+            ) \
+            .apply_async()
+
+
+# -- Helper functions --------------------------------------------------------
+
+
+def consume_window(task, subject, window_begin, window_end, session, log_extra):
+    """
+    Consumes the GGOs stored by the user in the window, per begin.
+    Raises Retry if the task should be retried, or any other exception
+    if consuming the window has failed permanently (including when the
+    task's retries are exhausted).
+
+    :param celery.Task task:
+    :param str subject:
+    :param datetime window_begin:
+    :param datetime window_end:
     :param Session session:
+    :param dict log_extra:
     """
-    user = UserQuery(session) \
-        .is_active() \
-        .has_sub(subject) \
-        .one()
 
+    # Get User from database
+    try:
+        user = UserQuery(session) \
+            .is_active() \
+            .has_sub(subject) \
+            .one()
+    except orm.exc.NoResultFound:
+        raise
+    except Exception as e:
+        logger.exception('Failed to load User from database, retrying...', extra=log_extra)
+        raise task.retry(exc=e)
+
+    # Get stored GGOs from AccountService, and consume them per begin
+    try:
+        stored_ggos = get_stored_ggos_per_begin(
+            user.access_token, window_begin, window_end)
+
+        consumed = all(
+            consume_stored_ggos(user, stored_ggos[begin], session)
+            for begin in sorted(stored_ggos)
+        )
+    except AccountServiceError as e:
+        if e.status_code == 400:
+            raise
+        else:
+            logger.exception('Failed to consume GGOs, retrying...', extra=log_extra)
+            raise task.retry(exc=e)
+    except Exception as e:
+        logger.exception('Failed to consume GGOs, retrying...', extra=log_extra)
+        raise task.retry(exc=e)
+
+    # Retrying consumes the window again, skipping GGOs already consumed
+    if not consumed:
+        logger.info('Could not acquire lock(s), retrying...', extra=log_extra)
+        raise task.retry()
+
+
+def get_stored_ggos_per_begin(token, begin_from, begin_to):
+    """
+    :param str token:
+    :param datetime begin_from:
+    :param datetime begin_to:
+    :returns: Mapping of begin -> GGOs stored at the begin
+    :rtype: dict[datetime, list[Ggo]]
+    """
     filters = GgoFilters(
         category=GgoCategory.STORED,
         begin_range=DateTimeRange(
-            begin=datetime.fromisoformat(begin_from),
-            end=datetime.fromisoformat(begin_to),
+            begin=begin_from,
+            end=begin_to,
         )
     )
 
-    response = service.get_ggo_list(
-        token=user.access_token,
-        request=GetGgoListRequest(
-            filters=filters,
-        ),
-    )
+    stored_ggos = {}
 
-    tasks = [
-        handle_ggo_received.s(
-            subject=user.sub,
-            ggo_json=ggo_schema.dump(ggo),
-            address=ggo.address,
-        )
-        for ggo in response.results
-    ]
+    # The list may yield the same GGO more than once (see iter_ggo_list)
+    for ggo in service.iter_ggo_list(token=token, filters=filters):
+        stored_ggos.setdefault(ggo.begin, {})[ggo.address] = ggo
 
-    if tasks:
-        group(*tasks).apply_async()
+    return {begin: list(ggos.values()) for begin, ggos in stored_ggos.items()}
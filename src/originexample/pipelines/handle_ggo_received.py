@@ -2,15 +2,25 @@
 TODO write this
 """
 import marshmallow_dataclass as md
+from functools import wraps
 from sqlalchemy import orm
+from celery.exceptions import Retry
 
 from originexample import logger
+from originexample.cache import redis
 from originexample.db import inject_session
-from originexample.tasks import celery_app, lock
+from originexample.tasks import celery_app, many_locks
 from originexample.auth import User, UserQuery
 from originexample.consuming import (
     GgoConsumerController,
     ggo_is_available,
+    get_available_addresses,
+)
+from originexample.summaries import (
+    record_ggo_composing,
+    record_ggo_composed,
+    discard_ggo_composing,
+    get_unconfirmed_composes,
 )
 from originexample.services.account import (
     Ggo,
@@ -23,6 +33,7 @@ from originexample.services.account import (
 RETRY_DELAY = 10
 MAX_RETRIES = (24 * 60 * 60) / RETRY_DELAY
 LOCK_TIMEOUT = 60 * 2
+DISPATCH_TIMEOUT = int(MAX_RETRIES * RETRY_DELAY) + 60 * 60
 
 # Services / controllers
 controller = GgoConsumerController()
@@ -32,18 +43,75 @@ account_service = AccountService()
 ggo_schema = md.class_schema(Ggo)()
 
 
+def get_dispatch_key(subject, address):
+    """
+    Returns the key which is set while the handle_ggo_received pipeline
+    is pending for a GGO, so the same GGO is not dispatched more than once
+    at a time. The key expires after DISPATCH_TIMEOUT seconds (the time
+    it takes to exhaust the retries, plus a margin) in case the task is
+    lost, and the expiry is refreshed each time the task is retried.
+
+    :param str subject:
+    :param str address:
+    :rtype: str
+    """
+    return 'handle-ggo-received:%s:%s' % (subject, address)
+
+
+def releases_dispatch_key(func):
+    """
+    Task decorator which deletes the dispatch key (see get_dispatch_key())
+    when the task completes, either successfully or by failing. The key
+    is kept while the task is being retried, and its expiry refreshed.
+    """
+    @wraps(func)
+    def releases_dispatch_key_wrapper(*args, **kwargs):
+        dispatch_key = get_dispatch_key(kwargs['subject'], kwargs['address'])
+
+        try:
+            result = func(*args, **kwargs)
+        except Retry:
+            redis.expire(dispatch_key, DISPATCH_TIMEOUT)
+            raise
+        except:
+            redis.delete(dispatch_key)
+            raise
+
+        redis.delete(dispatch_key)
+        return result
+    return releases_dispatch_key_wrapper
+
+
 def start_handle_ggo_received_pipeline(ggo, user):
     """
+    Starts the pipeline, unless it has already been started for the same
+    GGO and has not yet completed (see get_dispatch_key()).
+
     :param Ggo ggo:
     :param User user:
     """
-    handle_ggo_received \
-        .s(
-            subject=user.sub,
-            ggo_json=ggo_schema.dump(ggo),
-            address=ggo.address,
-        ) \
-        .apply_async()
+    dispatch_key = get_dispatch_key(user.sub, ggo.address)
+
+    if not redis.set(dispatch_key, 1, nx=True, ex=DISPATCH_TIMEOUT):
+        logger.info('GGO is already being handled, skipping...', extra={
+            'subject': user.sub,
+            'address': ggo.address,
+            'pipeline': 'handle_ggo_received',
+        })
+        return
+
+    try:
+        handle_ggo_received \
+            .s(
+                subject=user.sub,
+                ggo_json=ggo_schema.dump(ggo),
+                address=ggo.address,
+            ) \
+            .apply_async()
+    except:
+        # The task was never dispatched, so allow dispatching it again
+        redis.delete(dispatch_key)
+        raise
 
 
 @celery_app.task(
@@ -57,6 +125,7 @@ def start_handle_ggo_received_pipeline(ggo, user):
     pipeline='handle_ggo_received',
     task='handle_ggo_received',
 )
+@releases_dispatch_key
 @inject_session
 def handle_ggo_received(task, subject, address, ggo_json, session):
     """
@@ -88,27 +157,34 @@ def handle_ggo_received(task, subject, address, ggo_json, session):
         logger.exception('Failed to load User from database, retrying...', extra=__log_extra)
         raise task.retry(exc=e)
 
-    # Affected subjects TODO
-    # affected_subjects = controller.get_affected_subjects(user, ggo, session)
-    # lock_keys = [get_lock_key(sub, ggo.begin) for sub in affected_subjects]
+    # Get affected subjects (whose amounts are affected by consuming the GGO)
+    try:
+        affected_subjects = controller.get_affected_subjects(user, ggo, session)
+    except Exception as e:
+        logger.exception('Failed to load affected subjects from database, retrying...', extra=__log_extra)
+        raise task.retry(exc=e)
 
-    lock_key = ggo.begin.strftime('%Y-%m-%d-%H-%M')
+    lock_keys = [get_lock_key(sub, ggo.begin) for sub in affected_subjects]
 
-    # This lock is in place to avoid timing issues when executing multiple
-    # tasks for the same account at the same time, which can cause
-    # the transferred or retired amount to exceed the allowed amount
-    with lock(lock_key, timeout=LOCK_TIMEOUT) as acquired:
+    # These locks are in place to avoid timing issues when executing multiple
+    # tasks for the same account(s) at the same time, which can cause
+    # the transferred or retired amount to exceed the allowed amount.
+    # Only the affected accounts are locked, so tasks for unrelated
+    # accounts can execute in parallel for the same begin.
+    with many_locks(lock_keys, timeout=LOCK_TIMEOUT) as acquired:
         if not acquired:
             logger.info('Could not acquire lock(s), retrying...', extra=__log_extra)
             raise task.retry()
 
         try:
+            reconcile_composes(user, ggo.begin, session)
+
             if not ggo_is_available(user.access_token, ggo):
                 logger.info('GGO is unavailable, skipping...', extra=__log_extra)
                 return
 
             # Consume GGO
-            controller.consume_ggo(user, ggo, session)
+            consume_ggo(user, ggo, session)
 
         except AccountServiceError as e:
             if e.status_code == 400:
@@ -121,10 +197,80 @@ def handle_ggo_received(task, subject, address, ggo_json, session):
             raise task.retry(exc=e)
 
 
-# def get_lock_key(subject, begin):
-#     """
-#     :param str subject:
-#     :param datetime.datetime begin:
-#     :rtype: str
-#     """
-#     return '%s-%s' % (subject, begin.strftime('%Y-%m-%d-%H-%M'))
+def consume_ggo(user, ggo, session):
+    """
+    Consumes the GGO, and adds the amounts retired and transferred to
+    the summary store.
+
+    The compose is registered (and committed) before composing the GGO,
+    and confirmed after composing it. If the GGO is composed, but the
+    confirmation is never committed (ie. the task fails in between), the
+    compose is confirmed by reconcile_composes().
+
+    Must be invoked while holding the locks of the affected subjects.
+
+    :param User user:
+    :param Ggo ggo:
+    :param Session session:
+    """
+    composition = controller.get_composition(user, ggo, session)
+
+    if composition.is_empty():
+        controller.compose(user, composition)
+        return
+
+    record_ggo_composing(session, user.sub, ggo, composition.request)
+    session.commit()
+
+    try:
+        controller.compose(user, composition)
+    except AccountServiceError as e:
+        # The GGO has definitely not been composed
+        if e.status_code == 400:
+            discard_ggo_composing(session, user.sub, ggo.address)
+            session.commit()
+        raise
+
+    record_ggo_composed(session, user.sub, ggo.address)
+    session.commit()
+
+
+def reconcile_composes(user, begin, session):
+    """
+    Resolves GGOs registered as being composed by the user at the begin
+    (see consume_ggo()) which have been neither confirmed nor discarded,
+    ie. because the task composing them failed. GGOs no longer stored
+    have been composed, and are confirmed. The remaining were not
+    composed, and are discarded.
+
+    Must be invoked while holding the user's lock for the begin, so
+    composes in progress are not resolved.
+
+    :param User user:
+    :param datetime.datetime begin:
+    :param Session session:
+    """
+    addresses = get_unconfirmed_composes(session, user.sub, begin)
+
+    if not addresses:
+        return
+
+    available_addresses = get_available_addresses(
+        user.access_token, addresses)
+
+    for address in addresses:
+        if address in available_addresses:
+            discard_ggo_composing(session, user.sub, address)
+        else:
+            record_ggo_composed(session, user.sub, address)
+
+    session.commit()
+
+
+def get_lock_key(subject, begin):
+    """
+    :param str subject:
+    :param datetime.datetime begin:
+    :rtype: str
+    """
+    return '%s-%s' % (subject, begin.strftime('%Y-%m-%d-%H-%M'))
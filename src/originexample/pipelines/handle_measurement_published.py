@@ -3,25 +3,31 @@ TODO write this
 """
 import marshmallow_dataclass as md
 from datetime import datetime
-from celery import group
 from sqlalchemy import orm
 
 from originexample import logger
+from originexample.cache import redis
+from originexample.settings import MEASUREMENT_TRIGGER_DELAY
 from originexample.agreements import AgreementQuery
 from originexample.db import inject_session
 from originexample.services.datahub import Measurement
-from originexample.tasks import celery_app
+from originexample.tasks import celery_app, acquire_many_locks, extend_locks
 from originexample.auth import User, UserQuery
+from originexample.consuming import (
+    GgoConsumerController,
+    lookup_scope,
+    demand_ledger,
+    get_available_addresses,
+)
 from originexample.services.account import (
     Ggo,
     GgoFilters,
     GgoCategory,
-    GetGgoListRequest,
     AccountService,
     AccountServiceError,
 )
 
-from .handle_ggo_received import start_handle_ggo_received_pipeline
+from .handle_ggo_received import get_lock_key, consume_ggo, reconcile_composes
 
 
 # Settings
@@ -30,6 +36,7 @@ MAX_RETRIES = (24 * 60 * 60) / RETRY_DELAY
 LOCK_TIMEOUT = 2 * 60
 
 
+controller = GgoConsumerController()
 account_service = AccountService()
 
 measurement_schema = md.class_schema(Measurement)()
@@ -89,6 +96,10 @@ def handle_measurement_published(task, subject, measurement_json, session):
         logger.exception('Failed to load User from database, retrying...', extra=__log_extra)
         raise task.retry(exc=e)
 
+    # The measurement may be a correction, so the demand recorded for
+    # the subject's facilities at the begin can no longer be trusted
+    demand_ledger.invalidate(subject, measurement.begin)
+
     # Triggers handle_ggo_received for each GGO the user has stored (to retire)
     subjects.add(subject)
 
@@ -110,15 +121,34 @@ def handle_measurement_published(task, subject, measurement_json, session):
         subjects.add(agreement.user_from.sub)
 
     # Start
-    tasks = [
-        trigger_handle_ggo_received_pipeline.si(
-            subject=sub,
-            begin=measurement.begin.isoformat(),
-        )
-        for sub in subjects
-    ]
+    for sub in subjects:
+        start_trigger_handle_ggo_received_pipeline(sub, measurement.begin)
+
+
+def start_trigger_handle_ggo_received_pipeline(subject, begin):
+    """
+    Starts trigger_handle_ggo_received for the subject and begin in
+    MEASUREMENT_TRIGGER_DELAY seconds, unless it has already been started
+    (and is yet to be executed). Measurements published for the same
+    begin in the meantime (ie. by each customer of a supplier) are
+    consumed by the same task.
+
+    :param str subject:
+    :param datetime.datetime begin:
+    """
+    if MEASUREMENT_TRIGGER_DELAY > 0:
+        pending_key = get_trigger_pending_key(subject, begin)
+        pending_timeout = MEASUREMENT_TRIGGER_DELAY + LOCK_TIMEOUT
 
-    group(*tasks).apply_async()
+        if not redis.set(pending_key, 1, nx=True, ex=pending_timeout):
+            return
+
+    trigger_handle_ggo_received_pipeline \
+        .si(
+            subject=subject,
+            begin=begin.isoformat(),
+        ) \
+        .apply_async(countdown=MEASUREMENT_TRIGGER_DELAY)
 
 
 @celery_app.task(
@@ -128,13 +158,17 @@ def handle_measurement_published(task, subject, measurement_json, session):
     max_retries=MAX_RETRIES,
 )
 @logger.wrap_task(
-    title='Triggering pipeline handle_ggo_received for TradeAgreement',
+    title='Consuming stored GGOs for subject and begin',
     pipeline='handle_measurement_published',
     task='trigger_handle_ggo_received',
 )
 @inject_session
 def trigger_handle_ggo_received_pipeline(task, subject, begin, session):
     """
+    Consumes all GGOs the subject has stored at the begin in a single
+    task (instead of starting a handle_ggo_received pipeline per GGO).
+    See consume_stored_ggos().
+
     :param celery.Task task:
     :param str subject:
     :param str begin:
@@ -144,11 +178,16 @@ def trigger_handle_ggo_received_pipeline(task, subject, begin, session):
         'subject': subject,
         'begin': begin,
         'pipeline': 'handle_measurement_published',
-        'task': 'handle_measurement_published',
+        'task': 'trigger_handle_ggo_received',
     }
 
     begin_dt = datetime.fromisoformat(begin)
 
+    # Measurements published from now on must start a new task, as this
+    # task may have looked up the stored GGOs before they are received
+    if task.request.retries == 0:
+        redis.delete(get_trigger_pending_key(subject, begin_dt))
+
     # Get User from database
     try:
         user = UserQuery(session) \
@@ -163,7 +202,7 @@ def trigger_handle_ggo_received_pipeline(task, subject, begin, session):
 
     # Get stored GGOs from AccountService
     try:
-        stored_ggos = get_stored_ggos(user.access_token, begin_dt)
+        stored_ggos = list(get_stored_ggos(user.access_token, begin_dt))
     except AccountServiceError as e:
         if e.status_code == 400:
             raise
@@ -174,23 +213,98 @@ def trigger_handle_ggo_received_pipeline(task, subject, begin, session):
         logger.exception('Failed to get GGO list, retrying...', extra=__log_extra)
         raise task.retry(exc=e)
 
-    # Trigger handle_ggo_received pipeline for each stored GGO
-    for ggo in stored_ggos:
-        start_handle_ggo_received_pipeline(ggo, user)
+    if not stored_ggos:
+        return
+
+    try:
+        consumed = consume_stored_ggos(user, stored_ggos, session)
+    except AccountServiceError as e:
+        if e.status_code == 400:
+            raise
+        else:
+            logger.exception('Failed to consume GGOs, retrying...', extra=__log_extra)
+            raise task.retry(exc=e)
+    except Exception as e:
+        logger.exception('Failed to consume GGOs, retrying...', extra=__log_extra)
+        raise task.retry(exc=e)
+
+    if not consumed:
+        logger.info('Could not acquire lock(s), retrying...', extra=__log_extra)
+        raise task.retry()
 
 
 # -- Helper functions --------------------------------------------------------
 
 
+def consume_stored_ggos(user, ggos, session):
+    """
+    Consumes GGOs the user has stored at the same begin, one compose
+    per GGO.
+
+    Locks are acquired for all subjects affected by consuming any of the
+    GGOs (see handle_ggo_received for an explanation of these locks),
+    after which consumer lookups are shared across the GGOs (and updated
+    after composing each of them).
+
+    GGOs may have been consumed (by other tasks) before the locks were
+    acquired, so only those still stored are consumed.
+
+    Composing many GGOs may take longer than LOCK_TIMEOUT, so the locks
+    are extended before composing each GGO. If a lock has expired in the
+    meantime, LockNotOwnedError is raised (and the task retried), as
+    other tasks may have consumed on behalf of the affected subjects.
+
+    :param User user:
+    :param list[Ggo] ggos:
+    :param Session session:
+    :returns: Whether the locks were acquired (and the GGOs consumed)
+    :rtype: bool
+    """
+    if not ggos:
+        return True
+
+    affected_subjects = set()
+    for ggo in ggos:
+        affected_subjects.update(
+            controller.get_affected_subjects(user, ggo, session))
+
+    lock_keys = [get_lock_key(sub, ggos[0].begin) for sub in affected_subjects]
+
+    with acquire_many_locks(lock_keys, timeout=LOCK_TIMEOUT) as locks:
+        if locks is None:
+            return False
+
+        reconcile_composes(user, ggos[0].begin, session)
+
+        available_addresses = get_available_addresses(
+            user.access_token, [ggo.address for ggo in ggos])
+
+        with lookup_scope():
+            for ggo in ggos:
+                if ggo.address in available_addresses:
+                    extend_locks(locks, timeout=LOCK_TIMEOUT)
+                    consume_ggo(user, ggo, session)
+
+    return True
+
+
+def get_trigger_pending_key(subject, begin):
+    """
+    :param str subject:
+    :param datetime.datetime begin:
+    :rtype: str
+    """
+    return 'trigger-handle-ggo-received:%s:%s' % (subject, begin.isoformat())
+
+
 def get_stored_ggos(token, begin):
     """
     :param str token:
     :param datetime.datetime begin:
-    :rtype: list[Ggo]
+    :rtype: collections.abc.Iterable[Ggo]
     """
-    request = GetGgoListRequest(filters=GgoFilters(
+    filters = GgoFilters(
         begin=begin,
         category=GgoCategory.STORED,
-    ))
-    response = account_service.get_ggo_list(token, request)
-    return response.results
+    )
+    return account_service.iter_ggo_list(token, filters)
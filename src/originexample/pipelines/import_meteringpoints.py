@@ -7,6 +7,7 @@ One entrypoint exists:
 
 """
 from sqlalchemy import orm
+from sqlalchemy.dialects.postgresql import insert
 
 from originexample import logger
 from originexample.db import atomic, inject_session
@@ -118,27 +119,21 @@ def import_meteringpoints_and_insert_to_db(task, subject, session):
 @atomic
 def save_imported_meteringpoints(user, response, session):
     """
+    Inserts the imported MeteringPoints as Facilities using a single
+    bulk INSERT statement. MeteringPoints which already exists in
+    the database (by GSRN) are skipped.
+
     :param originexample.auth.User user:
     :param originexample.services.datahub.GetMeteringPointsResponse response:
     :param sqlalchemy.orm.Session session:
     :rtype: list[Facility]
     """
-    imported_facilities = []
+    if not response.meteringpoints:
+        return []
 
-    for meteringpoint in response.meteringpoints:
-        count = FacilityQuery(session) \
-            .has_gsrn(meteringpoint.gsrn) \
-            .count()
-
-        if count > 0:
-            logger.info(f'Skipping meteringpoint with GSRN: {meteringpoint.gsrn} (already exists in DB)', extra={
-                'gsrn': meteringpoint.gsrn,
-                'subject': user.sub,
-                'pipeline': 'import_meteringpoints',
-                'task': 'import_meteringpoints_and_insert_to_db',
-            })
-            continue
+    rows = []
 
+    for meteringpoint in response.meteringpoints:
         if meteringpoint.type is MeteringPointType.PRODUCTION:
             facility_type = FacilityType.PRODUCTION
         elif meteringpoint.type is MeteringPointType.CONSUMPTION:
@@ -146,8 +141,8 @@ def save_imported_meteringpoints(user, response, session):
         else:
             raise RuntimeError('Should NOT have happened!')
 
-        imported_facilities.append(Facility(
-            user=user,
+        facility = Facility(
+            user_id=user.id,
             gsrn=meteringpoint.gsrn,
             sector=meteringpoint.sector,
             facility_type=facility_type,
@@ -159,16 +154,51 @@ def save_imported_meteringpoints(user, response, session):
             city_name=meteringpoint.city_name,
             postcode=meteringpoint.postcode,
             municipality_code=meteringpoint.municipality_code,
-        ))
+        )
 
-        logger.info(f'Imported meteringpoint with GSRN: {meteringpoint.gsrn}', extra={
-            'gsrn': meteringpoint.gsrn,
-            'subject': user.sub,
-            'pipeline': 'import_meteringpoints',
-            'task': 'import_meteringpoints_and_insert_to_db',
+        # Bulk inserts bypass the ORM's "before_insert" event
+        facility.set_defaults()
+
+        rows.append({
+            'user_id': facility.user_id,
+            'public_id': facility.public_id,
+            'name': facility.name,
+            'gsrn': facility.gsrn,
+            'sector': facility.sector,
+            'facility_type': facility.facility_type,
+            'technology_code': facility.technology_code,
+            'fuel_code': facility.fuel_code,
+            'street_code': facility.street_code,
+            'street_name': facility.street_name,
+            'building_number': facility.building_number,
+            'city_name': facility.city_name,
+            'postcode': facility.postcode,
+            'municipality_code': facility.municipality_code,
         })
 
-    session.add_all(imported_facilities)
-    session.flush()
+    statement = insert(Facility.__table__) \
+        .values(rows) \
+        .on_conflict_do_nothing(index_elements=['gsrn']) \
+        .returning(Facility.__table__.c.id)
+
+    inserted_ids = [row.id for row in session.execute(statement)]
+
+    if inserted_ids:
+        imported_facilities = FacilityQuery(session) \
+            .has_any_id(inserted_ids) \
+            .all()
+    else:
+        imported_facilities = []
+
+    imported_gsrn = set(facility.gsrn for facility in imported_facilities)
+
+    for meteringpoint in response.meteringpoints:
+        if meteringpoint.gsrn not in imported_gsrn:
+            logger.info(f'Skipping meteringpoint with GSRN: {meteringpoint.gsrn} (already exists in DB)', extra={
+                'gsrn': meteringpoint.gsrn,
+                'subject': user.sub,
+                'pipeline': 'import_meteringpoints',
+                'task': 'import_meteringpoints_and_insert_to_db',
+            })
 
     return imported_facilities
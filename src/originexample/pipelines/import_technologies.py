@@ -1,10 +1,13 @@
 """
 TODO write this
 """
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+
 from originexample import logger
 from originexample.db import atomic
 from originexample.tasks import celery_app
-from originexample.technology import Technology
+from originexample.technology import Technology, invalidate_technology_index
 from originexample.services.datahub import DataHubService
 
 
@@ -31,17 +34,57 @@ def start_import_technologies():
 @atomic
 def import_technologies_and_insert_to_db(session):
     """
+    Synchronizes the Technology table with DataHubService.
+
+    Only the differences are written: new and changed technologies
+    are upserted in bulk, and technologies no longer present are
+    deleted. Nothing is written if nothing has changed.
+
     :param Session session:
     """
     response = service.get_technologies()
 
-    # Empty table
-    session.query(Technology).delete()
+    existing = {
+        (t.technology_code, t.fuel_code): t.technology
+        for t in session.query(Technology)
+    }
+
+    imported = {
+        (t.technology_code, t.fuel_code): t.technology
+        for t in response.technologies
+    }
+
+    changed = [
+        {
+            'technology': technology,
+            'technology_code': technology_code,
+            'fuel_code': fuel_code,
+        }
+        for (technology_code, fuel_code), technology in imported.items()
+        if existing.get((technology_code, fuel_code)) != technology
+    ]
 
-    # Insert imported
-    for technology in response.technologies:
-        session.add(Technology(
-            technology=technology.technology,
-            technology_code=technology.technology_code,
-            fuel_code=technology.fuel_code,
+    removed = [key for key in existing if key not in imported]
+
+    # Insert new and update changed
+    if changed:
+        statement = insert(Technology.__table__).values(changed)
+        session.execute(statement.on_conflict_do_update(
+            index_elements=['technology_code', 'fuel_code'],
+            set_={'technology': statement.excluded.technology},
         ))
+
+    # Delete removed
+    if removed:
+        session.query(Technology) \
+            .filter(sa.tuple_(Technology.technology_code, Technology.fuel_code).in_(removed)) \
+            .delete(synchronize_session=False)
+
+    # Make all processes reload their technology index
+    if changed or removed:
+        invalidate_technology_index(session)
+
+    logger.info(f'Synchronized technologies: {len(changed)} inserted/updated, {len(removed)} deleted', extra={
+        'pipeline': 'import_technologies',
+        'task': 'import_technologies_and_insert_to_db',
+    })
@@ -7,7 +7,7 @@ from celery import group
 
 from originexample import logger
 from originexample.db import inject_session, atomic
-from originexample.auth import UserQuery, AuthBackend
+from originexample.auth import UserQuery, AuthBackend, invalidate_user
 from originexample.tasks import celery_app
 
 
@@ -95,3 +95,5 @@ def refresh_token(subject, session):
     user.token_expire = datetime \
         .fromtimestamp(token['expires_at']) \
         .replace(tzinfo=timezone.utc)
+
+    invalidate_user(subject, session)
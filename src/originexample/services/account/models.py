@@ -101,6 +101,7 @@ class SummaryGrouping:
     TECHNOLOGY = 'technology'
     TECHNOLOGY_CODE = 'technologyCode'
     FUEL_CODE = 'fuelCode'
+    RETIRE_GSRN = 'retireGsrn'
 
 
 # -- Forecast ----------------------------------------------------------------
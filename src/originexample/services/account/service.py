@@ -1,16 +1,17 @@
 import json
 import marshmallow
-import requests
-import marshmallow_dataclass as md
 
 from originexample.settings import (
     PROJECT_URL,
     ACCOUNT_SERVICE_URL,
     TOKEN_HEADER,
-    DEBUG,
     WEBHOOK_SECRET,
+    GGO_LIST_PAGE_SIZE,
 )
 
+from ..schemas import get_schema
+from ..transport import transport
+from ..response_cache import response_cache
 from .models import (
     FindSuppliersRequest,
     FindSuppliersResponse,
@@ -41,6 +42,10 @@ from .models import (
 )
 
 
+# Unique ordering of GGO lists, required when paging by offset
+GGO_LIST_ORDER = ['begin', 'address']
+
+
 class AccountServiceConnectionError(Exception):
     """
     Raised when invoking DataHubService results in a connection error
@@ -62,13 +67,16 @@ class AccountService(object):
     """
     An interface to the Project Origin Account Service API.
     """
-    def invoke(self, token, path, response_schema, request=None, request_schema=None):
+    def invoke(self, token, path, response_schema, request=None, request_schema=None, timeout=None, cache_ttl=None):
         """
         :param str token:
         :param str path:
         :param obj request:
-        :param Schema request_schema:
-        :param Schema response_schema:
+        :param marshmallow.Schema request_schema:
+        :param marshmallow.Schema response_schema:
+        :param float|(float, float) timeout: Overrides the default timeout
+        :param int cache_ttl: Cache the response for this many seconds
+            (see ResponseCache), or None to not cache the response
         :rtype obj:
         """
         url = '%s%s' % (ACCOUNT_SERVICE_URL, path)
@@ -76,14 +84,20 @@ class AccountService(object):
         body = None
 
         if request and request_schema:
-            body = request_schema().dump(request)
+            body = request_schema.dump(request)
+
+        if cache_ttl:
+            generation = response_cache.get_generation(token)
+            cached_json = response_cache.get(token, url, body, generation)
+            if cached_json is not None:
+                return response_schema.load(cached_json)
 
         try:
-            response = requests.post(
+            response = transport.post(
                 url=url,
                 json=body,
                 headers=headers,
-                verify=not DEBUG,
+                timeout=timeout,
             )
         except:
             raise AccountServiceConnectionError(
@@ -101,7 +115,7 @@ class AccountService(object):
 
         try:
             response_json = response.json()
-            response_model = response_schema().load(response_json)
+            response_model = response_schema.load(response_json)
         except json.decoder.JSONDecodeError:
             raise AccountServiceError(
                 f'Failed to parse response JSON: {url}\n\n{response.content}',
@@ -115,6 +129,9 @@ class AccountService(object):
                 response_body=str(response.content),
             )
 
+        if cache_ttl:
+            response_cache.set(token, url, body, generation, response_json, cache_ttl)
+
         return response_model
 
     # -- Users and accounts --------------------------------------------------
@@ -127,7 +144,7 @@ class AccountService(object):
         return self.invoke(
             token=token,
             path='/auth/disable-user',
-            response_schema=md.class_schema(DisableUserResponse),
+            response_schema=get_schema(DisableUserResponse),
         )
 
     def find_suppliers(self, token, request):
@@ -140,8 +157,8 @@ class AccountService(object):
             token=token,
             path='/accounts/find-suppliers',
             request=request,
-            request_schema=md.class_schema(FindSuppliersRequest),
-            response_schema=md.class_schema(FindSuppliersResponse),
+            request_schema=get_schema(FindSuppliersRequest),
+            response_schema=get_schema(FindSuppliersResponse),
         )
 
     # -- GGOs ----------------------------------------------------------------
@@ -156,50 +173,130 @@ class AccountService(object):
             token=token,
             path='/ggo',
             request=request,
-            request_schema=md.class_schema(GetGgoListRequest),
-            response_schema=md.class_schema(GetGgoListResponse),
+            request_schema=get_schema(GetGgoListRequest),
+            response_schema=get_schema(GetGgoListResponse),
         )
 
-    def get_ggo_summary(self, token, request):
+    def iter_ggo_list(self, token, filters, order=None, page_size=GGO_LIST_PAGE_SIZE):
+        """
+        Iterates the GGOs matching the provided filters, requesting one
+        page of GGOs at a time, and yields them lazily. Memory usage is
+        bounded by the page size regardless of the number of GGOs, and
+        callers can start processing before the last page is fetched.
+
+        Pages are requested by offset, so results are always ordered by
+        a unique key (GGO_LIST_ORDER), following the provided order, if
+        any. Otherwise the service may return the results in a different
+        order for each page, and GGOs could be skipped or yielded twice.
+
+        The list may change while iterating (ie. stored GGOs being
+        consumed). If the total number of results shrinks between two
+        pages, the offset is moved back accordingly, and GGOs already
+        yielded on the previous page are not yielded again. This is a
+        best effort: a GGO may still be yielded more than once, and if
+        GGOs are removed and added at the same time (without the total
+        shrinking), GGOs may be skipped. Callers must tolerate both,
+        ie. by deduplicating, and by processing the list again later.
+
+        :param str token:
+        :param GgoFilters filters:
+        :param list[str] order:
+        :param int page_size:
+        :rtype: collections.abc.Iterable[Ggo]
+        """
+        order = list(order or [])
+        order.extend(key for key in GGO_LIST_ORDER if key not in order)
+
+        offset = 0
+        total = None
+        previous_page = set()
+
+        while True:
+            response = self.get_ggo_list(token, GetGgoListRequest(
+                filters=filters,
+                offset=offset,
+                limit=page_size,
+                order=order,
+            ))
+
+            if total is not None and response.total < total:
+                # Results were removed before the current offset,
+                # move the offset back and request the page again
+                offset = max(0, offset - (total - response.total))
+                total = response.total
+                continue
+
+            total = response.total
+
+            for ggo in response.results:
+                if ggo.address not in previous_page:
+                    yield ggo
+
+            previous_page = set(ggo.address for ggo in response.results)
+            offset += len(response.results)
+
+            if len(response.results) < page_size or offset >= total:
+                break
+
+    def get_ggo_summary(self, token, request, cache=False):
         """
+        If cache is True, the response is cached (see ResponseCache).
+        Must not be used where the response must be up-to-date, ie.
+        when consuming GGOs.
+
         :param str token:
         :param GetGgoSummaryRequest request:
+        :param bool cache:
         :rtype: GetGgoSummaryResponse
         """
         return self.invoke(
             token=token,
             path='/ggo/summary',
             request=request,
-            request_schema=md.class_schema(GetGgoSummaryRequest),
-            response_schema=md.class_schema(GetGgoSummaryResponse),
+            request_schema=get_schema(GetGgoSummaryRequest),
+            response_schema=get_schema(GetGgoSummaryResponse),
+            cache_ttl=response_cache.get_ttl(request.filters.begin_range) if cache else None,
         )
 
     def compose(self, token, request):
         """
+        Composes a GGO, and invalidates cached responses for the token,
+        as its GGOs (and transfers) have changed.
+
         :param str token:
         :param ComposeGgoRequest request:
         :rtype: ComposeGgoResponse
         """
-        return self.invoke(
+        response = self.invoke(
             token=token,
             path='/compose',
             request=request,
-            request_schema=md.class_schema(ComposeGgoRequest),
-            response_schema=md.class_schema(ComposeGgoResponse),
+            request_schema=get_schema(ComposeGgoRequest),
+            response_schema=get_schema(ComposeGgoResponse),
         )
 
-    def get_transfer_summary(self, token, request):
+        response_cache.invalidate(token)
+
+        return response
+
+    def get_transfer_summary(self, token, request, cache=False):
         """
+        If cache is True, the response is cached (see ResponseCache).
+        Must not be used where the response must be up-to-date, ie.
+        when consuming GGOs.
+
         :param str token:
         :param GetTransferSummaryRequest request:
+        :param bool cache:
         :rtype: GetTransferSummaryResponse
         """
         return self.invoke(
             token=token,
             path='/transfer/summary',
             request=request,
-            request_schema=md.class_schema(GetTransferSummaryRequest),
-            response_schema=md.class_schema(GetTransferSummaryResponse),
+            request_schema=get_schema(GetTransferSummaryRequest),
+            response_schema=get_schema(GetTransferSummaryResponse),
+            cache_ttl=response_cache.get_ttl(request.filters.begin_range) if cache else None,
         )
 
     def get_transferred_amount(self, token, request):
@@ -212,8 +309,8 @@ class AccountService(object):
             token=token,
             path='/transfer/get-transferred-amount',
             request=request,
-            request_schema=md.class_schema(GetTransferredAmountRequest),
-            response_schema=md.class_schema(GetTransferredAmountResponse),
+            request_schema=get_schema(GetTransferredAmountRequest),
+            response_schema=get_schema(GetTransferredAmountResponse),
         )
 
     def get_total_amount(self, token, request):
@@ -226,8 +323,8 @@ class AccountService(object):
             token=token,
             path='/ggo/get-total-amount',
             request=request,
-            request_schema=md.class_schema(GetTotalAmountRequest),
-            response_schema=md.class_schema(GetTotalAmountResponse),
+            request_schema=get_schema(GetTotalAmountRequest),
+            response_schema=get_schema(GetTotalAmountResponse),
         )
 
     def get_eco_declaration(self, token, request):
@@ -240,29 +337,30 @@ class AccountService(object):
             token=token,
             path='/eco-declaration',
             request=request,
-            request_schema=md.class_schema(GetEcoDeclarationRequest),
-            response_schema=md.class_schema(GetEcoDeclarationResponse),
+            request_schema=get_schema(GetEcoDeclarationRequest),
+            response_schema=get_schema(GetEcoDeclarationResponse),
         )
 
-    def export_eco_declaration_pdf(self, token, request):
+    def export_eco_declaration_pdf(self, token, request, timeout=None):
         """
         :param str token:
         :param GetEcoDeclarationRequest request:
+        :param float|(float, float) timeout: Overrides the default timeout
         :returns: File-like object
         """
         path = '/eco-declaration/export-pdf'
-        request_schema = md.class_schema(GetEcoDeclarationRequest)
+        request_schema = get_schema(GetEcoDeclarationRequest)
 
         url = '%s%s' % (ACCOUNT_SERVICE_URL, path)
         headers = {TOKEN_HEADER: f'Bearer {token}'}
-        body = request_schema().dump(request)
+        body = request_schema.dump(request)
 
         try:
-            response = requests.post(
+            response = transport.post(
                 url=url,
                 json=body,
                 headers=headers,
-                verify=not DEBUG,
+                timeout=timeout,
             )
         except:
             raise AccountServiceConnectionError(
@@ -292,8 +390,8 @@ class AccountService(object):
             token=token,
             path='/forecast',
             request=request,
-            request_schema=md.class_schema(GetForecastRequest),
-            response_schema=md.class_schema(GetForecastResponse),
+            request_schema=get_schema(GetForecastRequest),
+            response_schema=get_schema(GetForecastResponse),
         )
 
     def get_forecast_list(self, token, request):
@@ -306,8 +404,8 @@ class AccountService(object):
             token=token,
             path='/forecast/list',
             request=request,
-            request_schema=md.class_schema(GetForecastListRequest),
-            response_schema=md.class_schema(GetForecastListResponse),
+            request_schema=get_schema(GetForecastListRequest),
+            response_schema=get_schema(GetForecastListResponse),
         )
 
     def get_forecast_series(self, token):
@@ -318,7 +416,7 @@ class AccountService(object):
         return self.invoke(
             token=token,
             path='/forecast/series',
-            response_schema=md.class_schema(GetForecastSeriesResponse),
+            response_schema=get_schema(GetForecastSeriesResponse),
         )
 
     def submit_forecast(self, token, request):
@@ -331,8 +429,8 @@ class AccountService(object):
             token=token,
             path='/forecast/submit',
             request=request,
-            request_schema=md.class_schema(SubmitForecastRequest),
-            response_schema=md.class_schema(SubmitForecastResponse),
+            request_schema=get_schema(SubmitForecastRequest),
+            response_schema=get_schema(SubmitForecastResponse),
         )
 
     # -- Webhooks ------------------------------------------------------------
@@ -348,6 +446,6 @@ class AccountService(object):
             token=token,
             path='/webhook/on-ggo-received/subscribe',
             request=WebhookSubscribeRequest(url=callback_url, secret=WEBHOOK_SECRET),
-            request_schema=md.class_schema(WebhookSubscribeRequest),
-            response_schema=md.class_schema(WebhookSubscribeResponse),
+            request_schema=get_schema(WebhookSubscribeRequest),
+            response_schema=get_schema(WebhookSubscribeResponse),
         )
@@ -1,18 +1,18 @@
 import json
 
 import marshmallow
-import requests
-import marshmallow_dataclass as md
 
 from originexample import logger
 from originexample.settings import (
     PROJECT_URL,
     DATAHUB_SERVICE_URL,
     TOKEN_HEADER,
-    DEBUG,
     WEBHOOK_SECRET,
 )
 
+from ..schemas import get_schema
+from ..transport import transport
+from ..response_cache import response_cache
 from .models import (
     GetMeasurementRequest,
     GetMeasurementResponse,
@@ -59,13 +59,16 @@ class DataHubService(object):
     """
     An interface to the Project Origin DataHub Service API.
     """
-    def invoke(self, path, response_schema, token=None, request=None, request_schema=None):
+    def invoke(self, path, response_schema, token=None, request=None, request_schema=None, timeout=None, cache_ttl=None):
         """
         :param str path:
         :param obj request:
         :param str token:
-        :param Schema request_schema:
-        :param Schema response_schema:
+        :param marshmallow.Schema request_schema:
+        :param marshmallow.Schema response_schema:
+        :param float|(float, float) timeout: Overrides the default timeout
+        :param int cache_ttl: Cache the response for this many seconds
+            (see ResponseCache), or None to not cache the response
         :rtype obj:
         """
         url = '%s%s' % (DATAHUB_SERVICE_URL, path)
@@ -75,14 +78,20 @@ class DataHubService(object):
         if token:
             headers = {TOKEN_HEADER: f'Bearer {token}'}
         if request and request_schema:
-            body = request_schema().dump(request)
+            body = request_schema.dump(request)
+
+        if cache_ttl:
+            generation = response_cache.get_generation(token)
+            cached_json = response_cache.get(token, url, body, generation)
+            if cached_json is not None:
+                return response_schema.load(cached_json)
 
         try:
-            response = requests.post(
+            response = transport.post(
                 url=url,
                 json=body,
                 headers=headers,
-                verify=not DEBUG,
+                timeout=timeout,
             )
         except:
             raise DataHubServiceConnectionError(
@@ -100,7 +109,7 @@ class DataHubService(object):
 
         try:
             response_json = response.json()
-            response_model = response_schema().load(response_json)
+            response_model = response_schema.load(response_json)
         except json.decoder.JSONDecodeError:
             raise DataHubServiceError(
                 f'Failed to parse response JSON: {url}\n\n{response.content}',
@@ -114,6 +123,9 @@ class DataHubService(object):
                 response_body=str(response.content),
             )
 
+        if cache_ttl:
+            response_cache.set(token, url, body, generation, response_json, cache_ttl)
+
         return response_model
 
     def disable_meteringpoints(self, token):
@@ -124,7 +136,7 @@ class DataHubService(object):
         return self.invoke(
             token=token,
             path='/meteringpoints/disable',
-            response_schema=md.class_schema(DisableMeteringpointsResponse),
+            response_schema=get_schema(DisableMeteringpointsResponse),
         )
 
     def get_onboarding_url(self, token, return_url):
@@ -137,8 +149,8 @@ class DataHubService(object):
             token=token,
             path='/onboarding/get-url',
             request=GetOnboadingUrlRequest(return_url=return_url),
-            request_schema=md.class_schema(GetOnboadingUrlRequest),
-            response_schema=md.class_schema(GetOnboadingUrlResponse),
+            request_schema=get_schema(GetOnboadingUrlRequest),
+            response_schema=get_schema(GetOnboadingUrlResponse),
         )
 
     def get_meteringpoints(self, token):
@@ -149,7 +161,7 @@ class DataHubService(object):
         return self.invoke(
             token=token,
             path='/meteringpoints',
-            response_schema=md.class_schema(GetMeteringPointsResponse),
+            response_schema=get_schema(GetMeteringPointsResponse),
         )
 
     def get_measurement_list(self, token, request):
@@ -162,8 +174,8 @@ class DataHubService(object):
             token=token,
             path='/measurements',
             request=request,
-            request_schema=md.class_schema(GetMeasurementListRequest),
-            response_schema=md.class_schema(GetMeasurementListResponse),
+            request_schema=get_schema(GetMeasurementListRequest),
+            response_schema=get_schema(GetMeasurementListResponse),
         )
 
     def get_production(self, token, request):
@@ -176,8 +188,8 @@ class DataHubService(object):
             token=token,
             path='/measurements/produced',
             request=request,
-            request_schema=md.class_schema(GetMeasurementRequest),
-            response_schema=md.class_schema(GetMeasurementResponse),
+            request_schema=get_schema(GetMeasurementRequest),
+            response_schema=get_schema(GetMeasurementResponse),
         )
 
     def get_consumption(self, token, request):
@@ -190,8 +202,8 @@ class DataHubService(object):
             token=token,
             path='/measurements/consumed',
             request=request,
-            request_schema=md.class_schema(GetMeasurementRequest),
-            response_schema=md.class_schema(GetMeasurementResponse),
+            request_schema=get_schema(GetMeasurementRequest),
+            response_schema=get_schema(GetMeasurementResponse),
         )
 
     def get_measurement_begin_range(self, token, request):
@@ -204,22 +216,28 @@ class DataHubService(object):
             token=token,
             path='/measurements/begin-range',
             request=request,
-            request_schema=md.class_schema(GetBeginRangeRequest),
-            response_schema=md.class_schema(GetBeginRangeResponse),
+            request_schema=get_schema(GetBeginRangeRequest),
+            response_schema=get_schema(GetBeginRangeResponse),
         )
 
-    def get_measurement_summary(self, token, request):
+    def get_measurement_summary(self, token, request, cache=False):
         """
+        If cache is True, the response is cached (see ResponseCache).
+        Must not be used where the response must be up-to-date, ie.
+        when consuming GGOs.
+
         :param str token:
         :param GetMeasurementSummaryRequest request:
+        :param bool cache:
         :rtype: GetMeasurementSummaryResponse
         """
         return self.invoke(
             token=token,
             path='/measurements/summary',
             request=request,
-            request_schema=md.class_schema(GetMeasurementSummaryRequest),
-            response_schema=md.class_schema(GetMeasurementSummaryResponse),
+            request_schema=get_schema(GetMeasurementSummaryRequest),
+            response_schema=get_schema(GetMeasurementSummaryResponse),
+            cache_ttl=response_cache.get_ttl(request.filters.begin_range) if cache else None,
         )
 
     def get_technologies(self):
@@ -228,7 +246,7 @@ class DataHubService(object):
         """
         return self.invoke(
             path='/technologies',
-            response_schema=md.class_schema(GetTechnologiesResponse),
+            response_schema=get_schema(GetTechnologiesResponse),
         )
 
     def get_disclosure(self, request):
@@ -240,8 +258,8 @@ class DataHubService(object):
             return self.invoke(
                 path='/disclosure',
                 request=request,
-                request_schema=md.class_schema(GetDisclosureRequest),
-                response_schema=md.class_schema(GetDisclosureResponse),
+                request_schema=get_schema(GetDisclosureRequest),
+                response_schema=get_schema(GetDisclosureResponse),
             )
 
     def get_disclosure_list(self, token):
@@ -252,7 +270,7 @@ class DataHubService(object):
         return self.invoke(
             token=token,
             path='/disclosure/list',
-            response_schema=md.class_schema(GetDisclosureListResponse),
+            response_schema=get_schema(GetDisclosureListResponse),
         )
 
     def create_disclosure(self, token, request):
@@ -265,8 +283,8 @@ class DataHubService(object):
             token=token,
             path='/disclosure/create',
             request=request,
-            request_schema=md.class_schema(CreateDisclosureRequest),
-            response_schema=md.class_schema(CreateDisclosureResponse),
+            request_schema=get_schema(CreateDisclosureRequest),
+            response_schema=get_schema(CreateDisclosureResponse),
         )
 
     def delete_disclosure(self, token, request):
@@ -279,8 +297,8 @@ class DataHubService(object):
             token=token,
             path='/disclosure/delete',
             request=request,
-            request_schema=md.class_schema(DeleteDisclosureRequest),
-            response_schema=md.class_schema(DeleteDisclosureResponse),
+            request_schema=get_schema(DeleteDisclosureRequest),
+            response_schema=get_schema(DeleteDisclosureResponse),
         )
 
     def webhook_on_measurement_published_subscribe(self, token):
@@ -294,8 +312,8 @@ class DataHubService(object):
             token=token,
             path='/webhook/on-measurement-published/subscribe',
             request=WebhookSubscribeRequest(url=callback_url, secret=WEBHOOK_SECRET),
-            request_schema=md.class_schema(WebhookSubscribeRequest),
-            response_schema=md.class_schema(WebhookSubscribeResponse),
+            request_schema=get_schema(WebhookSubscribeRequest),
+            response_schema=get_schema(WebhookSubscribeResponse),
         )
 
     def webhook_on_meteringpoint_available_subscribe(self, token):
@@ -309,6 +327,6 @@ class DataHubService(object):
             token=token,
             path='/webhook/on-meteringpoint-available/subscribe',
             request=WebhookSubscribeRequest(url=callback_url, secret=WEBHOOK_SECRET),
-            request_schema=md.class_schema(WebhookSubscribeRequest),
-            response_schema=md.class_schema(WebhookSubscribeResponse),
+            request_schema=get_schema(WebhookSubscribeRequest),
+            response_schema=get_schema(WebhookSubscribeResponse),
         )
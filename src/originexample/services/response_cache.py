@@ -0,0 +1,169 @@
+import json
+import hashlib
+from datetime import datetime, timezone, timedelta
+
+from originexample.cache import redis
+from originexample.settings import (
+    SUMMARY_CACHE_TTL,
+    SUMMARY_CACHE_TTL_PAST,
+)
+
+
+class ResponseCache(object):
+    """
+    A Redis-backed cache of (raw JSON) responses from AccountService
+    and DataHubService, shared by all processes.
+
+    Responses are cached per token, and keyed by the requested URL and
+    the normalized (dumped) request body. All keys cached for a token
+    are registered in an index, so they can be invalidated at once
+    when data changes for the token's subject (see invalidate()).
+
+    Keys also include the token's generation, which is incremented when
+    invalidating. Callers must read the generation (get_generation())
+    before invoking the service, and provide it when caching the
+    response, so a response fetched before an invalidation, but cached
+    after it, is cached under a key which is never read again.
+    """
+    def __init__(self, ttl, ttl_past):
+        """
+        :param int ttl: Seconds to cache responses for (0 disables caching)
+        :param int ttl_past: Seconds to cache responses for if the requested
+            begin range is entirely in the past
+        """
+        self.ttl = ttl
+        self.ttl_past = ttl_past
+
+    def get_ttl(self, begin_range=None):
+        """
+        Returns the number of seconds to cache a response for, depending
+        on whether the requested begin range is entirely in the past.
+
+        Naive datetimes are compared with a margin of one day, as their
+        UTC offset is unknown.
+
+        :param DateTimeRange begin_range:
+        :rtype: int
+        """
+        if begin_range is None:
+            return self.ttl
+
+        end = begin_range.end
+
+        if end.tzinfo is None:
+            end_is_past = end < datetime.utcnow() - timedelta(days=1)
+        else:
+            end_is_past = end < datetime.now(tz=timezone.utc)
+
+        return self.ttl_past if end_is_past else self.ttl
+
+    def get_index_key(self, token):
+        """
+        :param str token:
+        :rtype: str
+        """
+        token_hash = hashlib.sha256(token.encode()).hexdigest()
+        return 'response-cache:%s' % token_hash
+
+    def get_generation_key(self, token):
+        """
+        :param str token:
+        :rtype: str
+        """
+        return '%s:generation' % self.get_index_key(token)
+
+    def get_generation_ttl(self):
+        """
+        Returns the number of seconds to keep a token's generation for.
+        It is refreshed whenever a response is cached, so it outlives
+        any response cached at it, and is never reset (by expiring)
+        while responses cached at a previous generation may exist.
+
+        :rtype: int
+        """
+        return 2 * max(self.ttl, self.ttl_past)
+
+    def get_generation(self, token):
+        """
+        Returns the token's current generation.
+
+        :param str token:
+        :rtype: int
+        """
+        generation = redis.get(self.get_generation_key(token))
+        return int(generation) if generation is not None else 0
+
+    def get_key(self, token, url, body, generation):
+        """
+        :param str token:
+        :param str url:
+        :param dict body:
+        :param int generation:
+        :rtype: str
+        """
+        request_hash = hashlib.sha256(
+            json.dumps([url, body, generation], sort_keys=True).encode()).hexdigest()
+        return '%s:%s' % (self.get_index_key(token), request_hash)
+
+    def get(self, token, url, body, generation):
+        """
+        Returns the cached response JSON, or None if not cached.
+
+        :param str token:
+        :param str url:
+        :param dict body:
+        :param int generation:
+        :rtype: obj
+        """
+        cached = redis.get(self.get_key(token, url, body, generation))
+
+        if cached is not None:
+            return json.loads(cached)
+
+    def set(self, token, url, body, generation, response_json, ttl):
+        """
+        :param str token:
+        :param str url:
+        :param dict body:
+        :param int generation: The token's generation before the
+            response was fetched
+        :param obj response_json:
+        :param int ttl:
+        """
+        if not ttl:
+            return
+
+        key = self.get_key(token, url, body, generation)
+        index_key = self.get_index_key(token)
+
+        pipe = redis.pipeline()
+        pipe.set(key, json.dumps(response_json), ex=ttl)
+        pipe.sadd(index_key, key)
+        pipe.expire(index_key, max(self.ttl, self.ttl_past))
+        pipe.expire(self.get_generation_key(token), self.get_generation_ttl())
+        pipe.execute()
+
+    def invalidate(self, token):
+        """
+        Invalidates all responses cached for the token, including those
+        currently being fetched, by incrementing the token's generation.
+        Responses already cached are deleted as well.
+
+        :param str token:
+        """
+        index_key = self.get_index_key(token)
+        generation_key = self.get_generation_key(token)
+
+        pipe = redis.pipeline()
+        pipe.incr(generation_key)
+        pipe.expire(generation_key, self.get_generation_ttl())
+        pipe.execute()
+
+        keys = redis.smembers(index_key)
+        redis.delete(index_key, *keys)
+
+
+response_cache = ResponseCache(
+    ttl=SUMMARY_CACHE_TTL,
+    ttl_past=SUMMARY_CACHE_TTL_PAST,
+)
@@ -0,0 +1,23 @@
+import marshmallow_dataclass as md
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_schema(clazz):
+    """
+    Returns a (shared) marshmallow schema instance for the provided
+    dataclass. The schema is built on first use and reused afterwards.
+
+    Building a schema instance is relatively expensive, as marshmallow
+    copies its declared fields upon instantiation, and nested schemas
+    (ie. a list of Ggo objects) are instantiated lazily on first use.
+    Reusing the same instance avoids paying this cost on every request
+    made to AccountService and DataHubService.
+
+    Schema instances are stateless when loading and dumping, and can
+    therefore safely be shared across threads/greenlets.
+
+    :param type clazz: The dataclass to get the schema for
+    :rtype: marshmallow.Schema
+    """
+    return md.class_schema(clazz)()
@@ -0,0 +1,90 @@
+import os
+import requests
+from requests.adapters import HTTPAdapter
+
+from originexample.settings import (
+    DEBUG,
+    SERVICE_POOL_CONNECTIONS,
+    SERVICE_POOL_MAXSIZE,
+    SERVICE_CONNECT_TIMEOUT,
+    SERVICE_READ_TIMEOUT,
+)
+
+
+class ServiceTransport(object):
+    """
+    HTTP transport shared by the service clients (AccountService and
+    DataHubService).
+
+    Keeps a pool of persistent (keep-alive) connections per host, so
+    consecutive requests reuse the same TCP/TLS connection instead of
+    performing a new handshake for each request.
+
+    The underlying requests.Session is created lazily per process, as
+    connections must not be shared across a fork(). Within a process the
+    session is shared by all threads/greenlets; urllib3's connection pool
+    is thread-safe, and greenlet-safe when running with gevent's
+    monkey patching (as both Gunicorn and Celery workers do).
+    """
+    def __init__(self, pool_connections, pool_maxsize,
+                 connect_timeout, read_timeout):
+        """
+        :param int pool_connections: Number of per-host pools to cache
+        :param int pool_maxsize: Max. number of connections to keep per host
+        :param float connect_timeout: Default connect timeout (seconds)
+        :param float read_timeout: Default read timeout (seconds)
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self._session = None
+        self._pid = None
+
+    @property
+    def session(self):
+        """
+        :rtype: requests.Session
+        """
+        if self._session is None or self._pid != os.getpid():
+            self._session = self.create_session()
+            self._pid = os.getpid()
+        return self._session
+
+    def create_session(self):
+        """
+        :rtype: requests.Session
+        """
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+        )
+
+        session = requests.Session()
+        session.verify = not DEBUG
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        return session
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        """
+        :param str url:
+        :param obj json:
+        :param dict[str, str] headers:
+        :param float|(float, float) timeout: Overrides the default timeout
+        :rtype: requests.Response
+        """
+        return self.session.post(
+            url=url,
+            json=json,
+            headers=headers,
+            timeout=timeout if timeout is not None else self.timeout,
+        )
+
+
+transport = ServiceTransport(
+    pool_connections=SERVICE_POOL_CONNECTIONS,
+    pool_maxsize=SERVICE_POOL_MAXSIZE,
+    connect_timeout=SERVICE_CONNECT_TIMEOUT,
+    read_timeout=SERVICE_READ_TIMEOUT,
+)
@@ -44,6 +44,54 @@ IDENTITY_SERVICE_EDIT_PROFILE_URL = os.environ['IDENTITY_SERVICE_EDIT_PROFILE_UR
 IDENTITY_SERVICE_EDIT_CLIENTS_URL = os.environ['IDENTITY_SERVICE_EDIT_CLIENTS_URL']
 IDENTITY_SERVICE_DISABLE_USER_URL = os.environ['IDENTITY_SERVICE_DISABLE_USER_URL']
 
+# Persistent (keep-alive) connections towards AccountService and
+# DataHubService, per worker process:
+SERVICE_POOL_CONNECTIONS = int(os.environ.get('SERVICE_POOL_CONNECTIONS', 10))
+SERVICE_POOL_MAXSIZE = int(os.environ.get('SERVICE_POOL_MAXSIZE', 100))
+
+# Timeouts (in seconds) when invoking AccountService and DataHubService:
+SERVICE_CONNECT_TIMEOUT = float(os.environ.get('SERVICE_CONNECT_TIMEOUT', 10))
+SERVICE_READ_TIMEOUT = float(os.environ.get('SERVICE_READ_TIMEOUT', 300))
+
+# Max. number of concurrent requests towards AccountService and
+# DataHubService when an endpoint fans out to multiple requests:
+SERVICE_CONCURRENCY = int(os.environ.get('SERVICE_CONCURRENCY', 6))
+
+# Number of GGOs to request per page when iterating GGO lists:
+GGO_LIST_PAGE_SIZE = int(os.environ.get('GGO_LIST_PAGE_SIZE', 1000))
+
+# Summaries (for dashboards and exports) are cached for this many seconds,
+# or SUMMARY_CACHE_TTL_PAST seconds if their begin range is entirely
+# in the past. Cached summaries are invalidated when data changes:
+SUMMARY_CACHE_TTL = int(os.environ.get('SUMMARY_CACHE_TTL', 60))
+SUMMARY_CACHE_TTL_PAST = int(os.environ.get('SUMMARY_CACHE_TTL_PAST', 3600))
+
+# Answer GGO distributions from the local summary store (which is fed by
+# webhooks) instead of AccountService, for periods the store has tracked
+# the user during (periods before are answered by AccountService):
+GGO_SUMMARY_STORE_ENABLED = os.environ.get('GGO_SUMMARY_STORE_ENABLED') in ('1', 't', 'true', 'yes')
+
+# Max. number of users to return when autocompleting users:
+AUTOCOMPLETE_USERS_LIMIT = int(os.environ.get('AUTOCOMPLETE_USERS_LIMIT', 10))
+
+# Autocomplete users from an in-process index, rebuilt every this many
+# seconds, instead of querying the database (0 disables the index):
+AUTOCOMPLETE_USERS_INDEX_TTL = int(os.environ.get('AUTOCOMPLETE_USERS_INDEX_TTL', 0))
+
+# Seconds to keep the ledger of consumers' remaining demand (per subject
+# and begin) for, before looking up demand remotely again (0 disables it):
+DEMAND_LEDGER_TTL = int(os.environ.get('DEMAND_LEDGER_TTL', 3600))
+
+# Consuming GGOs back in time is split into windows of this many hours,
+# of which at most BACK_IN_TIME_CONCURRENCY are consumed at once:
+BACK_IN_TIME_WINDOW_HOURS = int(os.environ.get('BACK_IN_TIME_WINDOW_HOURS', 24))
+BACK_IN_TIME_CONCURRENCY = int(os.environ.get('BACK_IN_TIME_CONCURRENCY', 4))
+
+# Seconds to wait before consuming GGOs after a measurement has been
+# published, so measurements published for the same subject and begin
+# meanwhile are handled together (0 consumes immediately per measurement):
+MEASUREMENT_TRIGGER_DELAY = int(os.environ.get('MEASUREMENT_TRIGGER_DELAY', 30))
+
 
 # -- webhook -----------------------------------------------------------------
 
@@ -59,6 +107,11 @@ TOKEN_HEADER = 'Authorization'
 # is less than this:
 TOKEN_REFRESH_AT = timedelta(minutes=60 * 24)
 
+# Authenticated users are cached in-process for this many seconds,
+# and at most this many users are cached per process:
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1000))
+
 HYDRA_URL = os.environ['HYDRA_URL']
 HYDRA_CLIENT_ID = os.environ['HYDRA_CLIENT_ID']
 HYDRA_CLIENT_SECRET = os.environ['HYDRA_CLIENT_SECRET']
@@ -30,6 +30,21 @@ ACCOUNT_SERVICE_LOGIN_URL = None
 IDENTITY_SERVICE_EDIT_PROFILE_URL = None
 IDENTITY_SERVICE_EDIT_CLIENTS_URL = None
 IDENTITY_SERVICE_DISABLE_USER_URL = None
+SERVICE_POOL_CONNECTIONS = 10
+SERVICE_POOL_MAXSIZE = 100
+SERVICE_CONNECT_TIMEOUT = 10
+SERVICE_READ_TIMEOUT = 300
+SERVICE_CONCURRENCY = 6
+GGO_LIST_PAGE_SIZE = 1000
+SUMMARY_CACHE_TTL = 60
+SUMMARY_CACHE_TTL_PAST = 3600
+GGO_SUMMARY_STORE_ENABLED = False
+AUTOCOMPLETE_USERS_LIMIT = 10
+AUTOCOMPLETE_USERS_INDEX_TTL = 0
+DEMAND_LEDGER_TTL = 0
+BACK_IN_TIME_WINDOW_HOURS = 24
+BACK_IN_TIME_CONCURRENCY = 4
+MEASUREMENT_TRIGGER_DELAY = 30
 
 
 # -- webhook -----------------------------------------------------------------
@@ -46,6 +61,9 @@ TOKEN_HEADER = 'Authorization'
 # is less than this:
 TOKEN_REFRESH_AT = timedelta(minutes=60 * 24)
 
+USER_CACHE_TTL = 30
+USER_CACHE_SIZE = 1000
+
 HYDRA_URL = None
 HYDRA_CLIENT_ID = None
 HYDRA_CLIENT_SECRET = None
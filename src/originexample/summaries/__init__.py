@@ -0,0 +1,16 @@
+from .models import (
+    GgoSummaryBucket,
+    GgoSummaryEvent,
+    GgoSummaryCompose,
+    GgoSummarySubject,
+    SummaryCategory,
+)
+from .store import (
+    record_ggo_received,
+    record_ggo_composing,
+    record_ggo_composed,
+    discard_ggo_composing,
+    get_unconfirmed_composes,
+    get_ggo_distributions,
+    is_tracked,
+)
@@ -0,0 +1,96 @@
+import sqlalchemy as sa
+from enum import Enum
+
+from originexample.db import ModelBase
+
+
+class SummaryCategory(Enum):
+    """
+    Categories of GGO amounts kept in the summary store.
+    """
+    ISSUED = 'issued'
+    RETIRED = 'retired'
+    INBOUND = 'inbound'
+    OUTBOUND = 'outbound'
+
+
+class GgoSummaryBucket(ModelBase):
+    """
+    The total amount of GGOs per subject, category and technology
+    for a single hour (the begin of the GGOs).
+
+    Buckets are updated incrementally as GGOs are received and composed,
+    and can be rolled up to any period in a single (indexed) query.
+    """
+    __tablename__ = 'summaries_ggo_bucket'
+    __table_args__ = (
+        sa.UniqueConstraint('subject', 'begin', 'category', 'technology'),
+    )
+
+    id = sa.Column(sa.Integer(), primary_key=True, index=True)
+    subject = sa.Column(sa.String(), nullable=False)
+    begin = sa.Column(sa.DateTime(timezone=True), nullable=False)
+    category = sa.Column(sa.Enum(SummaryCategory), nullable=False)
+    technology = sa.Column(sa.String(), nullable=False)
+    amount = sa.Column(sa.BigInteger(), nullable=False)
+
+
+class GgoSummaryEvent(ModelBase):
+    """
+    Registers that a GGO has been added to the summary store for a subject
+    and category, so the same GGO is never added twice (ie. when webhooks
+    or tasks are retried).
+    """
+    __tablename__ = 'summaries_ggo_event'
+    __table_args__ = (
+        sa.UniqueConstraint('subject', 'address', 'category'),
+    )
+
+    id = sa.Column(sa.Integer(), primary_key=True, index=True)
+    subject = sa.Column(sa.String(), nullable=False)
+    address = sa.Column(sa.String(), nullable=False)
+    category = sa.Column(sa.Enum(SummaryCategory), nullable=False)
+
+
+class GgoSummaryCompose(ModelBase):
+    """
+    Registers a GGO being composed by a subject, before composing it, so
+    the retired and transferred amounts can be added to the summary store
+    once the compose is confirmed, even if the task composing the GGO
+    fails after composing it (see reconcile_composes()).
+
+    Composing a GGO partially leaves the subject with a new GGO of the
+    remaining amount (issued to the same GSRN at the same begin). When
+    received, it is identified as the remainder of the compose using
+    remaining_amount, and registered as remainder_address, so it is not
+    counted as issued (or inbound) once again.
+    """
+    __tablename__ = 'summaries_ggo_compose'
+    __table_args__ = (
+        sa.UniqueConstraint('subject', 'address'),
+    )
+
+    id = sa.Column(sa.Integer(), primary_key=True, index=True)
+    subject = sa.Column(sa.String(), nullable=False)
+    address = sa.Column(sa.String(), nullable=False)
+    begin = sa.Column(sa.DateTime(timezone=True), nullable=False)
+    technology = sa.Column(sa.String())
+    issue_gsrn = sa.Column(sa.String())
+    retired_amount = sa.Column(sa.BigInteger(), nullable=False)
+    transferred_amount = sa.Column(sa.BigInteger(), nullable=False)
+    remaining_amount = sa.Column(sa.BigInteger(), nullable=False)
+    remainder_address = sa.Column(sa.String())
+    confirmed = sa.Column(sa.Boolean(), nullable=False, default=False)
+
+
+class GgoSummarySubject(ModelBase):
+    """
+    Registers when the summary store started tracking a subject, ie. when
+    the first GGO was added for the subject. GGOs are received after their
+    begin, so the summary store is complete for GGOs with a begin at or
+    after tracked_since, but not necessarily before.
+    """
+    __tablename__ = 'summaries_ggo_subject'
+
+    subject = sa.Column(sa.String(), primary_key=True)
+    tracked_since = sa.Column(sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now())
@@ -0,0 +1,292 @@
+import sqlalchemy as sa
+from datetime import timezone, timedelta
+from sqlalchemy.dialects.postgresql import insert
+
+from originexample.facilities import FacilityQuery
+from originexample.settings import UNKNOWN_TECHNOLOGY_LABEL
+
+from .models import (
+    GgoSummaryBucket,
+    GgoSummaryEvent,
+    GgoSummaryCompose,
+    GgoSummarySubject,
+    SummaryCategory,
+)
+
+
+def record_ggo_received(session, user, ggo):
+    """
+    Adds a GGO received by the user to the summary store, either as
+    issued (if issued to one of the user's own facilities) or inbound.
+
+    The remainder of a GGO composed by the user (see GgoSummaryCompose)
+    is not added, as the GGO it remains of has already been added.
+
+    :param Session session:
+    :param User user:
+    :param Ggo ggo:
+    """
+    if is_remainder(session, user.sub, ggo):
+        return
+
+    is_issued = ggo.issue_gsrn is not None and FacilityQuery(session) \
+        .belongs_to(user) \
+        .has_gsrn(ggo.issue_gsrn) \
+        .count() > 0
+
+    if is_issued:
+        category = SummaryCategory.ISSUED
+    else:
+        category = SummaryCategory.INBOUND
+
+    add_to_summary(session, user.sub, ggo, category, ggo.amount)
+
+
+def record_ggo_composing(session, subject, ggo, request):
+    """
+    Registers that the subject is about to compose the GGO. Must be
+    committed before composing the GGO, and confirmed afterwards using
+    record_ggo_composed() (or discarded using discard_ggo_composing()
+    if composing failed).
+
+    :param Session session:
+    :param str subject:
+    :param Ggo ggo:
+    :param ComposeGgoRequest request:
+    """
+    retired_amount = sum(r.amount for r in request.retires)
+    transferred_amount = sum(t.amount for t in request.transfers)
+
+    compose = insert(GgoSummaryCompose.__table__).values(
+        subject=subject,
+        address=ggo.address,
+        begin=ggo.begin,
+        technology=ggo.technology,
+        issue_gsrn=ggo.issue_gsrn,
+        retired_amount=retired_amount,
+        transferred_amount=transferred_amount,
+        remaining_amount=ggo.amount - retired_amount - transferred_amount,
+        confirmed=False,
+    )
+
+    session.execute(compose.on_conflict_do_update(
+        index_elements=['subject', 'address'],
+        set_={
+            'retired_amount': compose.excluded.retired_amount,
+            'transferred_amount': compose.excluded.transferred_amount,
+            'remaining_amount': compose.excluded.remaining_amount,
+        },
+    ))
+
+
+def is_remainder(session, subject, ggo):
+    """
+    Returns whether the GGO received by the subject is the remainder of
+    a GGO composed by the subject, and if so registers it as such (so the
+    same compose is not matched by another GGO).
+
+    :param Session session:
+    :param str subject:
+    :param Ggo ggo:
+    :rtype: bool
+    """
+    compose = session.query(GgoSummaryCompose) \
+        .filter(GgoSummaryCompose.subject == subject) \
+        .filter(GgoSummaryCompose.begin == ggo.begin) \
+        .filter(GgoSummaryCompose.issue_gsrn == ggo.issue_gsrn) \
+        .filter(GgoSummaryCompose.remaining_amount == ggo.amount) \
+        .filter(sa.or_(
+            GgoSummaryCompose.remainder_address.is_(None),
+            GgoSummaryCompose.remainder_address == ggo.address,
+        )) \
+        .order_by(GgoSummaryCompose.remainder_address.is_(None)) \
+        .with_for_update() \
+        .first()
+
+    if compose is None:
+        return False
+
+    compose.remainder_address = ggo.address
+    return True
+
+
+def record_ggo_composed(session, subject, address):
+    """
+    Confirms that the subject has composed the GGO (registered using
+    record_ggo_composing()), and adds the amounts retired and
+    transferred (outbound) to the summary store.
+
+    :param Session session:
+    :param str subject:
+    :param str address:
+    """
+    compose = session.query(GgoSummaryCompose) \
+        .filter(GgoSummaryCompose.subject == subject) \
+        .filter(GgoSummaryCompose.address == address) \
+        .with_for_update() \
+        .one_or_none()
+
+    if compose is None or compose.confirmed:
+        return
+
+    if compose.retired_amount > 0:
+        add_to_summary(session, subject, compose, SummaryCategory.RETIRED, compose.retired_amount)
+    if compose.transferred_amount > 0:
+        add_to_summary(session, subject, compose, SummaryCategory.OUTBOUND, compose.transferred_amount)
+
+    compose.confirmed = True
+
+
+def discard_ggo_composing(session, subject, address):
+    """
+    Discards a GGO registered using record_ggo_composing(), which was
+    not composed after all.
+
+    :param Session session:
+    :param str subject:
+    :param str address:
+    """
+    session.query(GgoSummaryCompose) \
+        .filter(GgoSummaryCompose.subject == subject) \
+        .filter(GgoSummaryCompose.address == address) \
+        .filter(GgoSummaryCompose.confirmed.is_(False)) \
+        .delete(synchronize_session=False)
+
+
+def get_unconfirmed_composes(session, subject, begin):
+    """
+    Returns the addresses of GGOs registered as being composed by the
+    subject at the begin, which have been neither confirmed nor discarded.
+
+    :param Session session:
+    :param str subject:
+    :param datetime.datetime begin:
+    :rtype: list[str]
+    """
+    rows = session.query(GgoSummaryCompose.address) \
+        .filter(GgoSummaryCompose.subject == subject) \
+        .filter(GgoSummaryCompose.begin == begin) \
+        .filter(GgoSummaryCompose.confirmed.is_(False)) \
+        .all()
+
+    return [address for address, in rows]
+
+
+def add_to_summary(session, subject, ggo, category, amount):
+    """
+    Adds an amount of the GGO to the subject's bucket for the GGO's
+    begin, category and technology. Does nothing if the GGO has already
+    been added for the subject and category.
+
+    :param Session session:
+    :param str subject:
+    :param Ggo|GgoSummaryCompose ggo:
+    :param SummaryCategory category:
+    :param int amount:
+    """
+    session.execute(
+        insert(GgoSummarySubject.__table__)
+        .values(subject=subject)
+        .on_conflict_do_nothing()
+    )
+
+    event = session.execute(
+        insert(GgoSummaryEvent.__table__)
+        .values(subject=subject, address=ggo.address, category=category)
+        .on_conflict_do_nothing()
+        .returning(GgoSummaryEvent.__table__.c.id)
+    ).first()
+
+    if event is None:
+        # GGO has already been added
+        return
+
+    bucket = insert(GgoSummaryBucket.__table__).values(
+        subject=subject,
+        begin=ggo.begin.replace(minute=0, second=0, microsecond=0),
+        category=category,
+        technology=ggo.technology or UNKNOWN_TECHNOLOGY_LABEL,
+        amount=amount,
+    )
+
+    session.execute(bucket.on_conflict_do_update(
+        index_elements=['subject', 'begin', 'category', 'technology'],
+        set_={'amount': GgoSummaryBucket.__table__.c.amount + bucket.excluded.amount},
+    ))
+
+
+def get_begin_range_bounds(begin_range, utc_offset=0):
+    """
+    Returns the (timezone-aware) begin and end of the begin range.
+
+    :param DateTimeRange begin_range: In local time
+    :param int utc_offset: Offset from UTC in hours of the begin range
+    :rtype: (datetime.datetime, datetime.datetime)
+    """
+    tz = timezone(timedelta(hours=utc_offset))
+
+    begin = begin_range.begin
+    end = begin_range.end
+
+    if begin.tzinfo is None:
+        begin = begin.replace(tzinfo=tz)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=tz)
+
+    return begin, end
+
+
+def is_tracked(session, subject, begin_range, utc_offset=0):
+    """
+    Returns whether the summary store is complete for the subject within
+    the begin range, ie. it has tracked the subject since (at least) the
+    beginning of the range. Otherwise GGOs received before the subject
+    was tracked would be missing.
+
+    :param Session session:
+    :param str subject:
+    :param DateTimeRange begin_range: In local time
+    :param int utc_offset: Offset from UTC in hours of the begin range
+    :rtype: bool
+    """
+    begin, _ = get_begin_range_bounds(begin_range, utc_offset)
+
+    tracked_since = session \
+        .query(GgoSummarySubject.tracked_since) \
+        .filter(GgoSummarySubject.subject == subject) \
+        .scalar()
+
+    return tracked_since is not None and begin >= tracked_since
+
+
+def get_ggo_distributions(session, subject, begin_range, utc_offset=0):
+    """
+    Returns the total amount per category and technology for GGOs
+    within the begin range.
+
+    :param Session session:
+    :param str subject:
+    :param DateTimeRange begin_range: In local time
+    :param int utc_offset: Offset from UTC in hours of the begin range
+    :rtype: dict[SummaryCategory, dict[str, int]]
+    """
+    begin, end = get_begin_range_bounds(begin_range, utc_offset)
+
+    rows = session \
+        .query(
+            GgoSummaryBucket.category,
+            GgoSummaryBucket.technology,
+            sa.func.sum(GgoSummaryBucket.amount),
+        ) \
+        .filter(GgoSummaryBucket.subject == subject) \
+        .filter(GgoSummaryBucket.begin >= begin) \
+        .filter(GgoSummaryBucket.begin <= end) \
+        .group_by(GgoSummaryBucket.category, GgoSummaryBucket.technology) \
+        .all()
+
+    distributions = {category: {} for category in SummaryCategory}
+
+    for category, technology, amount in rows:
+        distributions[category][technology] = int(amount)
+
+    return distributions
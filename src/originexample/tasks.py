@@ -1,7 +1,7 @@
 from celery import Celery, Task
 from celery.exceptions import Retry
 from redis.exceptions import LockNotOwnedError
-from contextlib import contextmanager
+from contextlib import contextmanager, ExitStack
 
 from originexample.settings import REDIS_BROKER_URL, REDIS_BACKEND_URL
 
@@ -25,18 +25,77 @@ def lock(key, timeout):
         yield have_lock
     finally:
         if have_lock:
-            try:
-                my_lock.release()
-            except LockNotOwnedError:
-                pass
-
-
-# @contextmanager
-# def many_locks(keys, timeout):
-#     with lock(keys[0], timeout=timeout) as acquired:
-#         if not acquired:
-#             yield False
-#         elif len(keys) == 1:
-#             yield True
-#         else:
-#             yield many_locks(keys[1:], timeout)
+            release_lock(my_lock)
+
+
+def release_lock(my_lock):
+    """
+    Releases the lock, unless it has expired (and is no longer owned).
+
+    :param redis.lock.Lock my_lock:
+    """
+    try:
+        my_lock.release()
+    except LockNotOwnedError:
+        pass
+
+
+@contextmanager
+def acquire_many_locks(keys, timeout):
+    """
+    Acquires a lock for each of the provided keys, and yields the locks,
+    or None if not all of them were acquired. If any lock could not be
+    acquired, the ones already acquired are released before yielding.
+
+    Locks are always acquired in sorted order, so two tasks locking
+    overlapping sets of keys can not deadlock each other.
+
+    The locks expire after "timeout" seconds, but can be extended using
+    extend_locks() while holding them.
+
+    :param collections.abc.Iterable[str] keys:
+    :param int timeout:
+    :rtype: list[redis.lock.Lock]
+    """
+    with ExitStack() as stack:
+        locks = []
+
+        for key in sorted(set(keys)):
+            my_lock = redis.lock(key, timeout=timeout)
+
+            if not my_lock.acquire(blocking=True, blocking_timeout=2):
+                stack.close()
+                yield None
+                return
+
+            stack.callback(release_lock, my_lock)
+            locks.append(my_lock)
+
+        yield locks
+
+
+@contextmanager
+def many_locks(keys, timeout):
+    """
+    Acquires a lock for each of the provided keys, and yields whether or
+    not all of them were acquired (see acquire_many_locks()).
+
+    :param collections.abc.Iterable[str] keys:
+    :param int timeout:
+    :rtype: bool
+    """
+    with acquire_many_locks(keys, timeout) as locks:
+        yield locks is not None
+
+
+def extend_locks(locks, timeout):
+    """
+    Resets the locks to expire in "timeout" seconds from now. Raises
+    LockNotOwnedError if any of the locks has already expired, in which
+    case it may have been acquired by someone else.
+
+    :param list[redis.lock.Lock] locks:
+    :param int timeout:
+    """
+    for my_lock in locks:
+        my_lock.extend(timeout, replace_ttl=True)
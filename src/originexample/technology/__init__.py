@@ -1 +1,6 @@
 from .models import Technology
+from .index import (
+    TechnologyIndex,
+    get_technology_index,
+    invalidate_technology_index,
+)
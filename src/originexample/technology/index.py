@@ -0,0 +1,157 @@
+import time
+import threading
+import sqlalchemy as sa
+from types import MappingProxyType
+
+from originexample.cache import redis
+from originexample.db import inject_session
+
+from .models import Technology
+
+
+# Redis key holding the current version of the Technology table
+VERSION_KEY = 'technology-version'
+
+# Check the version in Redis at most once per this many seconds
+VERSION_CHECK_INTERVAL = 10
+
+
+class TechnologyIndex(object):
+    """
+    An immutable, in-memory index of technology labels
+    by (technology_code, fuel_code), and vice versa.
+    """
+    def __init__(self, version, labels):
+        """
+        :param bytes version: Version (in Redis) the index was loaded at
+        :param dict[(str, str), str] labels: Label per (technology_code, fuel_code)
+        """
+        codes = {}
+        for key, label in labels.items():
+            codes.setdefault(label, []).append(key)
+
+        self.version = version
+        self.labels = MappingProxyType(dict(labels))
+        self.codes = MappingProxyType({k: tuple(v) for k, v in codes.items()})
+
+    def get_label(self, technology_code, fuel_code):
+        """
+        :param str technology_code:
+        :param str fuel_code:
+        :rtype: str
+        """
+        return self.labels.get((technology_code, fuel_code))
+
+    def get_codes(self, label):
+        """
+        :param str label:
+        :rtype: tuple[(str, str)]
+        """
+        return self.codes.get(label, ())
+
+    def get_distinct_labels(self):
+        """
+        :rtype: list[str]
+        """
+        return sorted(self.codes)
+
+
+class TechnologyIndexCache(object):
+    """
+    Holds the current TechnologyIndex of the process.
+
+    The index is loaded from the database on first use, and reloaded
+    when the version in Redis changes (see invalidate_technology_index()).
+    A reloaded index replaces the previous one in a single assignment,
+    so readers always see a complete index.
+    """
+    def __init__(self, check_interval):
+        """
+        :param float check_interval: Seconds between checking the version
+        """
+        self.check_interval = check_interval
+        self.index = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    def is_fresh(self):
+        """
+        :rtype: bool
+        """
+        return self.index is not None \
+            and time.monotonic() - self.checked_at < self.check_interval
+
+    def get(self, session=None):
+        """
+        :param Session session:
+        :rtype: TechnologyIndex
+        """
+        if self.is_fresh():
+            return self.index
+
+        with self.lock:
+            if self.is_fresh():
+                return self.index
+
+            version = redis.get(VERSION_KEY)
+
+            if self.index is None or self.index.version != version:
+                if session is not None:
+                    self.index = load_technology_index(version, session)
+                else:
+                    self.index = inject_session(load_technology_index)(version)
+
+            self.checked_at = time.monotonic()
+            return self.index
+
+
+def load_technology_index(version, session):
+    """
+    :param bytes version:
+    :param Session session:
+    :rtype: TechnologyIndex
+    """
+    query = session.query(
+        Technology.technology_code,
+        Technology.fuel_code,
+        Technology.technology,
+    )
+
+    return TechnologyIndex(version, {
+        (technology_code, fuel_code): technology
+        for technology_code, fuel_code, technology in query
+    })
+
+
+technology_index = TechnologyIndexCache(
+    check_interval=VERSION_CHECK_INTERVAL,
+)
+
+
+def get_technology_index(session=None):
+    """
+    Returns the current TechnologyIndex. If a session is provided, it is
+    used should the index need to be (re)loaded from the database.
+
+    :param Session session:
+    :rtype: TechnologyIndex
+    """
+    return technology_index.get(session)
+
+
+def invalidate_technology_index(session=None):
+    """
+    Makes all processes reload their TechnologyIndex.
+    Must be invoked when changing the Technology table.
+
+    If a session is provided, the invalidation happens once
+    the session is committed.
+
+    :param Session session:
+    """
+    if session is not None:
+        sa.event.listen(
+            session, 'after_commit',
+            lambda *args: invalidate_technology_index(), once=True)
+    else:
+        redis.incr(VERSION_KEY)
@@ -31,6 +31,7 @@ urls = (
     ('/facilities/get-filtering-options', facilities.GetFilteringOptions()),
     ('/facilities/set-retiring-priority', facilities.SetRetiringPriority()),
     ('/facilities/retire-back-in-time', facilities.RetireBackInTime()),
+    ('/facilities/retire-back-in-time/progress', facilities.GetRetireBackInTimeProgress()),
 
     # Agreements
     ('/agreements', agreements.GetAgreementList()),
@@ -6,6 +6,8 @@ from originexample.http import Controller
 from originexample.auth import UserQuery
 from originexample.webhooks import validate_hmac
 from originexample.services import MeasurementType
+from originexample.services.response_cache import response_cache
+from originexample.summaries import record_ggo_received
 from originexample.facilities import FacilityQuery, FacilityType, Facility
 from originexample.services.datahub import (
     MeteringPointType as DataHubMeteringPointType,
@@ -31,7 +33,7 @@ class OnGgoReceivedWebhook(Controller):
     Request = md.class_schema(OnGgoReceivedWebhookRequest)
 
     @validate_hmac
-    @inject_session
+    @atomic
     def handle_request(self, request, session):
         """
         :param OnGgoReceivedWebhookRequest request:
@@ -44,6 +46,8 @@ class OnGgoReceivedWebhook(Controller):
             .one_or_none()
 
         if user:
+            record_ggo_received(session, user, request.ggo)
+            response_cache.invalidate(user.access_token)
             start_handle_ggo_received_pipeline(request.ggo, user)
             return True
         else:
@@ -64,13 +68,15 @@ class OnMeasurementPublishedWebhook(Controller):
         :param Session session:
         :rtype: bool
         """
-        if request.measurement.type is MeasurementType.CONSUMPTION:
-            user = UserQuery(session) \
-                .is_active() \
-                .has_sub(request.sub) \
-                .one_or_none()
+        user = UserQuery(session) \
+            .is_active() \
+            .has_sub(request.sub) \
+            .one_or_none()
+
+        if user:
+            response_cache.invalidate(user.access_token)
 
-            if user:
+            if request.measurement.type is MeasurementType.CONSUMPTION:
                 start_handle_measurement_published_pipeline(
                     request.measurement, user)
 
@@ -0,0 +1,81 @@
+from unittest.mock import Mock, patch
+
+from originexample.agreements.controllers import AbstractAgreementController
+from originexample.agreements import AgreementDirection
+
+
+def __agreement(user_from, user_to, facility_gsrn=None):
+    agreement = Mock(
+        user_from=user_from,
+        user_to=user_to,
+        facility_gsrn=facility_gsrn,
+        technologies=None,
+    )
+    agreement.is_inbound_to.side_effect = lambda u: u is user_to
+    agreement.is_outbound_from.side_effect = lambda u: u is user_from
+    return agreement
+
+
+@patch('originexample.agreements.controllers.FacilityQuery')
+def test__AbstractAgreementController__map_agreements_for__should_resolve_facilities_in_one_query(facility_query_mock):
+
+    # Arrange
+    user = Mock()
+    counterpart = Mock()
+
+    facility1 = Mock(gsrn='GSRN1')
+    facility2 = Mock(gsrn='GSRN2')
+    facility3 = Mock(gsrn='GSRN3')
+
+    facility_query_mock.return_value.belongs_to.return_value \
+        .has_any_gsrn.return_value = [facility1, facility2, facility3]
+
+    agreements = [
+        __agreement(user, counterpart, ['GSRN1', 'GSRN2']),
+        __agreement(user, counterpart, ['GSRN3', 'GSRN4']),
+        __agreement(user, counterpart, None),
+        __agreement(counterpart, user, ['GSRN5']),
+    ]
+
+    uut = AbstractAgreementController()
+
+    # Act
+    mapped = uut.map_agreements_for(user, agreements, Mock())
+
+    # Assert
+    assert facility_query_mock.call_count == 1
+    facility_query_mock.return_value.belongs_to.assert_called_once_with(user)
+
+    has_any_gsrn = facility_query_mock.return_value.belongs_to.return_value.has_any_gsrn
+    assert sorted(has_any_gsrn.call_args[0][0]) == ['GSRN1', 'GSRN2', 'GSRN3', 'GSRN4']
+
+    assert [m.direction for m in mapped] == [
+        AgreementDirection.OUTBOUND,
+        AgreementDirection.OUTBOUND,
+        AgreementDirection.OUTBOUND,
+        AgreementDirection.INBOUND,
+    ]
+    assert mapped[0].facilities == [facility1, facility2]
+    assert mapped[1].facilities == [facility3]
+    assert mapped[2].facilities == []
+
+
+@patch('originexample.agreements.controllers.FacilityQuery')
+def test__AbstractAgreementController__map_agreements_for__no_facilities__should_not_query_facilities(facility_query_mock):
+
+    # Arrange
+    user = Mock()
+    counterpart = Mock()
+
+    agreements = [
+        __agreement(user, counterpart, None),
+        __agreement(counterpart, user, ['GSRN1']),
+    ]
+
+    uut = AbstractAgreementController()
+
+    # Act
+    uut.map_agreements_for(user, agreements, Mock())
+
+    # Assert
+    facility_query_mock.assert_not_called()
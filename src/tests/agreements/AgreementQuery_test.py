@@ -2,7 +2,7 @@ import pytz
 import pytest
 from itertools import product
 from unittest.mock import Mock
-from datetime import datetime, timezone, date
+from datetime import datetime, timezone, date, timedelta
 
 from originexample.common import Unit
 from originexample.auth import User
@@ -368,3 +368,67 @@ def test__AgreementQuery__is_elibigle_to_trade__ggo_date_is_outside_agreements__
 
     # Assert
     assert query.count() == 0
+
+
+def test__AgreementQuery__is_pending_accepted_or_closed_recently__returns_pending_and_accepted_agreements(seeded_session):
+
+    query = AgreementQuery(seeded_session) \
+        .is_pending_accepted_or_closed_recently()
+
+    # Seeded agreements are neither cancelled nor declined recently
+    assert query.count() > 0
+    assert query.count() == AgreementQuery(seeded_session).is_pending().count() \
+        + AgreementQuery(seeded_session).is_accepted().count()
+    assert all(ag.state in (AgreementState.PENDING, AgreementState.ACCEPTED) for ag in query.all())
+
+
+def test__AgreementQuery__is_pending_accepted_or_closed_recently__returns_agreements_cancelled_or_declined_recently(seeded_session):
+
+    # Arrange
+    now = datetime.now(tz=timezone.utc)
+
+    closed = (
+        # (public_id, state, cancelled, declined)
+        ('cancelled-recently', AgreementState.CANCELLED, now - timedelta(days=1), None),
+        ('cancelled-long-ago', AgreementState.CANCELLED, now - timedelta(days=30), None),
+        ('declined-recently', AgreementState.DECLINED, None, now - timedelta(days=1)),
+        ('declined-long-ago', AgreementState.DECLINED, None, now - timedelta(days=30)),
+    )
+
+    for i, (public_id, state, cancelled, declined) in enumerate(closed, start=10001):
+        seeded_session.add(TradeAgreement(
+            id=i,
+            public_id=public_id,
+            user_proposed_id=user1.id,
+            user_from_id=user1.id,
+            user_to_id=user2.id,
+            state=state,
+            cancelled=cancelled,
+            declined=declined,
+            date_from=date(2020, 1, 1),
+            date_to=date(2020, 1, 31),
+            amount=100,
+            unit=Unit.Wh,
+            reference='some-reference',
+        ))
+
+    # Not committed, so the agreements are not visible to other tests
+    seeded_session.flush()
+
+    try:
+
+        # Act
+        query = AgreementQuery(seeded_session) \
+            .is_pending_accepted_or_closed_recently()
+
+        # Assert
+        public_ids = [ag.public_id for ag in query.all()]
+
+        assert 'cancelled-recently' in public_ids
+        assert 'declined-recently' in public_ids
+        assert 'cancelled-long-ago' not in public_ids
+        assert 'declined-long-ago' not in public_ids
+        assert query.count() == AgreementQuery(seeded_session).is_pending().count() \
+            + AgreementQuery(seeded_session).is_accepted().count() + 2
+    finally:
+        seeded_session.rollback()
@@ -0,0 +1,77 @@
+from unittest.mock import Mock, patch
+from datetime import datetime, timezone
+
+from originexample.agreements import AgreementState
+from originexample.agreements.controllers import GetAgreementList
+
+
+def __agreement(public_id, state, user_proposed_id, user_from_id, user_to_id,
+                transfer_priority=None, cancelled=None, declined=None):
+    return Mock(
+        public_id=public_id,
+        state=state,
+        user_proposed_id=user_proposed_id,
+        user_from_id=user_from_id,
+        user_to_id=user_to_id,
+        transfer_priority=transfer_priority,
+        cancelled=cancelled,
+        declined=declined,
+    )
+
+
+@patch('originexample.db.make_session')
+@patch('originexample.auth.decorators.get_token')
+@patch('originexample.auth.decorators.get_user')
+@patch('originexample.agreements.controllers.AgreementQuery')
+def test__GetAgreementList__handle_request__should_partition_and_sort_agreements(
+        agreement_query_mock, get_user_mock, get_token_mock, make_session_mock):
+
+    # Arrange
+    user = Mock(id=1)
+    get_user_mock.return_value = user
+
+    agreements = [
+        # Pending, proposed by the user or by the counterpart
+        __agreement('sent', AgreementState.PENDING, 1, 1, 2),
+        __agreement('pending', AgreementState.PENDING, 2, 2, 1),
+
+        # Accepted, inbound to or outbound from the user
+        __agreement('inbound', AgreementState.ACCEPTED, 2, 2, 1),
+        __agreement('outbound-none', AgreementState.ACCEPTED, 1, 1, 2, transfer_priority=None),
+        __agreement('outbound-1', AgreementState.ACCEPTED, 1, 1, 3, transfer_priority=1),
+        __agreement('outbound-0', AgreementState.ACCEPTED, 2, 1, 2, transfer_priority=0),
+
+        # Cancelled and declined
+        __agreement('cancelled-old', AgreementState.CANCELLED, 1, 1, 2,
+                    cancelled=datetime(2020, 1, 1, tzinfo=timezone.utc)),
+        __agreement('cancelled-new', AgreementState.CANCELLED, 1, 2, 1,
+                    cancelled=datetime(2020, 1, 2, tzinfo=timezone.utc)),
+        __agreement('declined-old', AgreementState.DECLINED, 1, 1, 2,
+                    declined=datetime(2020, 1, 1, tzinfo=timezone.utc)),
+        __agreement('declined-new', AgreementState.DECLINED, 2, 2, 1,
+                    declined=datetime(2020, 1, 2, tzinfo=timezone.utc)),
+    ]
+
+    agreement_query_mock.return_value \
+        .belongs_to.return_value \
+        .is_pending_accepted_or_closed_recently.return_value \
+        .order_by.return_value \
+        .all.return_value = agreements
+
+    uut = GetAgreementList()
+    uut.map_agreements_for = Mock(side_effect=lambda u, ags, s: [a.public_id for a in ags])
+
+    # Act
+    response = uut.handle_request()
+
+    # Assert
+    agreement_query_mock.return_value.belongs_to.assert_called_once_with(user)
+    uut.map_agreements_for.assert_called_once()
+
+    assert response.success is True
+    assert response.sent == ['sent']
+    assert response.pending == ['pending']
+    assert response.inbound == ['inbound']
+    assert response.outbound == ['outbound-0', 'outbound-1', 'outbound-none']
+    assert response.cancelled == ['cancelled-new', 'cancelled-old']
+    assert response.declined == ['declined-new', 'declined-old']
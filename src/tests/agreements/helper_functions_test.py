@@ -0,0 +1,82 @@
+from datetime import date, datetime
+
+from originexample.auth import User
+from originexample.common import Unit
+from originexample.agreements import TradeAgreement, AgreementState
+from originexample.agreements.helpers import set_transfer_priorities
+
+
+user1 = User(
+    id=1,
+    sub='28a7240c-088e-4659-bd66-d76afb8c762f',
+    name='User 1',
+    company='Company 1',
+    email='user1@email.com',
+    phone='11111111',
+    access_token='access_token',
+    refresh_token='access_token',
+    token_expire=datetime(2030, 1, 1, 0, 0, 0),
+)
+
+user2 = User(
+    id=2,
+    sub='972cfd2e-cbd3-42e6-8e0e-c0c5c502f25f',
+    name='User 2',
+    company='Company 2',
+    email='user2@email.com',
+    phone='22222222',
+    access_token='access_token',
+    refresh_token='access_token',
+    token_expire=datetime(2030, 1, 1, 0, 0, 0),
+)
+
+
+def __agreement(id, user_from, user_to, state, transfer_priority):
+    return TradeAgreement(
+        id=id,
+        public_id=str(id),
+        user_proposed=user_from,
+        user_from=user_from,
+        user_to=user_to,
+        state=state,
+        date_from=date(2020, 1, 1),
+        date_to=date(2020, 12, 31),
+        amount=100,
+        unit=Unit.Wh,
+        reference='some-reference',
+        transfer_priority=transfer_priority,
+    )
+
+
+def test__set_transfer_priorities__should_set_priorities_in_provided_order_followed_by_remaining(session):
+
+    # Arrange
+    session.add(user1)
+    session.add(user2)
+    session.add(__agreement(1, user1, user2, AgreementState.ACCEPTED, 0))
+    session.add(__agreement(2, user1, user2, AgreementState.ACCEPTED, 1))
+    session.add(__agreement(3, user1, user2, AgreementState.ACCEPTED, 2))
+    session.add(__agreement(4, user1, user2, AgreementState.ACCEPTED, 3))
+    session.add(__agreement(5, user1, user2, AgreementState.PENDING, None))
+    session.add(__agreement(6, user2, user1, AgreementState.ACCEPTED, 0))
+    session.commit()
+
+    # Act
+    set_transfer_priorities(user1, ['3', '1', 'unknown'], session)
+    session.commit()
+
+    # Assert
+    session.expire_all()
+    priorities = {
+        a.public_id: a.transfer_priority
+        for a in session.query(TradeAgreement)
+    }
+
+    assert priorities == {
+        '3': 0,
+        '1': 1,
+        '2': 2,
+        '4': 3,
+        '5': None,
+        '6': 0,
+    }
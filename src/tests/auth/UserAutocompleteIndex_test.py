@@ -0,0 +1,62 @@
+from unittest.mock import Mock, patch
+
+from originexample.auth.autocomplete import (
+    UserAutocompleteIndex,
+    UserAutocompleteIndexCache,
+)
+
+
+def __user(sub, name, company):
+    user = Mock(sub=sub, company=company)
+    user.name = name
+    return user
+
+
+def test__UserAutocompleteIndex__search__should_match_name_and_company_prefix_case_insensitive():
+    user1 = __user('1', 'Alice', 'Energinet')
+    user2 = __user('2', 'Bob', 'Alpha Energy')
+    user3 = __user('3', 'Charlie', 'Wind Inc.')
+    uut = UserAutocompleteIndex([user3, user2, user1])
+
+    assert uut.search('al') == [user1, user2]
+    assert uut.search('ENERGI') == [user1]
+    assert uut.search('wind i') == [user3]
+    assert uut.search('x') == []
+    assert uut.search('') == [user1, user2, user3]
+
+
+def test__UserAutocompleteIndex__search__should_exclude_sub_and_limit_results():
+    user1 = __user('1', 'Alice', 'Acme')
+    user2 = __user('2', 'Anna', 'Acme')
+    user3 = __user('3', 'Arne', 'Acme')
+    uut = UserAutocompleteIndex([user1, user2, user3])
+
+    assert uut.search('a', exclude_sub='1') == [user2, user3]
+    assert uut.search('a', limit=2) == [user1, user2]
+    assert uut.search('a', exclude_sub='2', limit=1) == [user1]
+
+
+def test__UserAutocompleteIndex__search__user_matching_name_and_company__should_only_be_returned_once():
+    user1 = __user('1', 'Acme', 'Acme')
+    uut = UserAutocompleteIndex([user1])
+
+    assert uut.search('acm') == [user1]
+
+
+@patch('originexample.auth.autocomplete.build_user_autocomplete_index')
+@patch('originexample.auth.autocomplete.time.monotonic')
+def test__UserAutocompleteIndexCache__get__should_rebuild_when_ttl_expires(monotonic_mock, build_mock):
+    index1 = Mock()
+    index2 = Mock()
+    build_mock.side_effect = [index1, index2]
+    uut = UserAutocompleteIndexCache(ttl=60)
+
+    monotonic_mock.return_value = 100
+    assert uut.get() is index1
+    monotonic_mock.return_value = 159
+    assert uut.get() is index1
+    assert build_mock.call_count == 1
+
+    monotonic_mock.return_value = 160
+    assert uut.get() is index2
+    assert build_mock.call_count == 2
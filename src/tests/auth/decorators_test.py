@@ -0,0 +1,101 @@
+from unittest.mock import Mock, patch
+
+from originexample.auth import User
+from originexample.auth.decorators import (
+    get_user,
+    invalidate_user,
+    user_cache,
+)
+
+
+def __redis_mock(values):
+    """
+    Returns a mock of the Redis client with the provided key/values.
+    """
+    redis_mock = Mock()
+    redis_mock.get.side_effect = lambda key: values.get(key)
+    redis_mock.mget.side_effect = lambda *keys: [values.get(k) for k in keys]
+    return redis_mock
+
+
+def setup_function():
+    user_cache.clear()
+
+
+def __user():
+    return User(id=1, sub='SUB', name='NAME', company='COMPANY')
+
+
+@patch('originexample.auth.decorators.UserQuery')
+@patch('originexample.db.make_session')
+def test__get_user__called_twice__should_only_query_database_once(make_session_mock, user_query_mock):
+
+    # Arrange
+    user_query_mock.return_value.is_active.return_value.has_sub.return_value \
+        .one_or_none.return_value = __user()
+
+    redis_mock = __redis_mock({'TOKEN': b'SUB'})
+
+    # Act
+    with patch('originexample.auth.decorators.redis', new=redis_mock):
+        user1 = get_user('TOKEN')
+        user2 = get_user('TOKEN')
+
+    # Assert
+    assert user_query_mock.call_count == 1
+    assert user1.sub == user2.sub == 'SUB'
+    assert user1.name == user2.name == 'NAME'
+    assert user1 is not user2
+
+
+@patch('originexample.auth.decorators.UserQuery')
+@patch('originexample.db.make_session')
+def test__get_user__user_invalidated__should_query_database_again(make_session_mock, user_query_mock):
+
+    # Arrange
+    user_query_mock.return_value.is_active.return_value.has_sub.return_value \
+        .one_or_none.return_value = __user()
+
+    values = {'TOKEN': b'SUB'}
+    redis_mock = __redis_mock(values)
+
+    # Act
+    with patch('originexample.auth.decorators.redis', new=redis_mock):
+        get_user('TOKEN')
+        values['user-generation:SUB'] = b'1'
+        get_user('TOKEN')
+
+    # Assert
+    assert user_query_mock.call_count == 2
+
+
+@patch('originexample.auth.decorators.UserQuery')
+@patch('originexample.db.make_session')
+def test__get_user__token_expired__should_return_none(make_session_mock, user_query_mock):
+
+    # Arrange
+    user_query_mock.return_value.is_active.return_value.has_sub.return_value \
+        .one_or_none.return_value = __user()
+
+    values = {'TOKEN': b'SUB'}
+    redis_mock = __redis_mock(values)
+
+    # Act
+    with patch('originexample.auth.decorators.redis', new=redis_mock):
+        get_user('TOKEN')
+        del values['TOKEN']
+        user = get_user('TOKEN')
+
+    # Assert
+    assert user is None
+    assert user_query_mock.call_count == 1
+
+
+@patch('originexample.auth.decorators.redis')
+def test__invalidate_user__without_session__should_increment_generation(redis_mock):
+
+    # Act
+    invalidate_user('SUB')
+
+    # Assert
+    redis_mock.incr.assert_called_once_with('user-generation:SUB')
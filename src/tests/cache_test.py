@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+from originexample.cache import LocalCache
+
+
+@patch('originexample.cache.time.monotonic')
+def test__LocalCache__get__should_return_value_until_expired(monotonic_mock):
+
+    # Arrange
+    uut = LocalCache(maxsize=10, ttl=30)
+
+    monotonic_mock.return_value = 100
+    uut.set('key', 'value')
+
+    # Act + Assert
+    monotonic_mock.return_value = 129
+    assert uut.get('key') == 'value'
+
+    monotonic_mock.return_value = 130
+    assert uut.get('key') is None
+
+
+def test__LocalCache__get__key_not_cached__should_return_none():
+    uut = LocalCache(maxsize=10, ttl=30)
+
+    assert uut.get('key') is None
+
+
+def test__LocalCache__set__cache_is_full__should_evict_least_recently_used():
+
+    # Arrange
+    uut = LocalCache(maxsize=2, ttl=30)
+    uut.set('a', 1)
+    uut.set('b', 2)
+    uut.get('a')
+
+    # Act
+    uut.set('c', 3)
+
+    # Assert
+    assert uut.get('a') == 1
+    assert uut.get('b') is None
+    assert uut.get('c') == 3
+
+
+def test__LocalCache__delete__should_remove_entry():
+
+    # Arrange
+    uut = LocalCache(maxsize=10, ttl=30)
+    uut.set('key', 'value')
+
+    # Act
+    uut.delete('key')
+    uut.delete('unknown-key')
+
+    # Assert
+    assert uut.get('key') is None
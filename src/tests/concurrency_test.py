@@ -0,0 +1,54 @@
+import pytest
+import gevent
+
+from originexample.concurrency import run_concurrently
+
+
+def test__run_concurrently__should_return_results_in_order():
+
+    def __func(value, sleep):
+        def __inner():
+            gevent.sleep(sleep)
+            return value
+        return __inner
+
+    # Act
+    results = run_concurrently(
+        __func(1, 0.03),
+        __func(2, 0.01),
+        __func(3, 0.02),
+    )
+
+    # Assert
+    assert results == [1, 2, 3]
+
+
+def test__run_concurrently__no_functions__should_return_empty_list():
+    assert run_concurrently() == []
+
+
+def test__run_concurrently__should_not_exceed_concurrency():
+    running = []
+    max_running = []
+
+    def __func():
+        running.append(1)
+        max_running.append(len(running))
+        gevent.sleep(0.01)
+        running.pop()
+
+    # Act
+    run_concurrently(*[__func] * 10, concurrency=3)
+
+    # Assert
+    assert max(max_running) == 3
+
+
+def test__run_concurrently__function_raises__should_raise_exception():
+
+    def __raise():
+        raise ValueError('Something went wrong')
+
+    # Act + Assert
+    with pytest.raises(ValueError):
+        run_concurrently(lambda: 1, __raise)
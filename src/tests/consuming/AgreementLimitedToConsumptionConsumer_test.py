@@ -2,12 +2,16 @@ import pytest
 from unittest.mock import Mock, patch
 from datetime import timezone, datetime
 
-from originexample.consuming.consumers import AgreementLimitedToConsumptionConsumer
+from originexample.consuming import lookup_scope
+from originexample.consuming.consumers import (
+    AgreementConsumer,
+    AgreementLimitedToConsumptionConsumer,
+)
 
 
-@patch('originexample.consuming.consumers.get_consumption')
+@patch('originexample.consuming.consumers.get_consumptions')
 @patch('originexample.consuming.consumers.get_transferred_amount')
-@patch('originexample.consuming.consumers.get_retired_amount')
+@patch('originexample.consuming.consumers.get_retired_amounts')
 @patch('originexample.consuming.consumers.get_stored_amount')
 @pytest.mark.parametrize(
     'ggo_amount, agreement_amount, transferred_amount, retired_amount, stored_amount, measured_amount, expected_amount, already_transferred_amount', (
@@ -36,27 +40,34 @@ from originexample.consuming.consumers import AgreementLimitedToConsumptionConsu
     (200,        100,              10,                 20,             20,            50,              0,               40),
 ))
 def test__AgreementLimitedToConsumptionConsumer__get_desired_amount__should_return_correct_amount(
-        get_stored_amount_mock, get_retired_amount_mock, get_transferred_amount_mock, get_consumption_mock,
+        get_stored_amount_mock, get_retired_amounts_mock, get_transferred_amount_mock, get_consumptions_mock,
         ggo_amount, agreement_amount, transferred_amount, retired_amount, stored_amount,
         measured_amount, expected_amount, already_transferred_amount):
 
     begin = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
     agreement = Mock(public_id='PUBLIC_ID', calculated_amount=agreement_amount, amount_percent=0)
     ggo = Mock(begin=begin, amount=ggo_amount)
-    facility1 = Mock(gsrn='GSRN1')
-    facility2 = Mock(gsrn='GSRN2')
+    facility1 = Mock(gsrn='GSRN1', user=agreement.user_to)
+    facility2 = Mock(gsrn='GSRN2', user=agreement.user_to)
     facilities = [facility1, facility2]
 
     get_transferred_amount_mock.return_value = transferred_amount
-    get_retired_amount_mock.return_value = retired_amount / len(facilities)
     get_stored_amount_mock.return_value = stored_amount
 
     if measured_amount is None:
-        measurement = None
-        get_consumption_mock.return_value = None
+        measurements = {}
+        get_consumptions_mock.side_effect = lambda token, gsrns, begin: \
+            {gsrn: None for gsrn in gsrns}
     else:
-        measurement = Mock(amount=(measured_amount / len(facilities)))
-        get_consumption_mock.return_value = measurement
+        measurements = {
+            f.gsrn: Mock(gsrn=f.gsrn, amount=(measured_amount / len(facilities)))
+            for f in facilities
+        }
+        get_consumptions_mock.side_effect = lambda token, gsrns, begin: \
+            {gsrn: measurements[gsrn] for gsrn in gsrns}
+
+    get_retired_amounts_mock.side_effect = lambda token, measurements: \
+        {m.gsrn: retired_amount / len(facilities) for m in measurements}
 
     uut = AgreementLimitedToConsumptionConsumer(agreement=agreement, session=Mock())
     uut.get_facilities = Mock(return_value=facilities)
@@ -70,17 +81,12 @@ def test__AgreementLimitedToConsumptionConsumer__get_desired_amount__should_retu
     get_transferred_amount_mock.assert_called_once_with(token=agreement.user_from.access_token, reference='PUBLIC_ID', begin=begin)
     get_stored_amount_mock.assert_called_once_with(token=agreement.user_to.access_token, begin=begin)
 
-    assert get_consumption_mock.call_count == 2
-    get_consumption_mock.assert_any_call(token=facility1.user.access_token, gsrn='GSRN1', begin=begin)
-    get_consumption_mock.assert_any_call(token=facility2.user.access_token, gsrn='GSRN2', begin=begin)
+    get_consumptions_mock.assert_called_once_with(token=agreement.user_to.access_token, gsrns=['GSRN1', 'GSRN2'], begin=begin)
 
     if measured_amount is None:
-        get_retired_amount_mock.assert_not_called()
+        get_retired_amounts_mock.assert_not_called()
     else:
-        assert get_retired_amount_mock.call_count == 2
-        get_retired_amount_mock.assert_any_call(token=facility1.user.access_token, gsrn='GSRN1', measurement=measurement)
-        get_retired_amount_mock.assert_any_call(token=facility2.user.access_token, gsrn='GSRN2', measurement=measurement)
-
+        get_retired_amounts_mock.assert_called_once_with(token=agreement.user_to.access_token, measurements=[measurements['GSRN1'], measurements['GSRN2']])
 
 def test__AgreementLimitedToConsumptionConsumer__consume__should_append_transfers():
     request = Mock()
@@ -106,3 +112,50 @@ def test__AgreementLimitedToConsumptionConsumer__consume__should_append_transfer
     assert request.transfers[0].amount == 100
     assert request.transfers[0].reference == 'Agreement Public ID'
     assert request.transfers[0].account == 'user_to_sub'
+
+
+@patch('originexample.consuming.consumers.get_consumptions')
+@patch('originexample.consuming.consumers.get_retired_amounts')
+@patch('originexample.consuming.helpers.account_service')
+def test__AgreementLimitedToConsumptionConsumer__get_desired_amount__recipient_received_on_other_agreement_within_scope__should_subtract_received_amount(
+        account_service_mock, get_retired_amounts_mock, get_consumptions_mock):
+
+    begin = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+    user_from = Mock(access_token='TOKEN_FROM')
+    user_to = Mock(access_token='TOKEN_TO')
+    facility = Mock(gsrn='GSRN', user=user_to)
+
+    account_service_mock.get_total_amount.return_value = Mock(amount=0)
+    account_service_mock.get_transferred_amount.return_value = Mock(amount=0)
+    get_consumptions_mock.return_value = {'GSRN': Mock(gsrn='GSRN', amount=150)}
+    get_retired_amounts_mock.return_value = {'GSRN': 0}
+
+    plain = AgreementConsumer(agreement=Mock(
+        public_id='PLAIN', user_from=user_from, user_to=user_to,
+        calculated_amount=100, amount_percent=0))
+
+    limited = AgreementLimitedToConsumptionConsumer(agreement=Mock(
+        public_id='LIMITED', user_from=user_from, user_to=user_to,
+        calculated_amount=200, amount_percent=0), session=Mock())
+    limited.get_facilities = Mock(return_value=[facility])
+
+    ggo1 = Mock(begin=begin, amount=100)
+    ggo2 = Mock(begin=begin, amount=100)
+
+    # Act
+    with lookup_scope():
+
+        # The recipient's stored amount has already been looked up
+        # within the scope (ie. when consuming a previous GGO)
+        assert limited.get_desired_amount(ggo1, 0) == 100
+
+        # First GGO is transferred on the plain agreement
+        assert plain.get_desired_amount(ggo1, 0) == 100
+        plain.update_lookups(ggo1, 100)
+
+        # Second GGO on the agreement limited to consumption
+        desired_amount = limited.get_desired_amount(ggo2, 0)
+
+    # Assert
+    assert desired_amount == 50
+    assert account_service_mock.get_total_amount.call_count == 1
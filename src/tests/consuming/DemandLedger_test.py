@@ -0,0 +1,56 @@
+from unittest.mock import Mock, patch
+from datetime import datetime, timezone
+
+from originexample.consuming.ledger import DemandLedger
+
+
+begin = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+
+
+@patch('originexample.consuming.ledger.redis')
+def test__DemandLedger__get_satisfied__should_return_fields_without_remaining_demand(redis_mock):
+    redis_mock.hgetall.return_value = {
+        b'retire:1': b'0',
+        b'retire:2': b'50',
+        b'agreement:A': b'-10',
+    }
+
+    uut = DemandLedger(ttl=60)
+
+    assert uut.get_satisfied('sub', begin) == {'retire:1', 'agreement:A'}
+    redis_mock.hgetall.assert_called_once_with(uut.get_key('sub', begin))
+
+
+@patch('originexample.consuming.ledger.redis')
+def test__DemandLedger__record__new_ledger__should_set_expire(redis_mock):
+    pipe = redis_mock.pipeline.return_value
+    pipe.execute.return_value = (1, -1)
+
+    uut = DemandLedger(ttl=60)
+    uut.record('sub', begin, {'retire:1': 0, 'agreement:A': 25})
+
+    key = uut.get_key('sub', begin)
+    pipe.hset.assert_called_once_with(key, mapping={'retire:1': 0, 'agreement:A': 25})
+    redis_mock.expire.assert_called_once_with(key, 60)
+
+
+@patch('originexample.consuming.ledger.redis')
+def test__DemandLedger__record__existing_ledger__should_not_extend_expire(redis_mock):
+    pipe = redis_mock.pipeline.return_value
+    pipe.execute.return_value = (0, 30)
+
+    uut = DemandLedger(ttl=60)
+    uut.record('sub', begin, {'retire:1': 0})
+
+    redis_mock.expire.assert_not_called()
+
+
+@patch('originexample.consuming.ledger.redis')
+def test__DemandLedger__disabled__should_not_invoke_redis(redis_mock):
+    uut = DemandLedger(ttl=0)
+
+    assert uut.get_satisfied('sub', begin) == set()
+    uut.record('sub', begin, {'retire:1': 0})
+    uut.invalidate('sub', begin)
+
+    assert not redis_mock.method_calls
@@ -233,3 +233,57 @@ def test__GgoConsumerController__consume_ggo__consume_more_than_available__shoul
 
     # Assert on AccountService.compose()
     account_service_mock.compose.assert_called_once()
+
+    # Assert on consumers.update_lookups()
+    consumer1.update_lookups.assert_called_once_with(ggo, 50)
+    consumer2.update_lookups.assert_called_once_with(ggo, 40)
+    consumer3.update_lookups.assert_called_once_with(ggo, 10)
+    consumer4.update_lookups.assert_not_called()
+
+
+@patch('originexample.consuming.consumers.demand_ledger')
+@patch('originexample.consuming.consumers.account_service')
+def test__GgoConsumerController__consume_ggo__should_skip_satisfied_consumers_and_record_remaining_demand(account_service_mock, demand_ledger_mock):
+
+    def __mock_consumer(field, amount, remaining_demand):
+        mock = Mock()
+        mock.get_ledger_field.return_value = field
+        mock.get_desired_amount.return_value = amount
+        mock.get_remaining_demand.return_value = remaining_demand
+        return mock
+
+    consumer1 = __mock_consumer('retire:1', 50, 0)
+    consumer2 = __mock_consumer('retire:2', 40, 0)
+    consumer3 = __mock_consumer('agreement:A', 30, 70)
+    consumer4 = __mock_consumer(None, 10, None)
+
+    demand_ledger_mock.get_satisfied.return_value = {'retire:1'}
+
+    user = Mock(sub='sub')
+    ggo = Mock(amount=100)
+
+    uut = GgoConsumerController()
+    uut.get_consumers = Mock()
+    uut.get_consumers.return_value = (
+        consumer1,
+        consumer2,
+        consumer3,
+        consumer4,
+    )
+
+    # Act
+    uut.consume_ggo(ggo=ggo, user=user, session=Mock())
+
+    # Assert
+    consumer1.get_desired_amount.assert_not_called()
+    consumer1.consume.assert_not_called()
+    consumer2.consume.assert_called_once_with(ANY, ggo, 40)
+    consumer3.consume.assert_called_once_with(ANY, ggo, 30)
+    consumer4.consume.assert_called_once_with(ANY, ggo, 10)
+    consumer3.get_remaining_demand.assert_called_once_with(ggo, 30)
+
+    demand_ledger_mock.get_satisfied.assert_called_once_with('sub', ggo.begin)
+    demand_ledger_mock.record.assert_called_once_with('sub', ggo.begin, {
+        'retire:2': 0,
+        'agreement:A': 70,
+    })
@@ -5,8 +5,8 @@ from datetime import datetime, timezone
 from originexample.consuming.consumers import RetiringConsumer
 
 
-@patch('originexample.consuming.consumers.get_consumption')
-@patch('originexample.consuming.consumers.get_retired_amount')
+@patch('originexample.consuming.consumers.get_consumptions')
+@patch('originexample.consuming.consumers.get_retired_amounts')
 @pytest.mark.parametrize(
     'ggo_amount, measured_amount, retired_amount, expected_amount, already_transferred_amount', (
     (200,        100,             50,             50,              0),
@@ -33,21 +33,26 @@ from originexample.consuming.consumers import RetiringConsumer
     (0,          200,             100,            0,               50),
 ))
 def test__RetiringConsumer__get_desired_amount__should_return_correct_amount(
-        get_retired_amount_mock, get_consumption_mock,
+        get_retired_amounts_mock, get_consumptions_mock,
         ggo_amount, measured_amount, retired_amount, expected_amount, already_transferred_amount):
 
-    get_retired_amount_mock.return_value = retired_amount
+    get_retired_amounts_mock.return_value = {'GSRN1': retired_amount}
 
     if measured_amount is None:
         measurement = None
-        get_consumption_mock.return_value = None
     else:
-        measurement = Mock(amount=measured_amount)
-        get_consumption_mock.return_value = measurement
+        measurement = Mock(gsrn='GSRN1', amount=measured_amount)
+
+    get_consumptions_mock.return_value = {
+        'GSRN1': measurement,
+        'GSRN2': None,
+    }
 
     begin = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
-    facility = Mock(gsrn='GSRN1')
-    uut = RetiringConsumer(facility)
+    user = Mock(access_token='TOKEN')
+    facility1 = Mock(gsrn='GSRN1', user=user)
+    facility2 = Mock(gsrn='GSRN2', user=user)
+    uut = RetiringConsumer(facility1, [facility1, facility2])
     ggo = Mock(begin=begin, amount=ggo_amount)
 
     # Act
@@ -56,13 +61,12 @@ def test__RetiringConsumer__get_desired_amount__should_return_correct_amount(
     # Assert
     assert desired_amount == expected_amount
 
-    get_consumption_mock.assert_called_once_with(token=facility.user.access_token, gsrn='GSRN1', begin=begin)
+    get_consumptions_mock.assert_called_once_with(token='TOKEN', gsrns=['GSRN1', 'GSRN2'], begin=begin)
 
     if measured_amount is None:
-        get_retired_amount_mock.assert_not_called()
+        get_retired_amounts_mock.assert_not_called()
     else:
-        get_retired_amount_mock.assert_called_once_with(token=facility.user.access_token, gsrn='GSRN1', measurement=measurement)
-
+        get_retired_amounts_mock.assert_called_once_with(token='TOKEN', measurements=[measurement])
 
 def test__RetiringConsumer__consume__should_append_retires():
     request = Mock()
@@ -86,3 +90,36 @@ def test__RetiringConsumer__consume__should_append_retires():
     assert len(request.retires) == 1
     assert request.retires[0].amount == 100
     assert request.retires[0].gsrn == 'Facility GSRN'
+
+
+@patch('originexample.consuming.consumers.get_consumptions')
+@patch('originexample.consuming.consumers.get_retired_amounts')
+@pytest.mark.parametrize('measured_amount, retired_amount, consumed_amount, expected_demand', (
+    (100,             50,             0,               50),
+    (100,             50,             50,              0),
+    (100,             100,            0,               0),
+    (None,            0,              0,               None),
+))
+def test__RetiringConsumer__get_remaining_demand__should_return_correct_amount(
+        get_retired_amounts_mock, get_consumptions_mock,
+        measured_amount, retired_amount, consumed_amount, expected_demand):
+
+    get_retired_amounts_mock.return_value = {'GSRN1': retired_amount}
+
+    if measured_amount is None:
+        measurement = None
+    else:
+        measurement = Mock(gsrn='GSRN1', amount=measured_amount)
+
+    get_consumptions_mock.return_value = {'GSRN1': measurement}
+
+    begin = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+    facility = Mock(gsrn='GSRN1', user=Mock(access_token='TOKEN'))
+    uut = RetiringConsumer(facility)
+    ggo = Mock(begin=begin, amount=200)
+
+    # Act
+    remaining_demand = uut.get_remaining_demand(ggo, consumed_amount)
+
+    # Assert
+    assert remaining_demand == expected_demand
@@ -2,16 +2,25 @@ import pytest
 from unittest.mock import Mock, patch
 from datetime import datetime, timezone
 
+from originexample.services import MeasurementType, SummaryResolution
 from originexample.services.account import (
     GgoCategory,
     TransferDirection,
+    SummaryGrouping,
 )
 from originexample.consuming import (
     get_consumption,
+    get_consumptions,
     get_stored_amount,
     get_retired_amount,
+    get_retired_amounts,
     get_transferred_amount,
     ggo_is_available,
+    get_available_addresses,
+    lookup_scope,
+    add_retired_amount,
+    add_stored_amount,
+    add_transferred_amount,
 )
 
 
@@ -104,6 +113,62 @@ def test__get_transferred_amount__invokes_account_service_correctly(account_serv
     assert account_service_mock.get_transferred_amount.call_args[0][1].filters.begin == begin
 
 
+@patch('originexample.consuming.helpers.datahub_service')
+def test__get_consumptions__invokes_datahub_service_correctly(datahub_service_mock):
+
+    # Arrange
+    token = 'TOKEN'
+    begin = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+    measurement1 = Mock(gsrn='GSRN1')
+    measurement3 = Mock(gsrn='GSRN3')
+
+    datahub_service_mock.get_measurement_list.return_value = Mock(
+        measurements=[measurement3, measurement1])
+
+    # Act
+    returned_measurements = get_consumptions(token, ['GSRN1', 'GSRN2', 'GSRN3'], begin)
+
+    # Assert
+    assert returned_measurements == {
+        'GSRN1': measurement1,
+        'GSRN2': None,
+        'GSRN3': measurement3,
+    }
+
+    assert datahub_service_mock.get_measurement_list.call_count == 1
+    assert datahub_service_mock.get_measurement_list.call_args[0][0] == token
+    assert datahub_service_mock.get_measurement_list.call_args[0][1].limit == 3
+    assert datahub_service_mock.get_measurement_list.call_args[0][1].filters.begin == begin
+    assert datahub_service_mock.get_measurement_list.call_args[0][1].filters.gsrn == ['GSRN1', 'GSRN2', 'GSRN3']
+    assert datahub_service_mock.get_measurement_list.call_args[0][1].filters.type is MeasurementType.CONSUMPTION
+
+
+@patch('originexample.consuming.helpers.account_service')
+def test__get_retired_amounts__invokes_account_service_correctly(account_service_mock):
+
+    # Arrange
+    token = 'TOKEN'
+    measurement1 = Mock(gsrn='GSRN1', address='ADDRESS1')
+    measurement2 = Mock(gsrn='GSRN2', address='ADDRESS2')
+
+    account_service_mock.get_ggo_summary.return_value = Mock(groups=[
+        Mock(group=['GSRN2'], values=[123]),
+    ])
+
+    # Act
+    returned_amounts = get_retired_amounts(token, [measurement1, measurement2])
+
+    # Assert
+    assert returned_amounts == {'GSRN1': 0, 'GSRN2': 123}
+
+    assert account_service_mock.get_ggo_summary.call_count == 1
+    assert account_service_mock.get_ggo_summary.call_args[0][0] == token
+    assert account_service_mock.get_ggo_summary.call_args[0][1].resolution is SummaryResolution.ALL
+    assert account_service_mock.get_ggo_summary.call_args[0][1].grouping == [SummaryGrouping.RETIRE_GSRN]
+    assert account_service_mock.get_ggo_summary.call_args[0][1].filters.retire_gsrn == ['GSRN1', 'GSRN2']
+    assert account_service_mock.get_ggo_summary.call_args[0][1].filters.retire_address == ['ADDRESS1', 'ADDRESS2']
+    assert account_service_mock.get_ggo_summary.call_args[0][1].filters.category is GgoCategory.RETIRED
+
 # -- ggo_is_available() ------------------------------------------------------
 
 
@@ -153,3 +218,160 @@ def test__ggo_is_available__account_service_return_empty_list__should_return_fal
 
     # Assert
     assert result is True
+
+
+# -- get_available_addresses() -----------------------------------------------
+
+
+@patch('originexample.consuming.helpers.account_service')
+def test__get_available_addresses__should_request_addresses_in_pages_and_return_available(account_service_mock):
+
+    # Arrange
+    account_service_mock.get_ggo_list.side_effect = [
+        Mock(results=[Mock(address='ADDRESS1'), Mock(address='ADDRESS2')]),
+        Mock(results=[]),
+    ]
+
+    # Act
+    result = get_available_addresses(
+        'TOKEN', ['ADDRESS1', 'ADDRESS2', 'ADDRESS3', 'ADDRESS1'], page_size=2)
+
+    # Assert
+    assert result == {'ADDRESS1', 'ADDRESS2'}
+    assert account_service_mock.get_ggo_list.call_count == 2
+
+    requested = []
+    for call in account_service_mock.get_ggo_list.call_args_list:
+        assert call[0][0] == 'TOKEN'
+        assert call[0][1].filters.category is GgoCategory.STORED
+        assert call[0][1].limit == len(call[0][1].filters.address)
+        requested.extend(call[0][1].filters.address)
+
+    assert sorted(requested) == ['ADDRESS1', 'ADDRESS2', 'ADDRESS3']
+
+
+@patch('originexample.consuming.helpers.account_service')
+def test__get_available_addresses__no_addresses__should_not_invoke_account_service(account_service_mock):
+
+    # Act
+    result = get_available_addresses('TOKEN', [])
+
+    # Assert
+    assert result == set()
+    account_service_mock.get_ggo_list.assert_not_called()
+
+
+# -- lookup_scope() ----------------------------------------------------------
+
+
+@patch('originexample.consuming.helpers.datahub_service')
+def test__lookup_scope__identical_lookups_within_scope__should_invoke_service_once(datahub_service_mock):
+
+    # Arrange
+    begin = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+    measurement1 = Mock()
+    measurement2 = Mock()
+
+    datahub_service_mock.get_consumption.side_effect = (
+        Mock(measurement=measurement1),
+        Mock(measurement=measurement2),
+    )
+
+    # Act
+    with lookup_scope():
+        returned1 = get_consumption('TOKEN', 'GSRN1', begin)
+        returned2 = get_consumption(token='TOKEN', gsrn='GSRN1', begin=begin)
+
+        with lookup_scope():
+            returned3 = get_consumption('TOKEN', 'GSRN1', begin)
+            returned4 = get_consumption('TOKEN', 'GSRN2', begin)
+
+    # Assert
+    assert returned1 is measurement1
+    assert returned2 is measurement1
+    assert returned3 is measurement1
+    assert returned4 is measurement2
+    assert datahub_service_mock.get_consumption.call_count == 2
+
+
+@patch('originexample.consuming.helpers.account_service')
+def test__lookup_scope__identical_lookups_outside_scope__should_invoke_service_every_time(account_service_mock):
+
+    # Arrange
+    measurement = Mock(address='ADDRESS')
+
+    account_service_mock.get_total_amount.return_value = Mock(amount=123)
+
+    # Act
+    with lookup_scope():
+        get_retired_amount('TOKEN', 'GSRN', measurement)
+
+    get_retired_amount('TOKEN', 'GSRN', measurement)
+    get_retired_amount('TOKEN', 'GSRN', measurement)
+
+    # Assert
+    assert account_service_mock.get_total_amount.call_count == 3
+
+
+@patch('originexample.consuming.helpers.datahub_service')
+def test__lookup_scope__batched_lookups_within_scope__should_share_results(datahub_service_mock):
+
+    # Arrange
+    begin = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+    measurement1 = Mock(gsrn='GSRN1')
+    measurement2 = Mock(gsrn='GSRN2')
+
+    datahub_service_mock.get_measurement_list.side_effect = (
+        Mock(measurements=[measurement1]),
+        Mock(measurements=[measurement2]),
+    )
+
+    # Act
+    with lookup_scope():
+        get_consumptions('TOKEN', ['GSRN1'], begin)
+        returned_measurement = get_consumption('TOKEN', 'GSRN1', begin)
+        returned_measurements = get_consumptions('TOKEN', ['GSRN1', 'GSRN2'], begin)
+
+    # Assert
+    assert returned_measurement is measurement1
+    assert returned_measurements == {'GSRN1': measurement1, 'GSRN2': measurement2}
+    assert datahub_service_mock.get_consumption.call_count == 0
+    assert datahub_service_mock.get_measurement_list.call_count == 2
+    assert datahub_service_mock.get_measurement_list.call_args[0][1].filters.gsrn == ['GSRN2']
+
+
+@patch('originexample.consuming.helpers.datahub_service')
+@patch('originexample.consuming.helpers.account_service')
+def test__lookup_scope__add_amounts_within_scope__should_update_lookups(account_service_mock, datahub_service_mock):
+
+    # Arrange
+    begin = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+    measurement = Mock(gsrn='GSRN', address='ADDRESS')
+
+    datahub_service_mock.get_measurement_list.return_value = Mock(measurements=[measurement])
+    account_service_mock.get_ggo_summary.return_value = Mock(groups=[Mock(group=['GSRN'], values=[10])])
+    account_service_mock.get_total_amount.return_value = Mock(amount=20)
+    account_service_mock.get_transferred_amount.return_value = Mock(amount=30)
+
+    # Act
+    with lookup_scope():
+        get_retired_amounts('TOKEN', get_consumptions('TOKEN', ['GSRN'], begin).values())
+        get_stored_amount('TOKEN', begin)
+        get_transferred_amount('TOKEN', 'REFERENCE', begin)
+
+        add_retired_amount('TOKEN', 'GSRN', begin, 1)
+        add_stored_amount('TOKEN', begin, 2)
+        add_transferred_amount('TOKEN', 'REFERENCE', begin, 3)
+        add_transferred_amount('TOKEN', 'OTHER-REFERENCE', begin, 3)
+
+        retired_amount = get_retired_amount('TOKEN', 'GSRN', measurement)
+        stored_amount = get_stored_amount('TOKEN', begin)
+        transferred_amount = get_transferred_amount('TOKEN', 'REFERENCE', begin)
+
+    # Assert
+    assert retired_amount == 11
+    assert stored_amount == 22
+    assert transferred_amount == 33
+    assert account_service_mock.get_ggo_summary.call_count == 1
+    assert account_service_mock.get_total_amount.call_count == 1
+    assert account_service_mock.get_transferred_amount.call_count == 1
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from originexample.auth import User
+from originexample.facilities import Facility, FacilityType
+from originexample.facilities.controllers import SetRetiringPriority
+
+
+user1 = User(
+    id=1,
+    sub='28a7240c-088e-4659-bd66-d76afb8c762f',
+    name='User 1',
+    company='Company 1',
+    email='user1@email.com',
+    phone='11111111',
+    access_token='access_token',
+    refresh_token='access_token',
+    token_expire=datetime(2030, 1, 1, 0, 0, 0),
+)
+
+
+def test__SetRetiringPriority__set_retiring_priorities__should_swap_priorities_in_a_single_statement(session):
+
+    # Arrange
+    session.add(user1)
+
+    for i, priority in enumerate((0, 1, 2, None)):
+        session.add(Facility(
+            public_id=str(i),
+            user=user1,
+            gsrn='GSRN%d' % i,
+            facility_type=FacilityType.CONSUMPTION,
+            sector='DK1',
+            name='Facility %d' % i,
+            retiring_priority=priority,
+        ))
+
+    session.commit()
+
+    # Act
+    SetRetiringPriority().set_retiring_priorities(user1, ['2', '0', '3'], session)
+    session.commit()
+
+    # Assert
+    session.expire_all()
+    priorities = {
+        f.public_id: f.retiring_priority
+        for f in session.query(Facility)
+    }
+
+    assert priorities == {'2': 0, '0': 1, '3': 2, '1': None}
@@ -0,0 +1,61 @@
+from flask import Flask
+from unittest.mock import patch
+
+from originexample.http import stream_csv
+
+
+app = Flask(__name__)
+
+
+def test__stream_csv__should_write_header_and_rows():
+    with app.test_request_context():
+
+        # Act
+        response = stream_csv(
+            filename='file.csv',
+            header=['A', 'B'],
+            rows=iter([[1, 2], [3, 'x;y']]),
+            delimiter=';',
+            lineterminator='\n',
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert response.headers['Content-Disposition'] == 'attachment; filename=file.csv'
+        assert response.get_data(as_text=True) == 'A;B\n1;2\n3;"x;y"\n'
+
+
+def test__stream_csv__with_fieldnames__should_write_dicts():
+    with app.test_request_context():
+
+        # Act
+        response = stream_csv(
+            filename='file.csv',
+            fieldnames=['a', 'b'],
+            rows=iter([{'a': 1, 'b': 2}, {'b': 4, 'a': 3}]),
+            lineterminator='\n',
+        )
+
+        # Assert
+        assert response.get_data(as_text=True) == 'a,b\n1,2\n3,4\n'
+
+
+@patch('originexample.http.CSV_CHUNK_SIZE', 10)
+def test__stream_csv__should_yield_document_in_chunks():
+    rows = [['1234567890'] for _ in range(5)]
+
+    with app.test_request_context():
+
+        # Act
+        response = stream_csv(
+            filename='file.csv',
+            rows=iter(rows),
+            lineterminator='\n',
+        )
+
+        chunks = list(response.response)
+
+    # Assert
+    assert len(chunks) == 5
+    assert ''.join(chunks) == '1234567890\n' * 5
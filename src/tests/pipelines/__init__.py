@@ -0,0 +1,14 @@
+import importlib
+
+
+def import_pipeline_module(name):
+    """
+    Returns the pipeline module by its name. The package exports each
+    task under the same name as its module, so patch() can not resolve
+    the module by its dotted path, and tests must patch.object() the
+    module returned by this function instead.
+
+    :param str name:
+    :rtype: module
+    """
+    return importlib.import_module('originexample.pipelines.%s' % name)
@@ -0,0 +1,285 @@
+import pytest
+from unittest.mock import Mock, patch
+from celery.exceptions import Retry
+from datetime import datetime, timezone
+
+from originexample.pipelines.consume_back_in_time import (
+    get_windows,
+    get_stored_ggos_per_begin,
+    consume_back_in_time,
+    consume_back_in_time_window,
+)
+
+from . import import_pipeline_module
+
+
+module = import_pipeline_module('consume_back_in_time')
+
+
+def test__get_windows__should_split_period_into_windows():
+    begin_from = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+    begin_to = datetime(2020, 1, 3, 12, 0, tzinfo=timezone.utc)
+
+    windows = get_windows(begin_from, begin_to, window_hours=24)
+
+    assert windows == [
+        (datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc), datetime(2020, 1, 2, 0, 0, tzinfo=timezone.utc)),
+        (datetime(2020, 1, 2, 0, 0, tzinfo=timezone.utc), datetime(2020, 1, 3, 0, 0, tzinfo=timezone.utc)),
+        (datetime(2020, 1, 3, 0, 0, tzinfo=timezone.utc), datetime(2020, 1, 3, 12, 0, tzinfo=timezone.utc)),
+    ]
+
+
+def test__get_windows__empty_period__should_return_single_window():
+    begin = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+
+    assert get_windows(begin, begin, window_hours=24) == [(begin, begin)]
+
+
+@patch.object(module, 'service')
+def test__get_stored_ggos_per_begin__should_group_by_begin_and_ignore_duplicates(service_mock):
+    begin1 = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+    begin2 = datetime(2020, 1, 1, 1, 0, tzinfo=timezone.utc)
+
+    ggo1 = Mock(address='1', begin=begin1)
+    ggo2 = Mock(address='2', begin=begin1)
+    ggo3 = Mock(address='3', begin=begin2)
+
+    service_mock.iter_ggo_list.return_value = [ggo1, ggo2, ggo2, ggo3]
+
+    # Act
+    result = get_stored_ggos_per_begin('TOKEN', begin1, begin2)
+
+    # Assert
+    assert result == {begin1: [ggo1, ggo2], begin2: [ggo3]}
+    assert service_mock.iter_ggo_list.call_args[1]['token'] == 'TOKEN'
+    assert service_mock.iter_ggo_list.call_args[1]['filters'].begin_range.begin == begin1
+    assert service_mock.iter_ggo_list.call_args[1]['filters'].begin_range.end == begin2
+
+
+@patch.object(module, 'BACK_IN_TIME_CONCURRENCY', 2)
+@patch.object(module, 'BACK_IN_TIME_WINDOW_HOURS', 24)
+@patch.object(module, 'consume_back_in_time_window')
+@patch.object(module, 'progress')
+def test__consume_back_in_time__should_distribute_pending_windows_across_lanes(progress_mock, window_task_mock):
+    progress_mock.start.return_value = ('RUN', {1})
+
+    # Act
+    consume_back_in_time(
+        subject='SUB',
+        begin_from='2020-01-01T00:00:00+00:00',
+        begin_to='2020-01-06T00:00:00+00:00',
+    )
+
+    # Assert
+    progress_mock.start.assert_called_once_with(
+        'SUB', '2020-01-01T00:00:00+00:00', '2020-01-06T00:00:00+00:00', 5)
+
+    lanes = [c[1]['indexes'] for c in window_task_mock.s.call_args_list]
+
+    assert lanes == [[0, 3], [2, 4]]
+    assert all(c[1]['run'] == 'RUN' for c in window_task_mock.s.call_args_list)
+    assert window_task_mock.s.return_value.apply_async.call_count == 2
+
+
+def __consume_window(indexes=(0, 2)):
+    """
+    Runs the consume_back_in_time_window task (synchronously) for the
+    provided windows out of three windows of a day each.
+    """
+    # inject_session() creates a session even if one is provided
+    with patch('originexample.db.make_session'):
+        consume_back_in_time_window.run(
+            subject='SUB',
+            run='RUN',
+            begin_from='2020-01-01T00:00:00+00:00',
+            begin_to='2020-01-04T00:00:00+00:00',
+            window_hours=24,
+            indexes=list(indexes),
+            session=Mock(),
+        )
+
+
+@patch.object(module, 'consume_window')
+@patch.object(module, 'consume_back_in_time_window')
+@patch.object(module, 'progress')
+def test__consume_back_in_time_window__run_superseded__should_stop(
+        progress_mock, window_task_mock, consume_window_mock):
+
+    progress_mock.is_current.return_value = False
+
+    # Act
+    __consume_window()
+
+    # Assert
+    consume_window_mock.assert_not_called()
+    progress_mock.window_done.assert_not_called()
+    window_task_mock.s.assert_not_called()
+
+
+@patch.object(module, 'consume_window')
+@patch.object(module, 'consume_back_in_time_window')
+@patch.object(module, 'progress')
+def test__consume_back_in_time_window__window_consumed__should_record_window_done_and_start_next_window(
+        progress_mock, window_task_mock, consume_window_mock):
+
+    progress_mock.is_current.return_value = True
+
+    # Act
+    __consume_window()
+
+    # Assert
+    assert consume_window_mock.call_args[0][1:4] == (
+        'SUB',
+        datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc),
+        datetime(2020, 1, 2, 0, 0, tzinfo=timezone.utc),
+    )
+
+    progress_mock.window_done.assert_called_once_with(
+        'SUB', '2020-01-01T00:00:00+00:00', '2020-01-04T00:00:00+00:00', 0)
+    progress_mock.window_failed.assert_not_called()
+
+    window_task_mock.s.assert_called_once_with(
+        subject='SUB',
+        run='RUN',
+        begin_from='2020-01-01T00:00:00+00:00',
+        begin_to='2020-01-04T00:00:00+00:00',
+        window_hours=24,
+        indexes=[2],
+    )
+    window_task_mock.s.return_value.apply_async.assert_called_once()
+
+
+@patch.object(module, 'consume_window')
+@patch.object(module, 'consume_back_in_time_window')
+@patch.object(module, 'progress')
+def test__consume_back_in_time_window__last_window_consumed__should_not_start_next_window(
+        progress_mock, window_task_mock, consume_window_mock):
+
+    progress_mock.is_current.return_value = True
+
+    # Act
+    __consume_window(indexes=[2])
+
+    # Assert
+    progress_mock.window_done.assert_called_once_with(
+        'SUB', '2020-01-01T00:00:00+00:00', '2020-01-04T00:00:00+00:00', 2)
+    window_task_mock.s.assert_not_called()
+
+
+@patch.object(module, 'consume_window')
+@patch.object(module, 'consume_back_in_time_window')
+@patch.object(module, 'progress')
+def test__consume_back_in_time_window__retried__should_not_record_window_nor_start_next_window(
+        progress_mock, window_task_mock, consume_window_mock):
+
+    progress_mock.is_current.return_value = True
+    consume_window_mock.side_effect = Retry()
+
+    # Act
+    with pytest.raises(Retry):
+        __consume_window()
+
+    # Assert
+    progress_mock.window_done.assert_not_called()
+    progress_mock.window_failed.assert_not_called()
+    window_task_mock.s.assert_not_called()
+
+
+@patch.object(module, 'consume_window')
+@patch.object(module, 'consume_back_in_time_window')
+@patch.object(module, 'progress')
+def test__consume_back_in_time_window__failed_permanently__should_record_window_failed_and_start_next_window(
+        progress_mock, window_task_mock, consume_window_mock):
+
+    progress_mock.is_current.return_value = True
+    consume_window_mock.side_effect = module.AccountServiceError('', 400, '')
+
+    # Act
+    __consume_window()
+
+    # Assert
+    progress_mock.window_failed.assert_called_once_with(
+        'SUB', '2020-01-01T00:00:00+00:00', '2020-01-04T00:00:00+00:00', 0)
+    progress_mock.window_done.assert_not_called()
+
+    assert window_task_mock.s.call_args[1]['indexes'] == [2]
+    window_task_mock.s.return_value.apply_async.assert_called_once()
+
+
+@patch.object(module, 'consume_stored_ggos')
+@patch.object(module, 'get_stored_ggos_per_begin')
+@patch.object(module, 'UserQuery')
+def test__consume_window__lock_not_acquired__should_retry(
+        user_query_mock, get_stored_ggos_mock, consume_stored_ggos_mock):
+
+    begin1 = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+    begin2 = datetime(2020, 1, 1, 1, 0, tzinfo=timezone.utc)
+
+    task = Mock()
+    task.retry.return_value = Retry()
+    get_stored_ggos_mock.return_value = {begin2: ['GGO2'], begin1: ['GGO1']}
+    consume_stored_ggos_mock.return_value = False
+
+    # Act
+    with pytest.raises(Retry):
+        module.consume_window(task, 'SUB', begin1, begin2, Mock(), {})
+
+    # Assert
+    task.retry.assert_called_once_with()
+    assert consume_stored_ggos_mock.call_args_list[0][0][1] == ['GGO1']
+
+
+@patch.object(module, 'consume_stored_ggos')
+@patch.object(module, 'get_stored_ggos_per_begin')
+@patch.object(module, 'UserQuery')
+def test__consume_window__all_consumed__should_consume_ggos_per_begin_in_order(
+        user_query_mock, get_stored_ggos_mock, consume_stored_ggos_mock):
+
+    begin1 = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+    begin2 = datetime(2020, 1, 1, 1, 0, tzinfo=timezone.utc)
+
+    task = Mock()
+    get_stored_ggos_mock.return_value = {begin2: ['GGO2'], begin1: ['GGO1']}
+    consume_stored_ggos_mock.return_value = True
+
+    # Act
+    module.consume_window(task, 'SUB', begin1, begin2, Mock(), {})
+
+    # Assert
+    task.retry.assert_not_called()
+    assert [c[0][1] for c in consume_stored_ggos_mock.call_args_list] == [['GGO1'], ['GGO2']]
+
+
+@patch.object(module, 'redis')
+@pytest.mark.parametrize('windows_done, windows_failed, completed, failed', (
+    (1, 0, False, False),
+    (3, 0, True, False),
+    (1, 1, False, False),
+    (2, 1, False, True),
+))
+def test__BackInTimeProgress__get__should_report_completed_and_failed_backfills(
+        redis_mock, windows_done, windows_failed, completed, failed):
+
+    redis_mock.smembers.return_value = [b'consume-back-in-time:SUB:FROM:TO']
+    redis_mock.hgetall.return_value = {
+        b'begin_from': b'2020-01-01T00:00:00+00:00',
+        b'begin_to': b'2020-01-04T00:00:00+00:00',
+        b'windows_total': b'3',
+        b'started': b'2020-02-01T00:00:00+00:00',
+        b'updated': b'2020-02-01T01:00:00+00:00',
+    }
+    redis_mock.scard.side_effect = lambda key: {
+        'consume-back-in-time:SUB:FROM:TO:done': windows_done,
+        'consume-back-in-time:SUB:FROM:TO:failed': windows_failed,
+    }[key]
+
+    # Act
+    result = module.BackInTimeProgress(ttl=60).get('SUB')
+
+    # Assert
+    assert len(result) == 1
+    assert result[0]['windows_total'] == 3
+    assert result[0]['windows_done'] == windows_done
+    assert result[0]['windows_failed'] == windows_failed
+    assert result[0]['completed'] is completed
+    assert result[0]['failed'] is failed
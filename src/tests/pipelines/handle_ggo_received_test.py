@@ -0,0 +1,181 @@
+import pytest
+from unittest.mock import Mock, patch, call
+from celery.exceptions import Retry
+
+from originexample.services.account import AccountServiceError
+
+from . import import_pipeline_module
+
+
+module = import_pipeline_module('handle_ggo_received')
+
+
+@patch.object(module, 'ggo_schema')
+@patch.object(module, 'handle_ggo_received')
+@patch.object(module, 'redis')
+def test__start_handle_ggo_received_pipeline__not_already_started__should_start_pipeline(redis_mock, task_mock, ggo_schema_mock):
+    redis_mock.set.return_value = True
+
+    ggo = Mock(address='ADDRESS')
+    user = Mock(sub='SUB')
+
+    # Act
+    module.start_handle_ggo_received_pipeline(ggo, user)
+
+    # Assert
+    redis_mock.set.assert_called_once_with(
+        module.get_dispatch_key('SUB', 'ADDRESS'), 1,
+        nx=True, ex=module.DISPATCH_TIMEOUT)
+
+    task_mock.s.return_value.apply_async.assert_called_once()
+    assert task_mock.s.call_args[1]['subject'] == 'SUB'
+    assert task_mock.s.call_args[1]['address'] == 'ADDRESS'
+
+
+@patch.object(module, 'handle_ggo_received')
+@patch.object(module, 'redis')
+def test__start_handle_ggo_received_pipeline__already_started__should_not_start_pipeline(redis_mock, task_mock):
+    redis_mock.set.return_value = None
+
+    # Act
+    module.start_handle_ggo_received_pipeline(Mock(address='ADDRESS'), Mock(sub='SUB'))
+
+    # Assert
+    task_mock.s.assert_not_called()
+
+
+@patch.object(module, 'ggo_schema')
+@patch.object(module, 'handle_ggo_received')
+@patch.object(module, 'redis')
+def test__start_handle_ggo_received_pipeline__dispatch_fails__should_delete_key(redis_mock, task_mock, ggo_schema_mock):
+    redis_mock.set.return_value = True
+    task_mock.s.return_value.apply_async.side_effect = ConnectionError()
+
+    # Act
+    with pytest.raises(ConnectionError):
+        module.start_handle_ggo_received_pipeline(Mock(address='ADDRESS'), Mock(sub='SUB'))
+
+    # Assert
+    redis_mock.delete.assert_called_once_with(module.get_dispatch_key('SUB', 'ADDRESS'))
+
+
+def test__DISPATCH_TIMEOUT__should_outlast_retries():
+    assert module.DISPATCH_TIMEOUT > module.MAX_RETRIES * module.RETRY_DELAY
+
+
+@patch.object(module, 'redis')
+@pytest.mark.parametrize('side_effect, key_deleted', (
+    (None, True),
+    (ValueError(), True),
+    (Retry(), False),
+))
+def test__releases_dispatch_key__should_delete_key_unless_retried(redis_mock, side_effect, key_deleted):
+    func = Mock(side_effect=side_effect)
+    wrapped = module.releases_dispatch_key(func)
+
+    # Act
+    try:
+        wrapped(Mock(), subject='SUB', address='ADDRESS', ggo_json={})
+    except (ValueError, Retry):
+        pass
+
+    # Assert
+    if key_deleted:
+        redis_mock.delete.assert_called_once_with(module.get_dispatch_key('SUB', 'ADDRESS'))
+        redis_mock.expire.assert_not_called()
+    else:
+        redis_mock.delete.assert_not_called()
+        redis_mock.expire.assert_called_once_with(
+            module.get_dispatch_key('SUB', 'ADDRESS'), module.DISPATCH_TIMEOUT)
+
+
+@patch.object(module, 'record_ggo_composed')
+@patch.object(module, 'record_ggo_composing')
+@patch.object(module, 'controller')
+def test__consume_ggo__should_register_compose_before_composing_and_confirm_afterwards(controller_mock, composing_mock, composed_mock):
+    events = Mock()
+    session = events.session
+    controller_mock.get_composition.return_value.is_empty.return_value = False
+    controller_mock.compose.side_effect = lambda *args: events.compose()
+    composing_mock.side_effect = lambda *args: events.composing()
+    composed_mock.side_effect = lambda *args: events.composed()
+
+    user = Mock(sub='SUB')
+    ggo = Mock(address='ADDRESS')
+
+    # Act
+    module.consume_ggo(user, ggo, session)
+
+    # Assert
+    assert events.mock_calls == [
+        call.composing(),
+        call.session.commit(),
+        call.compose(),
+        call.composed(),
+        call.session.commit(),
+    ]
+
+    composing_mock.assert_called_once_with(
+        session, 'SUB', ggo, controller_mock.get_composition.return_value.request)
+    composed_mock.assert_called_once_with(session, 'SUB', 'ADDRESS')
+
+
+@patch.object(module, 'discard_ggo_composing')
+@patch.object(module, 'record_ggo_composed')
+@patch.object(module, 'record_ggo_composing')
+@patch.object(module, 'controller')
+@pytest.mark.parametrize('status_code, discarded', (
+    (400, True),
+    (500, False),
+))
+def test__consume_ggo__compose_fails__should_only_discard_compose_if_definitely_not_composed(
+        controller_mock, composing_mock, composed_mock, discard_mock, status_code, discarded):
+
+    controller_mock.get_composition.return_value.is_empty.return_value = False
+    controller_mock.compose.side_effect = AccountServiceError('', status_code, '')
+
+    # Act
+    with pytest.raises(AccountServiceError):
+        module.consume_ggo(Mock(sub='SUB'), Mock(address='ADDRESS'), Mock())
+
+    # Assert
+    composed_mock.assert_not_called()
+    assert discard_mock.called is discarded
+
+
+@patch.object(module, 'record_ggo_composing')
+@patch.object(module, 'controller')
+def test__consume_ggo__nothing_consumed__should_not_register_compose(controller_mock, composing_mock):
+    controller_mock.get_composition.return_value.is_empty.return_value = True
+    session = Mock()
+
+    # Act
+    module.consume_ggo(Mock(), Mock(), session)
+
+    # Assert
+    controller_mock.compose.assert_called_once()
+    composing_mock.assert_not_called()
+    session.commit.assert_not_called()
+
+
+@patch.object(module, 'discard_ggo_composing')
+@patch.object(module, 'record_ggo_composed')
+@patch.object(module, 'get_available_addresses')
+@patch.object(module, 'get_unconfirmed_composes')
+def test__reconcile_composes__should_confirm_consumed_and_discard_available_ggos(
+        unconfirmed_mock, available_mock, composed_mock, discard_mock):
+
+    unconfirmed_mock.return_value = ['ADDRESS1', 'ADDRESS2']
+    available_mock.return_value = {'ADDRESS2'}
+
+    user = Mock(sub='SUB', access_token='TOKEN')
+    session = Mock()
+
+    # Act
+    module.reconcile_composes(user, Mock(), session)
+
+    # Assert
+    available_mock.assert_called_once_with('TOKEN', ['ADDRESS1', 'ADDRESS2'])
+    composed_mock.assert_called_once_with(session, 'SUB', 'ADDRESS1')
+    discard_mock.assert_called_once_with(session, 'SUB', 'ADDRESS2')
+    session.commit.assert_called_once()
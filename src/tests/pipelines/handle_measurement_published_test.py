@@ -0,0 +1,116 @@
+from contextlib import contextmanager
+from unittest.mock import Mock, call, patch
+from datetime import datetime, timezone
+
+from . import import_pipeline_module
+
+
+module = import_pipeline_module('handle_measurement_published')
+
+begin = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+
+
+@patch.object(module, 'MEASUREMENT_TRIGGER_DELAY', 30)
+@patch.object(module, 'trigger_handle_ggo_received_pipeline')
+@patch.object(module, 'redis')
+def test__start_trigger_handle_ggo_received_pipeline__not_pending__should_start_delayed_task(redis_mock, task_mock):
+    redis_mock.set.return_value = True
+
+    # Act
+    module.start_trigger_handle_ggo_received_pipeline('SUB', begin)
+
+    # Assert
+    redis_mock.set.assert_called_once_with(
+        module.get_trigger_pending_key('SUB', begin), 1,
+        nx=True, ex=30 + module.LOCK_TIMEOUT)
+
+    task_mock.si.assert_called_once_with(subject='SUB', begin=begin.isoformat())
+    task_mock.si.return_value.apply_async.assert_called_once_with(countdown=30)
+
+
+@patch.object(module, 'MEASUREMENT_TRIGGER_DELAY', 30)
+@patch.object(module, 'trigger_handle_ggo_received_pipeline')
+@patch.object(module, 'redis')
+def test__start_trigger_handle_ggo_received_pipeline__already_pending__should_not_start_task(redis_mock, task_mock):
+    redis_mock.set.return_value = None
+
+    # Act
+    module.start_trigger_handle_ggo_received_pipeline('SUB', begin)
+
+    # Assert
+    task_mock.si.assert_not_called()
+
+
+@patch.object(module, 'MEASUREMENT_TRIGGER_DELAY', 0)
+@patch.object(module, 'trigger_handle_ggo_received_pipeline')
+@patch.object(module, 'redis')
+def test__start_trigger_handle_ggo_received_pipeline__no_delay__should_start_task_immediately(redis_mock, task_mock):
+
+    # Act
+    module.start_trigger_handle_ggo_received_pipeline('SUB', begin)
+
+    # Assert
+    redis_mock.set.assert_not_called()
+    task_mock.si.return_value.apply_async.assert_called_once_with(countdown=0)
+
+
+@patch.object(module, 'consume_ggo')
+@patch.object(module, 'reconcile_composes')
+@patch.object(module, 'get_available_addresses')
+@patch.object(module, 'extend_locks')
+@patch.object(module, 'acquire_many_locks')
+@patch.object(module, 'controller')
+def test__consume_stored_ggos__should_extend_locks_before_consuming_each_ggo(
+        controller_mock, acquire_many_locks_mock, extend_locks_mock,
+        get_available_addresses_mock, reconcile_composes_mock, consume_ggo_mock):
+
+    user = Mock()
+    session = Mock()
+    locks = [Mock(), Mock()]
+    ggos = [Mock(address='a1', begin=begin), Mock(address='a2', begin=begin)]
+
+    @contextmanager
+    def __acquire_many_locks(keys, timeout):
+        yield locks
+
+    controller_mock.get_affected_subjects.return_value = ['SUB']
+    acquire_many_locks_mock.side_effect = __acquire_many_locks
+    get_available_addresses_mock.return_value = ['a1', 'a2']
+
+    events = Mock()
+    events.attach_mock(extend_locks_mock, 'extend_locks')
+    events.attach_mock(consume_ggo_mock, 'consume_ggo')
+
+    # Act
+    consumed = module.consume_stored_ggos(user, ggos, session)
+
+    # Assert
+    assert consumed is True
+    assert events.mock_calls == [
+        call.extend_locks(locks, timeout=module.LOCK_TIMEOUT),
+        call.consume_ggo(user, ggos[0], session),
+        call.extend_locks(locks, timeout=module.LOCK_TIMEOUT),
+        call.consume_ggo(user, ggos[1], session),
+    ]
+
+
+@patch.object(module, 'consume_ggo')
+@patch.object(module, 'acquire_many_locks')
+@patch.object(module, 'controller')
+def test__consume_stored_ggos__locks_not_acquired__should_not_consume(
+        controller_mock, acquire_many_locks_mock, consume_ggo_mock):
+
+    @contextmanager
+    def __acquire_many_locks(keys, timeout):
+        yield None
+
+    controller_mock.get_affected_subjects.return_value = ['SUB']
+    acquire_many_locks_mock.side_effect = __acquire_many_locks
+
+    # Act
+    consumed = module.consume_stored_ggos(
+        Mock(), [Mock(address='a1', begin=begin)], Mock())
+
+    # Assert
+    assert consumed is False
+    consume_ggo_mock.assert_not_called()
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from originexample.auth import User
+from originexample.facilities import Facility, FacilityQuery, FacilityType
+from originexample.pipelines.import_meteringpoints import save_imported_meteringpoints
+from originexample.services.datahub import (
+    MeteringPoint,
+    MeteringPointType,
+    GetMeteringPointsResponse,
+)
+
+
+user = User(
+    id=1,
+    sub='28a7240c-088e-4659-bd66-d76afb8c762f',
+    name='User 1',
+    company='Company 1',
+    email='user1@email.com',
+    phone='11111111',
+    access_token='access_token',
+    refresh_token='access_token',
+    token_expire=datetime(2030, 1, 1, 0, 0, 0),
+)
+
+
+def test__save_imported_meteringpoints__should_insert_new_meteringpoints_and_skip_existing(session):
+
+    # Arrange
+    session.add(user)
+    session.add(Facility(
+        user=user,
+        gsrn='GSRN1',
+        facility_type=FacilityType.PRODUCTION,
+        sector='DK1',
+        name='Existing facility',
+    ))
+    session.commit()
+
+    response = GetMeteringPointsResponse(success=True, meteringpoints=[
+        MeteringPoint(gsrn='GSRN1', type=MeteringPointType.PRODUCTION, sector='DK1'),
+        MeteringPoint(gsrn='GSRN2', type=MeteringPointType.PRODUCTION, sector='DK1', street_name='Street', building_number='1', postcode='8000', city_name='Aarhus'),
+        MeteringPoint(gsrn='GSRN3', type=MeteringPointType.CONSUMPTION, sector='DK2'),
+    ])
+
+    # Act
+    imported = save_imported_meteringpoints(user, response, session=session)
+
+    # Assert
+    assert sorted(f.gsrn for f in imported) == ['GSRN2', 'GSRN3']
+    assert all(f.public_id for f in imported)
+    assert FacilityQuery(session).has_gsrn('GSRN1').one().name == 'Existing facility'
+    assert FacilityQuery(session).has_gsrn('GSRN2').one().name == 'Street 1, 8000 Aarhus'
+    assert FacilityQuery(session).has_gsrn('GSRN3').one().facility_type == FacilityType.CONSUMPTION
+    assert FacilityQuery(session).belongs_to(user).count() == 3
+
+
+def test__save_imported_meteringpoints__no_meteringpoints__should_return_empty_list(session):
+    response = GetMeteringPointsResponse(success=True, meteringpoints=[])
+
+    assert save_imported_meteringpoints(user, response, session=session) == []
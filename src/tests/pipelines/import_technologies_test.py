@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+from originexample.technology import Technology
+from originexample.services.datahub import (
+    Technology as DataHubTechnology,
+    GetTechnologiesResponse,
+)
+from originexample.pipelines.import_technologies import import_technologies_and_insert_to_db
+
+
+@patch('originexample.pipelines.import_technologies.service')
+def test__import_technologies_and_insert_to_db__should_insert_update_and_delete_changed_technologies(service_mock, session):
+
+    # Arrange
+    session.add(Technology(technology='Wind', technology_code='T1', fuel_code='F1'))
+    session.add(Technology(technology='Solar', technology_code='T2', fuel_code='F2'))
+    session.add(Technology(technology='Coal', technology_code='T3', fuel_code='F3'))
+    session.commit()
+
+    unchanged_id = session.query(Technology).filter_by(technology_code='T1').one().id
+
+    service_mock.get_technologies.return_value = GetTechnologiesResponse(
+        success=True,
+        technologies=[
+            DataHubTechnology(technology='Wind', technology_code='T1', fuel_code='F1'),
+            DataHubTechnology(technology='Solar power', technology_code='T2', fuel_code='F2'),
+            DataHubTechnology(technology='Hydro', technology_code='T4', fuel_code='F4'),
+        ],
+    )
+
+    # Act
+    import_technologies_and_insert_to_db(session=session)
+
+    # Assert
+    session.expire_all()
+    technologies = {
+        (t.technology_code, t.fuel_code): t
+        for t in session.query(Technology)
+    }
+
+    assert sorted(technologies) == [('T1', 'F1'), ('T2', 'F2'), ('T4', 'F4')]
+    assert technologies[('T1', 'F1')].id == unchanged_id
+    assert technologies[('T2', 'F2')].technology == 'Solar power'
+    assert technologies[('T4', 'F4')].technology == 'Hydro'
@@ -0,0 +1,188 @@
+import pytest
+from unittest.mock import Mock, patch
+
+from originexample.services import SummaryResolution
+from originexample.services.account import (
+    AccountService,
+    GgoFilters,
+    GetGgoSummaryRequest,
+)
+
+
+def __get_ggo_list_mock(pages):
+    """
+    Returns a mock of AccountService.get_ggo_list() which returns
+    the provided pages, where each page is a tuple of (total, addresses).
+    """
+    responses = [
+        Mock(total=total, results=[Mock(address=a) for a in addresses])
+        for total, addresses in pages
+    ]
+    return Mock(side_effect=responses)
+
+
+@pytest.mark.parametrize('page_size, pages, expected_offsets, expected_addresses', (
+
+    # Empty list
+    (2, [(0, [])], [0], []),
+
+    # Single page
+    (2, [(1, ['a'])], [0], ['a']),
+
+    # Multiple pages, last page full
+    (2, [(4, ['a', 'b']), (4, ['c', 'd'])], [0, 2], ['a', 'b', 'c', 'd']),
+
+    # Multiple pages, last page not full
+    (2, [(3, ['a', 'b']), (3, ['c'])], [0, 2], ['a', 'b', 'c']),
+
+    # Total shrinks between pages (ie. "a" was consumed), and
+    # the offset should move back to avoid skipping "c"
+    (2, [(4, ['a', 'b']), (3, ['c', 'd']), (3, ['c', 'd'])], [0, 2, 1], ['a', 'b', 'c', 'd']),
+
+    # Total shrinks between pages with overlap of the previous page
+    (2, [(4, ['a', 'b']), (3, ['d']), (3, ['b', 'c'])], [0, 2, 1], ['a', 'b', 'c']),
+))
+def test__AccountService__iter_ggo_list__should_yield_all_ggos(
+        page_size, pages, expected_offsets, expected_addresses):
+
+    filters = GgoFilters()
+    uut = AccountService()
+    uut.get_ggo_list = __get_ggo_list_mock(pages)
+
+    # Act
+    ggos = list(uut.iter_ggo_list('TOKEN', filters, page_size=page_size))
+
+    # Assert
+    assert [g.address for g in ggos] == expected_addresses
+    assert [c[0][1].offset for c in uut.get_ggo_list.call_args_list] == expected_offsets
+    assert all(c[0][0] == 'TOKEN' for c in uut.get_ggo_list.call_args_list)
+    assert all(c[0][1].limit == page_size for c in uut.get_ggo_list.call_args_list)
+    assert all(c[0][1].filters is filters for c in uut.get_ggo_list.call_args_list)
+    assert all(c[0][1].order == ['begin', 'address'] for c in uut.get_ggo_list.call_args_list)
+
+
+def test__AccountService__iter_ggo_list__should_request_pages_lazily():
+    uut = AccountService()
+    uut.get_ggo_list = __get_ggo_list_mock([
+        (4, ['a', 'b']),
+        (4, ['c', 'd']),
+    ])
+
+    # Act
+    ggos = uut.iter_ggo_list('TOKEN', GgoFilters(), page_size=2)
+    first = next(ggos)
+
+    # Assert
+    assert first.address == 'a'
+    assert uut.get_ggo_list.call_count == 1
+
+
+@pytest.mark.parametrize('order, expected_order', (
+    (None, ['begin', 'address']),
+    (['amount'], ['amount', 'begin', 'address']),
+    (['begin'], ['begin', 'address']),
+))
+def test__AccountService__iter_ggo_list__should_always_request_unique_order(
+        order, expected_order):
+
+    uut = AccountService()
+    uut.get_ggo_list = __get_ggo_list_mock([(1, ['a'])])
+
+    # Act
+    list(uut.iter_ggo_list('TOKEN', GgoFilters(), order=order))
+
+    # Assert
+    assert uut.get_ggo_list.call_args[0][1].order == expected_order
+
+
+@patch('originexample.services.account.service.transport')
+@patch('originexample.services.account.service.response_cache')
+def test__AccountService__get_ggo_summary__response_is_cached__should_not_invoke_service(
+        response_cache_mock, transport_mock):
+
+    # Arrange
+    response_cache_mock.get_ttl.return_value = 60
+    response_cache_mock.get.return_value = {
+        'success': True,
+        'labels': ['LABEL'],
+        'groups': [],
+    }
+
+    uut = AccountService()
+
+    # Act
+    response = uut.get_ggo_summary('TOKEN', GetGgoSummaryRequest(
+        resolution=SummaryResolution.ALL,
+        filters=GgoFilters(),
+        fill=False,
+        grouping=[],
+    ), cache=True)
+
+    # Assert
+    assert response.labels == ['LABEL']
+    transport_mock.post.assert_not_called()
+
+
+@patch('originexample.services.account.service.transport')
+@patch('originexample.services.account.service.response_cache')
+def test__AccountService__get_ggo_summary__cache_is_false__should_not_use_cache(
+        response_cache_mock, transport_mock):
+
+    # Arrange
+    transport_mock.post.return_value.status_code = 200
+    transport_mock.post.return_value.json.return_value = {
+        'success': True,
+        'labels': ['LABEL'],
+        'groups': [],
+    }
+
+    uut = AccountService()
+
+    # Act
+    response = uut.get_ggo_summary('TOKEN', GetGgoSummaryRequest(
+        resolution=SummaryResolution.ALL,
+        filters=GgoFilters(),
+        fill=False,
+        grouping=[],
+    ))
+
+    # Assert
+    assert response.labels == ['LABEL']
+    response_cache_mock.get.assert_not_called()
+    response_cache_mock.set.assert_not_called()
+
+
+@patch('originexample.services.account.service.transport')
+@patch('originexample.services.account.service.response_cache')
+def test__AccountService__get_ggo_summary__response_not_cached__should_cache_response_at_generation_read_before_invoking_service(
+        response_cache_mock, transport_mock):
+
+    # Arrange
+    response_json = {
+        'success': True,
+        'labels': ['LABEL'],
+        'groups': [],
+    }
+
+    response_cache_mock.get_ttl.return_value = 60
+    response_cache_mock.get_generation.return_value = 5
+    response_cache_mock.get.return_value = None
+    transport_mock.post.return_value.status_code = 200
+    transport_mock.post.return_value.json.return_value = response_json
+
+    uut = AccountService()
+
+    # Act
+    uut.get_ggo_summary('TOKEN', GetGgoSummaryRequest(
+        resolution=SummaryResolution.ALL,
+        filters=GgoFilters(),
+        fill=False,
+        grouping=[],
+    ), cache=True)
+
+    # Assert
+    response_cache_mock.get_generation.assert_called_once_with('TOKEN')
+    assert response_cache_mock.get.call_args[0][3] == 5
+    assert response_cache_mock.set.call_args[0][3] == 5
+    assert response_cache_mock.set.call_args[0][4] == response_json
+    assert response_cache_mock.set.call_args[0][5] == 60
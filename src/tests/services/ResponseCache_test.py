@@ -0,0 +1,157 @@
+import json
+import pytest
+from datetime import datetime, timezone, timedelta
+from unittest.mock import Mock, patch
+
+from originexample.common import DateTimeRange
+from originexample.services.response_cache import ResponseCache
+
+
+def __begin_range(end):
+    return DateTimeRange(begin=end - timedelta(days=7), end=end)
+
+
+@pytest.mark.parametrize('begin_range, expected_ttl', (
+    (None, 60),
+    (__begin_range(datetime.now(tz=timezone.utc) + timedelta(hours=1)), 60),
+    (__begin_range(datetime.now(tz=timezone.utc) - timedelta(hours=1)), 3600),
+    (__begin_range(datetime.utcnow() - timedelta(hours=1)), 60),
+    (__begin_range(datetime.utcnow() - timedelta(days=2)), 3600),
+))
+def test__ResponseCache__get_ttl__should_return_correct_ttl(begin_range, expected_ttl):
+    uut = ResponseCache(ttl=60, ttl_past=3600)
+
+    assert uut.get_ttl(begin_range) == expected_ttl
+
+
+def test__ResponseCache__get_key__should_normalize_request_body():
+    uut = ResponseCache(ttl=60, ttl_past=3600)
+
+    key1 = uut.get_key('TOKEN', 'URL', {'a': 1, 'b': {'c': 2, 'd': 3}}, 0)
+    key2 = uut.get_key('TOKEN', 'URL', {'b': {'d': 3, 'c': 2}, 'a': 1}, 0)
+
+    assert key1 == key2
+    assert key1.startswith(uut.get_index_key('TOKEN'))
+    assert 'TOKEN' not in key1
+
+
+@pytest.mark.parametrize('token, url, body, generation', (
+    ('TOKEN2', 'URL', {'a': 1}, 0),
+    ('TOKEN', 'URL2', {'a': 1}, 0),
+    ('TOKEN', 'URL', {'a': 2}, 0),
+    ('TOKEN', 'URL', {'a': 1}, 1),
+))
+def test__ResponseCache__get_key__different_requests__should_return_different_keys(token, url, body, generation):
+    uut = ResponseCache(ttl=60, ttl_past=3600)
+
+    assert uut.get_key('TOKEN', 'URL', {'a': 1}, 0) != uut.get_key(token, url, body, generation)
+
+
+@patch('originexample.services.response_cache.redis')
+def test__ResponseCache__set__should_store_response_and_register_key_in_index(redis_mock):
+
+    # Arrange
+    uut = ResponseCache(ttl=60, ttl_past=3600)
+    pipe = redis_mock.pipeline.return_value
+    key = uut.get_key('TOKEN', 'URL', {'a': 1}, 2)
+    index_key = uut.get_index_key('TOKEN')
+
+    # Act
+    uut.set('TOKEN', 'URL', {'a': 1}, 2, {'success': True}, 3600)
+
+    # Assert
+    pipe.set.assert_called_once_with(key, json.dumps({'success': True}), ex=3600)
+    pipe.sadd.assert_called_once_with(index_key, key)
+    pipe.expire.assert_any_call(index_key, 3600)
+    pipe.expire.assert_any_call(uut.get_generation_key('TOKEN'), 7200)
+    pipe.execute.assert_called_once()
+
+
+@patch('originexample.services.response_cache.redis')
+def test__ResponseCache__set__ttl_is_zero__should_not_store_response(redis_mock):
+    uut = ResponseCache(ttl=0, ttl_past=0)
+
+    uut.set('TOKEN', 'URL', {'a': 1}, 0, {'success': True}, 0)
+
+    redis_mock.pipeline.assert_not_called()
+
+
+@patch('originexample.services.response_cache.redis')
+def test__ResponseCache__get__should_return_cached_response(redis_mock):
+
+    # Arrange
+    uut = ResponseCache(ttl=60, ttl_past=3600)
+    redis_mock.get.return_value = json.dumps({'success': True}).encode()
+
+    # Act
+    cached = uut.get('TOKEN', 'URL', {'a': 1}, 0)
+
+    # Assert
+    assert cached == {'success': True}
+    redis_mock.get.assert_called_once_with(uut.get_key('TOKEN', 'URL', {'a': 1}, 0))
+
+
+@patch('originexample.services.response_cache.redis')
+def test__ResponseCache__get__not_cached__should_return_none(redis_mock):
+    uut = ResponseCache(ttl=60, ttl_past=3600)
+    redis_mock.get.return_value = None
+
+    assert uut.get('TOKEN', 'URL', {'a': 1}, 0) is None
+
+
+@patch('originexample.services.response_cache.redis')
+def test__ResponseCache__invalidate__should_delete_all_keys_for_token(redis_mock):
+
+    # Arrange
+    uut = ResponseCache(ttl=60, ttl_past=3600)
+    redis_mock.smembers.return_value = {b'KEY1'}
+
+    # Act
+    uut.invalidate('TOKEN')
+
+    # Assert
+    redis_mock.pipeline.return_value.incr.assert_called_once_with(uut.get_generation_key('TOKEN'))
+    redis_mock.pipeline.return_value.expire.assert_called_once_with(uut.get_generation_key('TOKEN'), 7200)
+    redis_mock.smembers.assert_called_once_with(uut.get_index_key('TOKEN'))
+    redis_mock.delete.assert_called_once_with(uut.get_index_key('TOKEN'), b'KEY1')
+
+
+@pytest.mark.parametrize('stored, expected_generation', (
+    (None, 0),
+    (b'3', 3),
+))
+@patch('originexample.services.response_cache.redis')
+def test__ResponseCache__get_generation__should_return_current_generation(redis_mock, stored, expected_generation):
+    uut = ResponseCache(ttl=60, ttl_past=3600)
+    redis_mock.get.return_value = stored
+
+    assert uut.get_generation('TOKEN') == expected_generation
+    redis_mock.get.assert_called_once_with(uut.get_generation_key('TOKEN'))
+
+
+def test__ResponseCache__set__invalidated_while_fetching__should_not_return_stale_response():
+    """
+    A response fetched before an invalidation, but cached after it,
+    must not be returned afterwards.
+    """
+    store = {}
+
+    redis_mock = Mock()
+    redis_mock.get.side_effect = lambda key: store.get(key)
+    redis_mock.smembers.return_value = set()
+    redis_mock.pipeline.return_value.set.side_effect = \
+        lambda key, value, ex: store.__setitem__(key, value)
+    redis_mock.pipeline.return_value.incr.side_effect = \
+        lambda key: store.__setitem__(key, int(store.get(key, 0)) + 1)
+
+    uut = ResponseCache(ttl=60, ttl_past=3600)
+
+    with patch('originexample.services.response_cache.redis', redis_mock):
+
+        # Act
+        generation = uut.get_generation('TOKEN')
+        uut.invalidate('TOKEN')
+        uut.set('TOKEN', 'URL', {'a': 1}, generation, {'stale': True}, 3600)
+
+        # Assert
+        assert uut.get('TOKEN', 'URL', {'a': 1}, uut.get_generation('TOKEN')) is None
@@ -0,0 +1,158 @@
+import pytest
+from unittest.mock import Mock, patch
+from datetime import datetime, timezone, timedelta
+
+from originexample.common import DateTimeRange
+from originexample.services.account import ComposeGgoRequest, RetireRequest
+from originexample.summaries import (
+    SummaryCategory,
+    record_ggo_received,
+    record_ggo_composing,
+    record_ggo_composed,
+    get_ggo_distributions,
+    is_tracked,
+)
+from originexample.summaries.store import add_to_summary, is_remainder
+
+
+def __ggo(address, begin, technology='Wind'):
+    return Mock(address=address, begin=begin, technology=technology)
+
+
+def __session_mock(compose):
+    session = Mock()
+    session.query.return_value.filter.return_value.filter.return_value \
+        .with_for_update.return_value.one_or_none.return_value = compose
+    return session
+
+
+@patch('originexample.summaries.store.add_to_summary')
+def test__record_ggo_composed__should_add_retired_and_transferred_amounts_and_confirm(add_to_summary_mock):
+
+    # Arrange
+    compose = Mock(retired_amount=30, transferred_amount=40, confirmed=False)
+    session = __session_mock(compose)
+
+    # Act
+    record_ggo_composed(session, 'SUB', 'ADDRESS')
+
+    # Assert
+    assert add_to_summary_mock.call_count == 2
+    add_to_summary_mock.assert_any_call(session, 'SUB', compose, SummaryCategory.RETIRED, 30)
+    add_to_summary_mock.assert_any_call(session, 'SUB', compose, SummaryCategory.OUTBOUND, 40)
+    assert compose.confirmed is True
+
+
+@patch('originexample.summaries.store.add_to_summary')
+def test__record_ggo_composed__nothing_transferred__should_only_add_retired_amount(add_to_summary_mock):
+
+    # Arrange
+    compose = Mock(retired_amount=10, transferred_amount=0, confirmed=False)
+    session = __session_mock(compose)
+
+    # Act
+    record_ggo_composed(session, 'SUB', 'ADDRESS')
+
+    # Assert
+    add_to_summary_mock.assert_called_once_with(
+        session, 'SUB', compose, SummaryCategory.RETIRED, 10)
+
+
+@patch('originexample.summaries.store.add_to_summary')
+@pytest.mark.parametrize('compose', (
+    None,
+    Mock(retired_amount=10, transferred_amount=10, confirmed=True),
+))
+def test__record_ggo_composed__not_registered_or_already_confirmed__should_not_add_amounts(add_to_summary_mock, compose):
+
+    # Act
+    record_ggo_composed(__session_mock(compose), 'SUB', 'ADDRESS')
+
+    # Assert
+    add_to_summary_mock.assert_not_called()
+
+
+def test__get_ggo_distributions__should_sum_amounts_within_begin_range_per_category_and_technology(session):
+
+    # Arrange
+    add_to_summary(session, 'SUB1', __ggo('A1', datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)), SummaryCategory.ISSUED, 10)
+    add_to_summary(session, 'SUB1', __ggo('A2', datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)), SummaryCategory.ISSUED, 20)
+    add_to_summary(session, 'SUB1', __ggo('A3', datetime(2020, 1, 1, 1, 0, tzinfo=timezone.utc), 'Solar'), SummaryCategory.ISSUED, 30)
+    add_to_summary(session, 'SUB1', __ggo('A4', datetime(2020, 1, 1, 1, 0, tzinfo=timezone.utc)), SummaryCategory.RETIRED, 40)
+    add_to_summary(session, 'SUB1', __ggo('A5', datetime(2020, 1, 3, 0, 0, tzinfo=timezone.utc)), SummaryCategory.ISSUED, 50)
+    add_to_summary(session, 'SUB2', __ggo('A6', datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)), SummaryCategory.ISSUED, 60)
+
+    # Same GGO added twice (ie. a webhook is retried)
+    add_to_summary(session, 'SUB1', __ggo('A1', datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)), SummaryCategory.ISSUED, 10)
+
+    session.commit()
+
+    # Act
+    distributions = get_ggo_distributions(
+        session=session,
+        subject='SUB1',
+        begin_range=DateTimeRange(
+            begin=datetime(2020, 1, 1, 0, 0),
+            end=datetime(2020, 1, 1, 23, 59),
+        ),
+    )
+
+    # Assert
+    assert distributions == {
+        SummaryCategory.ISSUED: {'Wind': 30, 'Solar': 30},
+        SummaryCategory.RETIRED: {'Wind': 40},
+        SummaryCategory.INBOUND: {},
+        SummaryCategory.OUTBOUND: {},
+    }
+
+
+@patch('originexample.summaries.store.add_to_summary')
+@patch('originexample.summaries.store.is_remainder')
+def test__record_ggo_received__remainder_of_composed_ggo__should_not_add_ggo(is_remainder_mock, add_to_summary_mock):
+    is_remainder_mock.return_value = True
+
+    # Act
+    record_ggo_received(Mock(), Mock(sub='SUB'), Mock())
+
+    # Assert
+    add_to_summary_mock.assert_not_called()
+
+
+def test__is_remainder__should_match_remainder_of_composed_ggo_once(session):
+    begin = datetime(2020, 1, 1, 0, 0, tzinfo=timezone.utc)
+
+    ggo = Mock(address='ORIGINAL', begin=begin, technology='Wind', issue_gsrn='GSRN', amount=100)
+    request = ComposeGgoRequest(
+        address='ORIGINAL',
+        retires=[RetireRequest(amount=30, gsrn='GSRN2')],
+    )
+
+    record_ggo_composing(session, 'SUB', ggo, request)
+    session.commit()
+
+    remainder = Mock(address='REMAINDER', begin=begin, issue_gsrn='GSRN', amount=70)
+    other = Mock(address='OTHER', begin=begin, issue_gsrn='GSRN', amount=70)
+
+    # Assert
+    assert is_remainder(session, 'SUB', remainder) is True
+    assert is_remainder(session, 'SUB', remainder) is True  # Retried webhook
+    assert is_remainder(session, 'SUB', other) is False
+    assert is_remainder(session, 'SUB2', remainder) is False
+
+
+def test__is_tracked__should_only_be_true_for_ranges_beginning_after_tracking_started(session):
+    begin = datetime.now(tz=timezone.utc)
+
+    add_to_summary(session, 'SUB1', __ggo('B1', begin), SummaryCategory.ISSUED, 10)
+    session.commit()
+
+    def __is_tracked(subject, range_begin):
+        return is_tracked(session, subject, DateTimeRange(
+            begin=range_begin,
+            end=range_begin + timedelta(days=1),
+        ))
+
+    # Assert
+    assert __is_tracked('SUB1', begin + timedelta(hours=1)) is True
+    assert __is_tracked('SUB1', begin - timedelta(days=1)) is False
+    assert __is_tracked('SUB2', begin + timedelta(hours=1)) is False
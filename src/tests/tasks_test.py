@@ -0,0 +1,90 @@
+import pytest
+from unittest.mock import Mock, patch
+from redis.exceptions import LockNotOwnedError
+
+from originexample.tasks import many_locks, acquire_many_locks, extend_locks
+
+
+def __redis_mock(unavailable_keys=()):
+    """
+    Returns a mock of the Redis client, where locks on the provided
+    keys can not be acquired.
+    """
+    redis_mock = Mock()
+    redis_mock.locks = {}
+
+    def __lock(key, timeout):
+        lock_mock = Mock()
+        lock_mock.acquire.return_value = key not in unavailable_keys
+        redis_mock.locks[key] = lock_mock
+        return lock_mock
+
+    redis_mock.lock.side_effect = __lock
+    return redis_mock
+
+
+@patch('originexample.tasks.redis', new_callable=__redis_mock)
+def test__many_locks__all_locks_available__should_acquire_locks_in_sorted_order(redis_mock):
+
+    # Act
+    with many_locks(['c', 'a', 'b', 'a'], timeout=10) as acquired:
+
+        # Assert
+        assert acquired is True
+        assert [c[0][0] for c in redis_mock.lock.call_args_list] == ['a', 'b', 'c']
+        assert all(not lock.release.called for lock in redis_mock.locks.values())
+
+    assert all(lock.release.called for lock in redis_mock.locks.values())
+
+
+@patch('originexample.tasks.redis', new_callable=lambda: __redis_mock(['b']))
+def test__many_locks__lock_unavailable__should_release_acquired_locks(redis_mock):
+
+    # Act
+    with many_locks(['c', 'a', 'b'], timeout=10) as acquired:
+
+        # Assert
+        assert acquired is False
+        assert [c[0][0] for c in redis_mock.lock.call_args_list] == ['a', 'b']
+        assert redis_mock.locks['a'].release.called
+        assert not redis_mock.locks['b'].release.called
+
+
+@patch('originexample.tasks.redis', new_callable=__redis_mock)
+def test__acquire_many_locks__all_locks_available__should_yield_locks(redis_mock):
+
+    # Act
+    with acquire_many_locks(['b', 'a'], timeout=10) as locks:
+
+        # Assert
+        assert locks == [redis_mock.locks['a'], redis_mock.locks['b']]
+
+
+@patch('originexample.tasks.redis', new_callable=lambda: __redis_mock(['b']))
+def test__acquire_many_locks__lock_unavailable__should_yield_none(redis_mock):
+
+    # Act
+    with acquire_many_locks(['b', 'a'], timeout=10) as locks:
+
+        # Assert
+        assert locks is None
+
+
+def test__extend_locks__should_reset_ttl_of_all_locks():
+    locks = [Mock(), Mock()]
+
+    # Act
+    extend_locks(locks, timeout=10)
+
+    # Assert
+    for lock in locks:
+        lock.extend.assert_called_once_with(10, replace_ttl=True)
+
+
+def test__extend_locks__lock_expired__should_raise_lock_not_owned_error():
+    locks = [Mock()]
+    locks[0].extend.side_effect = LockNotOwnedError()
+
+    # Act + Assert
+    with pytest.raises(LockNotOwnedError):
+        extend_locks(locks, timeout=10)
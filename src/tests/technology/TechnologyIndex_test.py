@@ -0,0 +1,70 @@
+from unittest.mock import Mock, patch
+
+from originexample.technology.index import (
+    TechnologyIndex,
+    TechnologyIndexCache,
+    invalidate_technology_index,
+)
+
+
+def __session_mock(rows):
+    session = Mock()
+    session.query.return_value = rows
+    return session
+
+
+def test__TechnologyIndex__should_lookup_labels_and_codes():
+    uut = TechnologyIndex(b'1', {
+        ('T1', 'F1'): 'Wind',
+        ('T2', 'F2'): 'Wind',
+        ('T3', 'F3'): 'Solar',
+    })
+
+    assert uut.get_label('T1', 'F1') == 'Wind'
+    assert uut.get_label('T3', 'F3') == 'Solar'
+    assert uut.get_label('T4', 'F4') is None
+    assert sorted(uut.get_codes('Wind')) == [('T1', 'F1'), ('T2', 'F2')]
+    assert uut.get_codes('Coal') == ()
+    assert uut.get_distinct_labels() == ['Solar', 'Wind']
+
+
+@patch('originexample.technology.index.redis')
+@patch('originexample.technology.index.time.monotonic')
+def test__TechnologyIndexCache__get__should_only_reload_when_version_changes(monotonic_mock, redis_mock):
+
+    # Arrange
+    uut = TechnologyIndexCache(check_interval=10)
+    session = __session_mock([('T1', 'F1', 'Wind')])
+    redis_mock.get.return_value = b'1'
+    monotonic_mock.return_value = 100
+
+    # Act + Assert: Initial load
+    index1 = uut.get(session)
+    assert index1.get_label('T1', 'F1') == 'Wind'
+    assert session.query.call_count == 1
+
+    # Act + Assert: Within check interval (version not checked)
+    monotonic_mock.return_value = 105
+    redis_mock.get.return_value = b'2'
+    assert uut.get(session) is index1
+    assert redis_mock.get.call_count == 1
+
+    # Act + Assert: Check interval passed, version changed
+    session.query.return_value = [('T1', 'F1', 'Solar')]
+    monotonic_mock.return_value = 111
+    index2 = uut.get(session)
+    assert index2 is not index1
+    assert index2.get_label('T1', 'F1') == 'Solar'
+    assert session.query.call_count == 2
+
+    # Act + Assert: Check interval passed, version unchanged
+    monotonic_mock.return_value = 122
+    assert uut.get(session) is index2
+    assert session.query.call_count == 2
+
+
+@patch('originexample.technology.index.redis')
+def test__invalidate_technology_index__without_session__should_increment_version(redis_mock):
+    invalidate_technology_index()
+
+    redis_mock.incr.assert_called_once_with('technology-version')